@@ -1,2 +1,2 @@
 #!/bin/bash
-python3 src/main.py "/static-site-generator/"
+python3 src/main.py "/static-site-generator/" --site-url "https://teobonza.github.io"
@@ -0,0 +1,143 @@
+import os
+import io
+import mmap
+import zlib
+import struct
+import tarfile
+import zipfile
+
+# Formats that are already compressed gain nothing from deflate, so they are
+# stored as-is; stored members can also be served straight from the mmap
+PRECOMPRESSED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico",
+    ".woff", ".woff2", ".gz", ".br", ".zip", ".mp3", ".mp4", ".webm",
+}
+
+# Fixed timestamp so identical input produces an identical archive
+ARCHIVE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+def archive_format(archive_path):
+    """
+    Return "zip" or "tar" depending on the archive file name.
+    """
+    if archive_path.endswith(".zip"):
+        return "zip"
+    if archive_path.endswith(".tar"):
+        return "tar"
+    raise ValueError(f"Unsupported archive type: {archive_path} (expected .zip or .tar)")
+
+class ArchiveWriter:
+    """
+    Streams build output into a single .zip or .tar file instead of a
+    directory tree. Paths are given as they would be under dest_dir and are
+    stored relative to it. The archive is written to a temporary file and
+    renamed into place by finish(), so a failed build leaves the previous
+    archive alone.
+    If weights (a budget.Weights) is given, every member is recorded in it.
+    """
+
+    def __init__(self, archive_path, dest_dir, weights=None):
+        self.archive_path = archive_path
+        self.dest_dir = dest_dir
+        self.weights = weights
+        self.format = archive_format(archive_path)
+        self.tmp_path = f"{archive_path}.{os.getpid()}.tmp"
+        if self.format == "zip":
+            self.archive = zipfile.ZipFile(self.tmp_path, "w")
+        else:
+            self.archive = tarfile.open(self.tmp_path, "w", format=tarfile.PAX_FORMAT)
+        self.names = set()
+
+    def _name(self, path):
+        name = os.path.relpath(path, self.dest_dir).replace(os.sep, "/")
+        if name in self.names:
+            raise ValueError(f"Duplicate archive member: {name}")
+        return name
+
+    def write_bytes(self, path, data):
+        name = self._name(path)
+        if self.weights is not None:
+            self.weights.record(path, data)
+        if self.format == "zip":
+            info = zipfile.ZipInfo(name, ARCHIVE_DATE_TIME)
+            info.external_attr = 0o644 << 16
+            if os.path.splitext(name)[1].lower() in PRECOMPRESSED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+            self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            self.archive.addfile(info, io.BytesIO(data))
+        self.names.add(name)
+        return True
+
+    def write_text(self, path, text):
+        return self.write_bytes(path, text.encode("utf-8"))
+
+    def copy_file(self, src_path, dest_path):
+        with open(src_path, "rb") as f:
+            return self.write_bytes(dest_path, f.read())
+
+    def finish(self, delete_stale=True):
+        """
+        Close the archive and move it into place. The archive only ever
+        holds this build's files, so there is nothing stale to delete.
+        Returns a deploy plan listing every member as added.
+        """
+        self.archive.close()
+        os.replace(self.tmp_path, self.archive_path)
+        print(f"Wrote archive: {self.archive_path} ({len(self.names)} files)")
+        return {"added": sorted(self.names), "changed": [], "deleted": [], "unchanged": 0}
+
+class ArchiveReader:
+    """
+    Read-only view of a site archive for serving. The zip central directory
+    (or the tar headers) is read once into an index; member data is then
+    sliced out of a memory map of the archive, never extracted to disk.
+    """
+
+    def __init__(self, archive_path):
+        self.format = archive_format(archive_path)
+        self.file = open(archive_path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.members = {}
+        if self.format == "zip":
+            with zipfile.ZipFile(self.file) as archive:
+                for info in archive.infolist():
+                    self.members[info.filename] = info
+        else:
+            with tarfile.open(fileobj=self.file) as archive:
+                for info in archive.getmembers():
+                    if info.isfile():
+                        self.members[info.name] = info
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def _zip_data_offset(self, info):
+        # The local header is 30 bytes plus the file name and extra field
+        header = self.map[info.header_offset:info.header_offset + 30]
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        return info.header_offset + 30 + name_length + extra_length
+
+    def read(self, name):
+        """
+        Return the contents of a member as bytes (a memoryview for stored
+        members, which avoids copying them out of the map).
+        """
+        info = self.members[name]
+        if self.format == "tar":
+            return memoryview(self.map)[info.offset_data:info.offset_data + info.size]
+        offset = self._zip_data_offset(info)
+        if info.compress_type == zipfile.ZIP_STORED:
+            return memoryview(self.map)[offset:offset + info.file_size]
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            return zlib.decompress(self.map[offset:offset + info.compress_size], -zlib.MAX_WBITS)
+        raise ValueError(f"Unsupported compression for {name}: {info.compress_type}")
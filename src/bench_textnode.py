@@ -0,0 +1,68 @@
+"""
+Time and peak memory of the markdown render paths on two large pages:
+one dense with inline markup and one of long prose paragraphs.
+
+    python3 src/bench_textnode.py [PARAGRAPHS]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from textnode import (markdown_to_html_node, markdown_to_html, markdown_to_html_spans,
+                      text_to_textnodes, text_to_span_nodes)
+
+def make_markup_page(paragraphs):
+    lines = [f"# Page of {paragraphs} paragraphs"]
+    for i in range(paragraphs):
+        lines.append(
+            f"Paragraph {i} has **bold {i}** and _italic_ text,\n"
+            f"some `code {i}`, an ![image](/img/{i}.png) and a [link](/p/{i}),\n"
+            "and then a long plain line that runs on for a while without any markup in it at all."
+        )
+        if i % 50 == 0:
+            lines.append(f"## Section {i}\n\n- item **{i}**\n- item [two](/two)")
+    return "\n\n".join(lines)
+
+def make_prose_page(paragraphs):
+    prose = " ".join(["word"] * 1000)
+    lines = [f"# Page of {paragraphs} paragraphs"]
+    for i in range(paragraphs // 100):
+        lines.append(f"{prose}\n{prose} with **one bold {i}** and [a link](/p/{i}) in it. {prose}")
+    return "\n\n".join(lines)
+
+def measure(func, arg, repeats=5):
+    best = None
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for kind, make_page in (("Markup", make_markup_page), ("Prose", make_prose_page)):
+        page = make_page(paragraphs)
+        # All the inline text of the page as one run, to compare the nodes alone
+        text = " ".join(page.split("\n\n")[1:]).replace("#", "").replace("- ", "")
+        print(f"{kind} page: {len(page) / 1e6:.1f} MB")
+        cases = [
+            ("node tree (markdown_to_html_node)", lambda md: markdown_to_html_node(md).to_html(), page),
+            ("fused (markdown_to_html)", markdown_to_html, page),
+            ("spans (markdown_to_html_spans)", markdown_to_html_spans, page),
+            ("inline nodes (text_to_textnodes)", text_to_textnodes, text),
+            ("inline spans (text_to_span_nodes)", text_to_span_nodes, text),
+        ]
+        for name, func, arg in cases:
+            seconds, peak = measure(func, arg)
+            print(f"  {name:36} {seconds * 1000:8.1f} ms {peak / 1e6:8.1f} MB peak")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import re
+import gzip
+from urllib.parse import urlsplit, urljoin, unquote
+from archive import PRECOMPRESSED_EXTENSIONS
+from sitemap import page_url
+
+# Default budgets for the transfer (gzip) weight of a page, in bytes
+DEFAULT_BUDGETS = {
+    "html": 100 * 1024,
+    "css": 100 * 1024,
+    "images": 1024 * 1024,
+    "total": 1536 * 1024,
+}
+
+_SIZE_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)\s*([KM]?)B?$", re.IGNORECASE)
+_UNITS = {"": 1, "K": 1024, "M": 1024 * 1024}
+
+def parse_size(text):
+    """
+    Parse a size such as "2048", "50KB" or "1.5M" into bytes.
+    """
+    match = _SIZE_PATTERN.match(text.strip())
+    if not match:
+        raise ValueError(f"Invalid size: {text!r} (expected e.g. 500KB or 2MB)")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+def parse_budgets(specs):
+    """
+    Parse KIND=SIZE budget options on top of the defaults.
+    """
+    budgets = dict(DEFAULT_BUDGETS)
+    for spec in specs:
+        kind, sep, size = spec.partition("=")
+        if not sep or kind not in DEFAULT_BUDGETS:
+            raise ValueError(f"Invalid budget: {spec!r} (expected one of {', '.join(DEFAULT_BUDGETS)}=SIZE)")
+        budgets[kind] = parse_size(size)
+    return budgets
+
+def file_weight(path, data):
+    """
+    Return (size, transfer size) of a file's data. The transfer size is the
+    gzip size, except for formats that are already compressed.
+    """
+    if os.path.splitext(path)[1].lower() in PRECOMPRESSED_EXTENSIONS:
+        return len(data), len(data)
+    return len(data), len(gzip.compress(data, mtime=0))
+
+class Weights(dict):
+    """
+    Output path -> (size, transfer size) of every file a build writes,
+    filled in by the output writer from the data it already has in memory.
+    """
+
+    def record(self, path, data):
+        self[path] = file_weight(path, data)
+
+def resource_path(url, href, dest_dir):
+    """
+    Map a stylesheet or image URL referenced by the page at url to the
+    output file it is served from, or None for external URLs.
+    """
+    parts = urlsplit(urljoin("/" + url, href))
+    if parts.scheme or parts.netloc:
+        return None
+    return os.path.join(dest_dir, unquote(parts.path).lstrip("/"))
+
+def page_weight(page, weights, dest_dir):
+    """
+    Add up the weight of a page from the weights recorded while writing the
+    build output (output path -> (size, transfer size)). Stylesheets and
+    images shared between pages count towards every page that uses them.
+    Returns a dict of kind -> [size, transfer size], plus the resources that
+    could not be found in the output under "missing".
+    """
+    weight = {kind: [0, 0] for kind in DEFAULT_BUDGETS}
+    missing = []
+
+    def add(kind, sizes):
+        for total in (weight[kind], weight["total"]):
+            total[0] += sizes[0]
+            total[1] += sizes[1]
+
+    url = page_url(os.path.relpath(page["dest"], dest_dir))
+    add("html", weights[page["dest"]])
+    for kind, hrefs in (("css", page["stylesheets"]), ("images", page["images"])):
+        for href in dict.fromkeys(hrefs):
+            path = resource_path(url, href, dest_dir)
+            if path is None:
+                continue
+            if path not in weights:
+                missing.append(href)
+                continue
+            add(kind, weights[path])
+    weight["url"] = url
+    weight["missing"] = missing
+    return weight
+
+def weight_report(pages, weights, dest_dir, budgets):
+    """
+    Build the page weight report: one entry per page with its weight and
+    the budgets it goes over, heaviest page first.
+    """
+    report = []
+    for page in pages:
+        weight = page_weight(page, weights, dest_dir)
+        over = [kind for kind, limit in budgets.items() if weight[kind][1] > limit]
+        report.append(dict(weight, over=over))
+    report.sort(key=lambda entry: (-entry["total"][1], entry["url"]))
+    return report
+
+def format_size(size):
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f}MB"
+    if size >= 1024:
+        return f"{size / 1024:.1f}KB"
+    return f"{size}B"
+
+def format_report(report):
+    """
+    Format the report as a table of transfer / uncompressed sizes.
+    """
+    lines = [f"{'page':<40} {'html':>17} {'css':>17} {'images':>17} {'total':>17}"]
+    for entry in report:
+        cells = [
+            f"{format_size(entry[kind][1])}/{format_size(entry[kind][0])}"
+            for kind in ("html", "css", "images", "total")
+        ]
+        line = f"{'/' + entry['url']:<40} " + " ".join(f"{cell:>17}" for cell in cells)
+        if entry["over"]:
+            line += f"  OVER BUDGET: {', '.join(entry['over'])}"
+        lines.append(line)
+        for href in entry["missing"]:
+            lines.append(f"    missing resource: {href}")
+    return "\n".join(lines)
@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from textnode import markdown_errors, extract_title
+from metadata import split_front_matter
+from schedule import pool_size
+
+def find_markdown_files(paths):
+    """
+    Return the markdown files in paths (files or directories), sorted.
+    """
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for root, _, files in os.walk(path):
+            found.extend(os.path.join(root, name) for name in files if name.endswith(".md"))
+    return sorted(found)
+
+def check_file(path):
+    """
+    Parse a markdown file the way the build does, without rendering or
+    writing anything.
+    Returns a list of (path, line, message) errors.
+    """
+    try:
+        with open(path, "r") as f:
+            markdown = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return [(path, 0, f"Cannot read file: {e}")]
+    try:
+        meta, body = split_front_matter(markdown)
+    except ValueError as e:
+        return [(path, 1, str(e))]
+
+    # Line numbers are counted from the top of the file, front matter included
+    offset = markdown[:len(markdown) - len(body)].count("\n")
+    errors = [(path, offset + line, message) for line, message in markdown_errors(body)]
+    if not meta.get("title"):
+        try:
+            extract_title(body)
+        except ValueError as e:
+            errors.append((path, offset + 1, str(e)))
+    return sorted(errors, key=lambda error: error[1])
+
+def check_files(paths, jobs=None):
+    """
+    Check every markdown file, spreading them over jobs processes (default:
+    one per CPU) when there are enough of them to be worth it.
+    Returns the errors of all the files, in path order.
+    """
+    jobs = pool_size(len(paths), jobs or os.cpu_count() or 1)
+    if jobs == 1:
+        results = map(check_file, paths)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(check_file, paths, chunksize=max(1, len(paths) // (jobs * 4))))
+    return [error for file_errors in results for error in file_errors]
+
+def format_error(error):
+    """
+    Format an error as path:line: message.
+    """
+    path, line, message = error
+    return f"{path}:{line}: {message}"
@@ -0,0 +1,126 @@
+import os
+import shutil
+
+STAGING_SUFFIX = ".staging"
+
+def generations_dir(output_path):
+    """
+    Return the directory holding the generations of output_path.
+    """
+    return output_path.rstrip(os.sep) + ".generations"
+
+def list_generations(output_path):
+    """
+    Return the numbers of the complete generations of output_path, oldest first.
+    """
+    gen_dir = generations_dir(output_path)
+    if not os.path.isdir(gen_dir):
+        return []
+    return sorted(int(name) for name in os.listdir(gen_dir) if name.isdigit())
+
+def current_generation(output_path):
+    """
+    Return the number of the generation output_path points to, or None.
+    """
+    if not os.path.islink(output_path):
+        return None
+    name = os.path.basename(os.readlink(output_path).rstrip(os.sep))
+    return int(name) if name.isdigit() else None
+
+def _generation_path(output_path, number):
+    return os.path.join(generations_dir(output_path), str(number))
+
+def _point(output_path, gen_path):
+    # Make a new link next to output_path and rename it over the old one,
+    # so output_path always resolves to a complete generation
+    target = os.path.relpath(gen_path, os.path.dirname(output_path) or ".")
+    tmp_path = f"{output_path.rstrip(os.sep)}.{os.getpid()}.link"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    os.symlink(target, tmp_path)
+    os.replace(tmp_path, output_path.rstrip(os.sep))
+
+def _seed(src_dir, dest_dir):
+    # Hardlink every file of the previous generation; the output writer
+    # replaces files by renaming over them, so the previous generation is
+    # never modified through these links
+    for root, _, files in os.walk(src_dir):
+        dest_root = os.path.join(dest_dir, os.path.relpath(root, src_dir))
+        os.makedirs(dest_root, exist_ok=True)
+        for name in files:
+            src_path = os.path.join(root, name)
+            dest_path = os.path.join(dest_root, name)
+            try:
+                os.link(src_path, dest_path)
+            except OSError:
+                shutil.copy2(src_path, dest_path)
+
+def stage_generation(output_path, resume=False):
+    """
+    Create the staging directory for the next generation of output_path,
+    seeded with hardlinks to the files of the current one, and return it.
+    With resume, a staging directory left by an interrupted build is
+    reused as it is.
+    The first time, an existing output directory becomes generation 1 and
+    output_path is replaced by a link to it.
+    """
+    gen_dir = generations_dir(output_path)
+    os.makedirs(gen_dir, exist_ok=True)
+
+    if os.path.isdir(output_path) and not os.path.islink(output_path):
+        first_path = _generation_path(output_path, max(list_generations(output_path), default=0) + 1)
+        os.rename(output_path, first_path)
+        _point(output_path, first_path)
+        print(f"Moved {output_path} to generation {os.path.basename(first_path)}")
+
+    number = max(list_generations(output_path), default=0) + 1
+    staging_path = _generation_path(output_path, number) + STAGING_SUFFIX
+    for name in os.listdir(gen_dir):
+        path = os.path.join(gen_dir, name)
+        if name.endswith(STAGING_SUFFIX) and not (resume and path == staging_path):
+            # Left over from an interrupted build
+            shutil.rmtree(path)
+    if resume and os.path.isdir(staging_path):
+        print(f"Resuming in staging directory {staging_path}")
+        return staging_path
+
+    os.makedirs(staging_path)
+    current = current_generation(output_path)
+    if current is not None:
+        _seed(_generation_path(output_path, current), staging_path)
+    return staging_path
+
+def publish_generation(output_path, staging_path, keep=3):
+    """
+    Turn a finished staging directory into a generation, point output_path
+    at it and delete all but the keep generations before it.
+    Returns the number of the new generation.
+    """
+    gen_path = staging_path[:-len(STAGING_SUFFIX)]
+    os.rename(staging_path, gen_path)
+    _point(output_path, gen_path)
+    number = int(os.path.basename(gen_path))
+    for old in list_generations(output_path):
+        if old < number and number - old > keep:
+            shutil.rmtree(_generation_path(output_path, old))
+    print(f"Published generation {number} of {output_path}")
+    return number
+
+def rollback(output_path, number=None):
+    """
+    Point output_path back at an earlier generation: the one before the
+    current one, or generation number if given.
+    Returns the number of the generation now live.
+    """
+    generations = list_generations(output_path)
+    current = current_generation(output_path)
+    if number is None:
+        earlier = [gen for gen in generations if current is None or gen < current]
+        if not earlier:
+            raise ValueError(f"No generation of {output_path} before {current} to roll back to")
+        number = earlier[-1]
+    elif number not in generations:
+        raise ValueError(f"No generation {number} of {output_path}")
+    _point(output_path, _generation_path(output_path, number))
+    print(f"{output_path} now points to generation {number}")
+    return number
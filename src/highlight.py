@@ -0,0 +1,198 @@
+import re
+import hashlib
+from collections import OrderedDict
+from html import escape
+from output import load_json, save_json
+
+# Highlighted snippets are memoized by (language, code hash); the oldest
+# entries are evicted once the cache grows past this size
+MAX_CACHE_ENTRIES = 10000
+
+LANGUAGE_ALIASES = {
+    "py": "python",
+    "python3": "python",
+    "sh": "bash",
+    "shell": "bash",
+    "htm": "html",
+}
+
+# Token classes follow the short names used by Pygments stylesheets:
+# c = comment, s = string, m = number, k = keyword, kc = constant,
+# nb = builtin, nv = variable, nt = tag, na = attribute
+_PYTHON_PATTERN = re.compile(
+    r"(?P<c>#[^\n]*)"
+    r"|(?P<s>[rRbBuUfF]{0,2}(?:\"\"\"[\s\S]*?\"\"\"|'''[\s\S]*?'''|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'))"
+    r"|(?P<m>\b(?:0[xX][0-9a-fA-F_]+|\d[\d_]*(?:\.\d*)?(?:[eE][+-]?\d+)?j?)\b)"
+    r"|(?P<kc>\b(?:True|False|None)\b)"
+    r"|(?P<k>\b(?:and|as|assert|async|await|break|class|continue|def|del|elif|else|except|"
+    r"finally|for|from|global|if|import|in|is|lambda|nonlocal|not|or|pass|raise|return|"
+    r"try|while|with|yield)\b)"
+    r"|(?P<nb>\b(?:print|len|range|open|str|int|float|list|dict|set|tuple|isinstance|"
+    r"enumerate|zip|map|filter|sorted|sum|min|max|super|type|object)\b)"
+)
+
+_BASH_PATTERN = re.compile(
+    r"(?P<c>(?<![\S])#[^\n]*)"
+    r"|(?P<s>\"(?:\\.|[^\"\\])*\"|'[^']*')"
+    r"|(?P<nv>\$(?:\{[^}\n]*\}|\w+|[@#?$!*-]))"
+    r"|(?P<k>\b(?:if|then|else|elif|fi|for|while|until|do|done|case|esac|in|function|"
+    r"return|local|export|select)\b)"
+    r"|(?P<nb>\b(?:echo|cd|printf|read|source|exit|set|unset|test|shift|cat|ls|grep|"
+    r"python3?|mkdir|rm|cp|mv)\b)"
+    r"|(?P<m>\b\d+\b)"
+)
+
+_JSON_PATTERN = re.compile(
+    r"(?P<nt>\"(?:\\.|[^\"\\])*\"(?=\s*:))"
+    r"|(?P<s>\"(?:\\.|[^\"\\])*\")"
+    r"|(?P<m>-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)"
+    r"|(?P<kc>\b(?:true|false|null)\b)"
+)
+
+_HTML_PATTERN = re.compile(
+    r"(?P<c><!--[\s\S]*?-->)"
+    r"|(?P<tag></?[A-Za-z][\w:-]*(?:\s+[^<>]*?)?/?>)"
+)
+
+_HTML_TAG_PATTERN = re.compile(
+    r"(?P<nt></?[A-Za-z][\w:-]*|/?>)"
+    r"|(?P<s>\"[^\"]*\"|'[^']*')"
+    r"|(?P<na>[^\s=\"'<>/]+(?=\s*=))"
+)
+
+# Bump when the markup _tokenize produces changes; changes to the token
+# patterns are picked up by CACHE_VERSION on their own
+HIGHLIGHTER_VERSION = 1
+
+# Cached snippets are only reused by a highlighter with the same version
+# and patterns
+CACHE_VERSION = hashlib.sha256(
+    "\n".join(
+        [str(HIGHLIGHTER_VERSION)]
+        + [pattern.pattern for pattern in (_PYTHON_PATTERN, _BASH_PATTERN, _JSON_PATTERN,
+                                           _HTML_PATTERN, _HTML_TAG_PATTERN)]
+    ).encode("utf-8")
+).hexdigest()[:16]
+
+def _tokenize(pattern, code, out, nested=None):
+    pos = 0
+    for match in pattern.finditer(code):
+        out.append(escape(code[pos:match.start()], quote=False))
+        token_class = match.lastgroup
+        if nested is not None and token_class in nested:
+            _tokenize(nested[token_class], match.group(), out)
+        else:
+            out.append(f'<span class="{token_class}">{escape(match.group(), quote=False)}</span>')
+        pos = match.end()
+    out.append(escape(code[pos:], quote=False))
+
+def _highlight_python(code, out):
+    _tokenize(_PYTHON_PATTERN, code, out)
+
+def _highlight_bash(code, out):
+    _tokenize(_BASH_PATTERN, code, out)
+
+def _highlight_json(code, out):
+    _tokenize(_JSON_PATTERN, code, out)
+
+def _highlight_html(code, out):
+    _tokenize(_HTML_PATTERN, code, out, {"tag": _HTML_TAG_PATTERN})
+
+HIGHLIGHTERS = {
+    "python": _highlight_python,
+    "bash": _highlight_bash,
+    "json": _highlight_json,
+    "html": _highlight_html,
+}
+
+_cache = OrderedDict()
+# Entries added since the last take_new_entries(), once track_new_entries()
+# is called, so that a worker process can hand what it highlighted back to
+# the parent's cache
+_new_entries = None
+
+def normalize_language(language):
+    """
+    Map a code block language specifier to its canonical name.
+    """
+    language = language.lower()
+    return LANGUAGE_ALIASES.get(language, language)
+
+def highlight(code, language):
+    """
+    Return the code as highlighted HTML, or None if the language is not
+    supported. Results are memoized in a bounded cache, so identical
+    snippets are only tokenized once.
+    """
+    language = normalize_language(language)
+    highlighter = HIGHLIGHTERS.get(language)
+    if highlighter is None:
+        return None
+
+    key = f"{language}:{hashlib.sha256(code.encode('utf-8')).hexdigest()}"
+    html = _cache.get(key)
+    if html is not None:
+        _cache.move_to_end(key)
+        return html
+
+    out = []
+    highlighter(code, out)
+    html = "".join(out)
+    _cache[key] = html
+    if _new_entries is not None:
+        _new_entries.append((key, html))
+    if len(_cache) > MAX_CACHE_ENTRIES:
+        _cache.popitem(last=False)
+    return html
+
+def load_cache(cache_path):
+    """
+    Load previously highlighted snippets from disk into the cache. A cache
+    written by a different version of the highlighter is ignored.
+    """
+    data = load_json(cache_path, None)
+    if data is None:
+        return
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        print(f"Ignoring highlight cache from another highlighter version: {cache_path}")
+        return
+    for key, html in data["entries"][-MAX_CACHE_ENTRIES:]:
+        _cache[key] = html
+
+def save_cache(cache_path):
+    """
+    Write the cache to disk, least recently used entries first.
+    """
+    save_json({"version": CACHE_VERSION, "entries": list(_cache.items())}, cache_path)
+
+def track_new_entries():
+    """
+    Start collecting newly highlighted snippets for take_new_entries.
+    """
+    global _new_entries
+    _new_entries = []
+
+def take_new_entries():
+    """
+    Return the (key, html) entries highlighted since the last call.
+    """
+    global _new_entries
+    if _new_entries is None:
+        return []
+    entries = _new_entries
+    _new_entries = []
+    return entries
+
+def add_entries(entries):
+    """
+    Add entries taken from another process's cache.
+    """
+    for key, html in entries:
+        _cache[key] = html
+    while len(_cache) > MAX_CACHE_ENTRIES:
+        _cache.popitem(last=False)
+
+def clear_cache():
+    global _new_entries
+    _cache.clear()
+    _new_entries = None
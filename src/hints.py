@@ -0,0 +1,134 @@
+import re
+from urllib.parse import urlsplit
+from sitemap import page_url
+from output import load_json, save_json, same_stamp, file_hash
+
+# How many of a page's images to preload, and how many linked pages to prefetch
+MAX_PRELOAD_IMAGES = 2
+MAX_PREFETCH_PAGES = 3
+
+_STYLESHEET_PATTERN = re.compile(r"<link\b[^>]*>")
+_HREF_PATTERN = re.compile(r'href="([^"]*)"')
+
+def template_stylesheets(template_content):
+    """
+    Return the hrefs of the stylesheets a template links to.
+    """
+    hrefs = []
+    for tag in _STYLESHEET_PATTERN.findall(template_content):
+        if 'rel="stylesheet"' not in tag:
+            continue
+        match = _HREF_PATTERN.search(tag)
+        if match:
+            hrefs.append(match.group(1))
+    return hrefs
+
+def link_to_page(url):
+    """
+    Map a root-relative link ("/blog/tom", "/blog/tom/index.html#top") to the
+    site URL of the page it points at ("blog/tom/"), or None for external,
+    relative and non-page links.
+    """
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path.startswith("/"):
+        return None
+    path = parts.path.lstrip("/")
+    if path.endswith(".html"):
+        return page_url(path)
+    if "." in path.rsplit("/", 1)[-1]:
+        # A static file such as /index.css or /images/tom.png
+        return None
+    if path and not path.endswith("/"):
+        path += "/"
+    return path
+
+def count_inbound(page_links):
+    """
+    Count, for each page of the site, how many other pages link to it.
+    page_links maps the URL of every page to the link URLs found while
+    parsing it; links to URLs that are not pages of the site are ignored.
+    """
+    inbound = {url: 0 for url in page_links}
+    for source, links in page_links.items():
+        targets = {link_to_page(link) for link in links}
+        targets.discard(source)
+        for target in targets:
+            if target in inbound:
+                inbound[target] += 1
+    return inbound
+
+def resource_hints(url, refs, inbound, stylesheets):
+    """
+    Build the <link> resource hints for the page at url from the image and
+    link URLs collected while parsing it: preload its stylesheets and first
+    images, and prefetch the pages it links to that the rest of the site
+    links to most.
+    Only pages present in inbound (the pages of the site) are prefetched.
+    """
+    hints = []
+    for href in stylesheets:
+        hints.append(f'<link rel="preload" href="{href}" as="style" />')
+
+    seen = set()
+    for src in refs["images"]:
+        if len(seen) == MAX_PRELOAD_IMAGES:
+            break
+        if src in seen:
+            continue
+        seen.add(src)
+        hints.append(f'<link rel="preload" href="{src}" as="image" />')
+
+    candidates = {}
+    for position, link in enumerate(refs["links"]):
+        target = link_to_page(link)
+        if target is None or target == url or target not in inbound or target in candidates:
+            continue
+        candidates[target] = position
+    ranked = sorted(candidates, key=lambda target: (-inbound[target], candidates[target]))
+    for target in ranked[:MAX_PREFETCH_PAGES]:
+        hints.append(f'<link rel="prefetch" href="/{target}" />')
+
+    return "\n    ".join(hints)
+
+def load_link_graph(graph_path):
+    """
+    Load the stored link graph, or an empty one if there is none yet.
+    """
+    return load_json(graph_path, {})
+
+def save_link_graph(graph, graph_path):
+    """
+    Write the link graph to disk.
+    """
+    save_json(graph, graph_path, sort_keys=True)
+
+def cached_links(graph, source_path, metadata_entry):
+    """
+    Return the links stored for a source file, or None if there are none
+    or the file changed since they were stored. A file whose mtime or size
+    differs is compared by content, since a fresh checkout (such as a link
+    graph shared between the runners of a sharded build) changes every
+    mtime; the entry then takes the new mtime and size.
+    """
+    entry = graph.get(source_path)
+    if entry is None:
+        return None
+    if not same_stamp(entry, metadata_entry):
+        if entry.get("hash") != file_hash(source_path):
+            return None
+        entry["mtime"] = metadata_entry["mtime"]
+        entry["size"] = metadata_entry["size"]
+    return entry["links"]
+
+def record_links(graph, source_path, metadata_entry, links):
+    """
+    Store the links of a source file in the graph, keyed by its mtime,
+    size and content hash so they are only reused while the file is
+    unchanged.
+    """
+    graph[source_path] = {
+        "mtime": metadata_entry["mtime"],
+        "size": metadata_entry["size"],
+        "hash": file_hash(source_path),
+        "links": links,
+    }
@@ -0,0 +1,129 @@
+import os
+import json
+
+class BuildJournal:
+    """
+    Append-only record of the pages a build has finished writing, one JSON
+    line per source file with its page record for every target. A page is
+    journaled only once all of its outputs are in place.
+    The first line holds a fingerprint of the build's inputs and options;
+    a resumed build only trusts the journal if the fingerprint still
+    matches, and only the entries whose outputs still exist.
+    writers maps a name for each target (its output directory) to its
+    writer. Whatever a writer added or changed is journaled along with the
+    pages, so that the deploy plan of the build that follows an interrupted
+    one still lists those files even though they are now in place. That
+    holds whether or not the next build resumes.
+    Use as a context manager, or call close() or finish() when done.
+    """
+
+    def __init__(self, journal_path, fingerprint, resume=False, writers=None):
+        self.journal_path = journal_path
+        self.fingerprint = fingerprint
+        self.writers = writers or {}
+        self.completed = {}
+        # Target name -> {output path relative to it: "added" or "changed"}
+        self.outputs = {}
+        self._load(resume)
+        for name, writer in self.writers.items():
+            writer.resume_statuses(self.outputs.get(name, {}))
+        parent = os.path.dirname(journal_path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent, exist_ok=True)
+
+        # Start from a clean copy of what is kept, so that a line cut short
+        # by a crash is never followed by new entries
+        tmp_path = f"{journal_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"fingerprint": fingerprint}) + "\n")
+            if self.outputs:
+                f.write(json.dumps({"outputs": self.outputs}) + "\n")
+            for source, records in self.completed.items():
+                f.write(json.dumps({"source": source, "pages": records}) + "\n")
+        os.replace(tmp_path, journal_path)
+        self.file = open(journal_path, "a")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _load(self, resume):
+        if not os.path.exists(self.journal_path):
+            if resume:
+                print("Nothing to resume: no journal from a previous build")
+            return
+        with open(self.journal_path, "r") as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = {}
+            if resume and header.get("fingerprint") != self.fingerprint:
+                print("Not resuming: the inputs changed since the journaled build")
+                resume = False
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line of an interrupted build may be cut short
+                    break
+                self._merge_outputs(entry.get("outputs", {}))
+                if (
+                    resume
+                    and "source" in entry
+                    and all(os.path.isfile(record["dest"]) for record in entry["pages"])
+                ):
+                    self.completed[entry["source"]] = entry["pages"]
+
+    def _merge_outputs(self, outputs):
+        for name, statuses in outputs.items():
+            target_outputs = self.outputs.setdefault(name, {})
+            for path, status in statuses.items():
+                # The first build to touch a file knows best what it was before
+                target_outputs.setdefault(path, status)
+
+    def _take_outputs(self):
+        outputs = {}
+        for name, writer in self.writers.items():
+            written = writer.take_written()
+            if written:
+                outputs[name] = written
+        self._merge_outputs(outputs)
+        return outputs
+
+    def append(self, source, records):
+        """
+        Record that the outputs of source are all written.
+        """
+        entry = {"source": source, "pages": records}
+        outputs = self._take_outputs()
+        if outputs:
+            entry["outputs"] = outputs
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+
+    def record_outputs(self):
+        """
+        Record the files the writers wrote since the last entry, such as
+        static files.
+        """
+        outputs = self._take_outputs()
+        if outputs:
+            self.file.write(json.dumps({"outputs": outputs}) + "\n")
+            self.file.flush()
+
+    def close(self):
+        """
+        Close the journal, leaving it in place for a later build.
+        """
+        if not self.file.closed:
+            self.file.close()
+
+    def finish(self):
+        """
+        Close the journal and delete it: the build completed, so there is
+        nothing left to resume.
+        """
+        self.close()
+        os.remove(self.journal_path)
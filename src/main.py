@@ -1,14 +1,69 @@
 import os
+import re
 import sys
 import shutil
-from textnode import markdown_to_html_node, extract_title
+import json
+import hashlib
+import time
+import argparse
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from textnode import markdown_to_html, extract_title, new_page_refs
+from hints import (template_stylesheets, count_inbound, resource_hints,
+                   load_link_graph, save_link_graph, cached_links, record_links)
+from sitemap import page_url, load_index, save_index, update_index, write_sitemaps, write_feed
+from output import OutputWriter, write_text_file, save_json, save_deploy_plan
+from highlight import (load_cache as load_highlight_cache, save_cache as save_highlight_cache,
+                       track_new_entries as track_new_highlights, take_new_entries as take_new_highlights,
+                       add_entries as add_highlights)
+from shard import parse_shard, assign_shards, write_manifest, hash_tree, merge_shards, MANIFEST_NAME
+from server import serve, serve_archive
+from archive import ArchiveWriter
+from budget import Weights, parse_size, parse_budgets, weight_report, format_report, resource_path
+from pathfilter import PathFilter
+from siteindex import SiteIndex
+from precache import (service_worker_script, load_precache_state, save_precache_state, hash_static_files,
+                      update_page_state, precache_entries, write_service_worker)
+from journal import BuildJournal
+from check import find_markdown_files, check_files, format_error
+from schedule import (load_render_times, save_render_times, pool_size, estimate_costs, make_batches,
+                      lower_bound)
+from generations import stage_generation, publish_generation, rollback
+from metadata import split_front_matter, load_metadata_index, save_metadata_index, refresh_metadata_index
 
-def copy_directory(src_path, dest_path):
+# Build state kept between runs (sitemap index, ...)
+CACHE_DIR = ".cache"
+SITEMAP_INDEX_PATH = os.path.join(CACHE_DIR, "sitemap.json")
+METADATA_INDEX_PATH = os.path.join(CACHE_DIR, "metadata.json")
+DEPLOY_PLAN_PATH = os.path.join(CACHE_DIR, "deploy-plan.json")
+HIGHLIGHT_CACHE_PATH = os.path.join(CACHE_DIR, "highlight.json")
+WEIGHT_REPORT_PATH = os.path.join(CACHE_DIR, "weight-report.json")
+LINK_GRAPH_PATH = os.path.join(CACHE_DIR, "links.json")
+PRECACHE_STATE_PATH = os.path.join(CACHE_DIR, "precache.json")
+JOURNAL_PATH = os.path.join(CACHE_DIR, "journal.jsonl")
+RENDER_TIMES_PATH = os.path.join(CACHE_DIR, "render-times.json")
+
+# Pages are parsed on the workers in batches of at most this many, with at
+# most this many batches per worker out at a time, so however large the
+# site only a bounded number of parsed pages is held in memory
+MAX_PAGES_PER_BATCH = 32
+BATCHES_IN_FLIGHT_PER_JOB = 2
+
+# Root-relative URLs that get the basepath: href and src attributes, and
+# the service worker registration
+_ROOT_URL_PATTERN = re.compile(r'(?<=href=")/|(?<=src=")/|(?<=register\(")/')
+
+def copy_directory(src_path, dest_path, writer=None, only=None):
     """
     Recursively copy all contents from src_path to dest_path.
+    With a writer, files whose content is already in place are not rewritten.
+    If only is given (a set of "/"-separated paths relative to src_path),
+    just those files are copied and subdirectories holding none of them
+    are skipped without being listed.
     """
     # Create the destination directory if it doesn't exist
-    if not os.path.exists(dest_path):
+    # (a writer creates directories itself, only where it writes files)
+    if writer is None and not os.path.exists(dest_path):
         os.mkdir(dest_path)
         print(f"Created directory: {dest_path}")
 
@@ -18,83 +73,873 @@ def copy_directory(src_path, dest_path):
         dest_item = os.path.join(dest_path, item)
 
         if os.path.isfile(src_item):
-            shutil.copy(src_item, dest_item)
+            if only is not None and item not in only:
+                continue
+            if writer is None:
+                shutil.copy(src_item, dest_item)
+            elif not writer.copy_file(src_item, dest_item):
+                continue
             print(f"Copied file: {src_item} -> {dest_item}")
         else:
+            sub_only = None
+            if only is not None:
+                sub_only = {path[len(item) + 1:] for path in only if path.startswith(item + "/")}
+                if not sub_only:
+                    continue
             # Recursively copy subdirectory
-            copy_directory(src_item, dest_item)
+            copy_directory(src_item, dest_item, writer, sub_only)
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
+def read_template(template_path, cache=None):
     """
-    Generate an HTML page from a markdown file using a template.
+    Read a template file, through cache (a dict of path -> content) if given.
     """
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    if cache is not None and template_path in cache:
+        return cache[template_path]
+    with open(template_path, "r") as f:
+        template_content = f.read()
+    if cache is not None:
+        cache[template_path] = template_content
+    return template_content
 
+def render_content(from_path, template_path, meta=None, refs=None):
+    """
+    Parse a markdown file into the HTML for its body.
+    meta is the page's entry from the metadata index; if it is not given,
+    the front matter of the file is used. If refs is given, the image and
+    link URLs of the page are collected into it.
+    Returns (title, html content, template path the page uses).
+    """
     # Read the markdown file
     with open(from_path, "r") as f:
         markdown_content = f.read()
+    front_matter, markdown_content = split_front_matter(markdown_content)
+    if meta is None:
+        meta = front_matter
 
-    # Read the template file
-    with open(template_path, "r") as f:
-        template_content = f.read()
+    # A page can pick its own template, relative to the default one
+    if meta.get("template"):
+        template_path = os.path.join(os.path.dirname(template_path), meta["template"])
 
     # Convert markdown to HTML
-    html_node = markdown_to_html_node(markdown_content)
-    html_content = html_node.to_html()
+    html_content = markdown_to_html(markdown_content, refs)
+
+    # Take the title from the metadata, falling back to the h1 header
+    title = meta.get("title") or extract_title(markdown_content)
+
+    return title, html_content, template_path
+
+def parse_page(src_path, template_path, meta=None):
+    """
+    Parse one page for generate_pages_for_targets, timing it.
+    Returns (title, html content, template path, refs, CPU seconds taken).
+    CPU time is what the page costs wherever it runs, however busy the
+    machine is with the other workers.
+    """
+    start = time.process_time()
+    refs = new_page_refs()
+    title, html_content, page_template = render_content(src_path, template_path, meta, refs)
+    return title, html_content, page_template, refs, time.process_time() - start
+
+def _init_parse_worker():
+    track_new_highlights()
+
+def _parse_batch(batch, template_path):
+    # Runs in a worker process; the snippets it highlighted go back with
+    # the pages so the parent can keep them in its cache
+    results = [(src_path, parse_page(src_path, template_path, meta)) for src_path, meta in batch]
+    return results, take_new_highlights()
+
+def iter_parse_pages(pages, template_path, jobs=1, render_times=None):
+    """
+    Parse the (source path, meta) pages, on jobs worker processes when
+    there are enough pages to be worth it, and yield (source path, (title,
+    html content, template path, refs)) for each page as soon as it is
+    parsed. Pages are handed out costliest first, by the render times of
+    earlier builds (or their size), with small pages batched together, so
+    that no worker is left with a big page at the end while the others sit
+    idle. Only a few batches per worker are out at a time, so the parsed
+    pages waiting to be used never pile up.
+    render_times is updated with the time each page took.
+    """
+    if render_times is None:
+        render_times = {}
+    sizes = {src_path: os.path.getsize(src_path) for src_path, _ in pages}
+    jobs = pool_size(len(pages), jobs)
+    if jobs == 1:
+        for src_path, meta in pages:
+            result = parse_page(src_path, template_path, meta)
+            render_times[src_path] = {"seconds": result[4], "size": sizes[src_path]}
+            yield src_path, result[:4]
+        return
 
-    # Extract the title
-    title = extract_title(markdown_content)
+    costs = estimate_costs(sizes, render_times)
+    metas = dict(pages)
+    batches = make_batches([src_path for src_path, _ in pages], costs, jobs, MAX_PAGES_PER_BATCH)
+    seconds = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_parse_worker) as pool:
+        queued = iter(batches)
+        pending = set()
+        while True:
+            for batch in islice(queued, jobs * BATCHES_IN_FLIGHT_PER_JOB - len(pending)):
+                batch_pages = [(src_path, metas[src_path]) for src_path in batch]
+                pending.add(pool.submit(_parse_batch, batch_pages, template_path))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results, highlights = future.result()
+                add_highlights(highlights)
+                for src_path, result in results:
+                    seconds.append(result[4])
+                    render_times[src_path] = {"seconds": result[4], "size": sizes[src_path]}
+                    yield src_path, result[:4]
+    elapsed = time.perf_counter() - start
+    print(
+        f"Parsed {len(pages)} pages in {len(batches)} batches on {jobs} workers: "
+        f"{elapsed:.2f}s (ideal {lower_bound(seconds, jobs):.2f}s)"
+    )
 
-    # Replace placeholders in template
+def parse_pages(pages, template_path, jobs=1, render_times=None):
+    """
+    Parse the (source path, meta) pages; see iter_parse_pages.
+    Returns a dict of source path -> (title, html content, template path, refs).
+    """
+    return dict(iter_parse_pages(pages, template_path, jobs, render_times))
+
+def fill_placeholders(template_content, title, html_content, hints="", nav="", breadcrumbs="",
+                      service_worker=""):
+    """
+    Put a page's title, content, resource hints, navigation and service
+    worker registration into its template. URLs are left root-relative.
+    """
     full_html = template_content.replace("{{ Title }}", title)
+    full_html = full_html.replace("{{ Hints }}", hints)
+    full_html = full_html.replace("{{ Nav }}", nav)
+    full_html = full_html.replace("{{ Breadcrumbs }}", breadcrumbs)
+    full_html = full_html.replace("{{ ServiceWorker }}", service_worker)
     full_html = full_html.replace("{{ Content }}", html_content)
+    return full_html
+
+def mark_root_urls(full_html):
+    """
+    Split a page at the leading "/" of each of its root-relative URLs, so
+    that the page for any basepath is the pieces joined with the basepath.
+    """
+    return _ROOT_URL_PATTERN.split(full_html)
+
+def fill_template(template_content, title, html_content, basepath="/", hints="", nav="", breadcrumbs="",
+                  service_worker=""):
+    """
+    Put a page's title, content, resource hints, navigation and service
+    worker registration into its template, with root paths under basepath.
+    """
+    full_html = fill_placeholders(template_content, title, html_content, hints, nav, breadcrumbs, service_worker)
+    return basepath.join(mark_root_urls(full_html))
 
-    # Replace root paths with basepath
-    full_html = full_html.replace('href="/', f'href="{basepath}')
-    full_html = full_html.replace('src="/', f'src="{basepath}')
+def render_page(from_path, template_path, basepath="/", meta=None):
+    """
+    Render a markdown file into a full HTML page using a template.
+    Without the rest of the site at hand, only preload hints are added
+    and the navigation is left empty.
+    Returns (title, html, template path actually used).
+    """
+    refs = new_page_refs()
+    title, html_content, template_path = render_content(from_path, template_path, meta, refs)
+    template_content = read_template(template_path)
+    hints = resource_hints(None, refs, {}, template_stylesheets(template_content))
+    return title, fill_template(template_content, title, html_content, basepath, hints), template_path
 
-    # Create destination directory if needed
-    dest_dir = os.path.dirname(dest_path)
-    if dest_dir and not os.path.exists(dest_dir):
-        os.makedirs(dest_dir)
+def write_page(from_path, dest_path, title, full_html, writer=None):
+    """
+    Write a rendered page and return the record describing it.
+    """
+    write_text_file(dest_path, full_html, writer)
+    data = full_html.encode("utf-8")
+    return {
+        "source": from_path,
+        "dest": dest_path,
+        "title": title,
+        "hash": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+    }
 
-    # Write the output file
-    with open(dest_path, "w") as f:
-        f.write(full_html)
+def generate_page(from_path, template_path, dest_path, basepath="/", meta=None, writer=None):
+    """
+    Generate an HTML page from a markdown file using a template.
+    Returns a record describing the generated page.
+    """
+    title, full_html, template_path = render_page(from_path, template_path, basepath, meta)
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    return write_page(from_path, dest_path, title, full_html, writer)
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/"):
+def discover_pages(dir_path_content, dest_dir_path, url_prefix="", path_filter=None):
     """
-    Recursively generate HTML pages from all markdown files in a directory.
+    Recursively find all markdown files in a directory.
+    With a path_filter, only the files it selects are returned and
+    subdirectories it rules out are not descended into.
+    Returns a list of (source path, destination .html path, site URL) triples.
     """
-    for item in os.listdir(dir_path_content):
+    found = []
+    for item in sorted(os.listdir(dir_path_content)):
         src_path = os.path.join(dir_path_content, item)
 
         if os.path.isfile(src_path):
             # Convert .md files to .html
             if item.endswith(".md"):
+                if path_filter is not None and not path_filter.includes_file(url_prefix + item):
+                    continue
                 dest_file = item[:-3] + ".html"
-                dest_path = os.path.join(dest_dir_path, dest_file)
-                generate_page(src_path, template_path, dest_path, basepath)
+                url = page_url(url_prefix + dest_file)
+                found.append((src_path, os.path.join(dest_dir_path, dest_file), url))
         else:
+            if path_filter is not None and not path_filter.includes_dir(url_prefix + item):
+                continue
             # Recursively process subdirectories
             new_dest_dir = os.path.join(dest_dir_path, item)
-            generate_pages_recursive(src_path, template_path, new_dest_dir, basepath)
+            found.extend(discover_pages(src_path, new_dest_dir, url_prefix + item + "/", path_filter))
+    return found
 
-def main():
-    # Get basepath from CLI argument, default to "/"
-    basepath = "/"
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+def generate_pages(sources, template_path, basepath="/", metadata=None, include_drafts=False, writer=None,
+                   site_links=None, site_index=None, service_worker=False):
+    """
+    Generate an HTML page for each (source, destination, URL) triple.
+    See generate_pages_for_targets, which this calls with a single target.
+    Returns the list of page records.
+    """
+    targets = [(basepath, None, writer)]
+    return generate_pages_for_targets(sources, template_path, targets, metadata, include_drafts, site_links,
+                                      site_index, service_worker)[0]
+
+def generate_pages_for_targets(sources, template_path, targets, metadata=None, include_drafts=False,
+                               site_links=None, site_index=None, service_worker=False, base_dir=None,
+                               journal=None, jobs=1, render_times=None):
+    """
+    Generate an HTML page for each (source, destination, URL) triple, once
+    for each (basepath, output directory, writer) target. Destinations are
+    under base_dir and are moved under each target's output directory; a
+    target directory of None writes them where they are.
+    Every page is parsed and filled into its template once. Its root-relative
+    URLs are marked, so each target only costs joining the pieces with its
+    basepath and writing the result. With a journal, each page is
+    recorded in it once it is written for every target.
+    If a metadata index is given, titles come from it and drafts are
+    skipped unless include_drafts is set.
+    The resource hints of each page rank the pages it links to by the
+    links of the whole site, so those are collected first. site_links maps
+    page URLs to their links, such as the ones stored in the link graph
+    (see site_page_links); the pages it does not cover are parsed once for
+    their links before any page is written. Pages are then parsed again
+    and written one at a time as they come, so only a bounded number of
+    them is held in memory however large the site.
+    With a site_index, the navigation and breadcrumbs of each page are
+    filled in from it. With service_worker, pages register the service
+    worker. Pages are parsed on jobs processes; see iter_parse_pages.
+    Returns a list of page records for each target, in the order of
+    sources; the records also list
+    the stylesheets, images and links each page references, the hash of
+    its title and content alone, and its front matter date if it has one.
+    """
+    to_parse = []
+    for src_path, dest_path, url in sources:
+        meta = None
+        if metadata is not None and src_path in metadata:
+            meta = metadata[src_path]["meta"]
+            if meta.get("draft") and not include_drafts:
+                print(f"Skipping draft: {src_path}")
+                continue
+        to_parse.append((src_path, dest_path, url, meta))
+    by_source = {page[0]: page for page in to_parse}
+
+    # Pass 1: the links of the pages site_links does not cover
+    page_links = dict(site_links) if site_links else {}
+    unknown = [(src_path, meta) for src_path, _, url, meta in to_parse if url not in page_links]
+    for src_path, (_, _, _, refs) in iter_parse_pages(unknown, template_path, jobs):
+        page_links[by_source[src_path][2]] = refs["links"]
+    inbound = count_inbound(page_links)
+
+    # Pass 2: parse each page, add resource hints, fill its template and
+    # write it, as the pages come in
+    templates = {}
+    pages = [[] for _ in targets]
+    registration = service_worker_script() if service_worker else ""
+    parsed = iter_parse_pages([(page[0], page[3]) for page in to_parse], template_path, jobs, render_times)
+    for src_path, (title, html_content, page_template, refs) in parsed:
+        _, dest_path, url, meta = by_source[src_path]
+        print(f"Generating page from {src_path} to {dest_path} using {page_template}")
+        # The page's own content, apart from the navigation and hints that
+        # change along with other pages
+        content_hash = hashlib.sha256(f"{title}\n{html_content}".encode("utf-8")).hexdigest()
+        template_content = read_template(page_template, templates)
+        stylesheets = template_stylesheets(template_content)
+        hints = resource_hints(url, refs, inbound, stylesheets)
+        nav = breadcrumbs = ""
+        if site_index is not None:
+            nav = site_index.nav(url)
+            breadcrumbs = site_index.breadcrumbs(url)
+        full_html = fill_placeholders(template_content, title, html_content, hints, nav, breadcrumbs,
+                                      registration)
+        pieces = mark_root_urls(full_html)
+        for (basepath, dest_dir, writer), target_pages in zip(targets, pages):
+            target_path = dest_path
+            if dest_dir is not None:
+                target_path = os.path.join(dest_dir, os.path.relpath(dest_path, base_dir))
+            page = write_page(src_path, target_path, title, basepath.join(pieces), writer)
+            page["stylesheets"] = stylesheets
+            page["images"] = refs["images"]
+            page["links"] = refs["links"]
+            page["content_hash"] = content_hash
+            if meta and meta.get("date"):
+                page["date"] = meta["date"]
+            target_pages.append(page)
+        if journal is not None:
+            journal.append(src_path, [target_pages[-1] for target_pages in pages])
+
+    # Workers finish pages out of order
+    order = {page[0]: i for i, page in enumerate(to_parse)}
+    for target_pages in pages:
+        target_pages.sort(key=lambda page: order[page["source"]])
+    return pages
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/",
+                             metadata=None, include_drafts=False, writer=None, path_filter=None):
+    """
+    Recursively generate HTML pages from all markdown files in a directory,
+    or only from those selected by path_filter.
+    Returns the list of page records produced by generate_page.
+    """
+    sources = discover_pages(dir_path_content, dest_dir_path, path_filter=path_filter)
+    return generate_pages(sources, template_path, basepath, metadata, include_drafts, writer)
+
+def source_url(src_path, content_dir):
+    """
+    Return the site URL of the page built from a markdown file.
+    """
+    rel_path = os.path.relpath(src_path, content_dir)
+    return page_url(rel_path[:-len(".md")] + ".html")
+
+def site_page_links(metadata, graph, content_dir, template_path, include_drafts=False, jobs=1):
+    """
+    Collect the links of every page of the site, which the resource hints
+    of each page are ranked by. Links stored in the link graph are reused
+    while their file is unchanged; the other pages are parsed (but not
+    written) on jobs processes and their links stored in the graph.
+    Returns (dict of site URL -> links, number of pages parsed).
+    """
+    site_links = {}
+    to_parse = []
+    for src_path, entry in metadata.items():
+        if entry["meta"].get("draft") and not include_drafts:
+            continue
+        links = cached_links(graph, src_path, entry)
+        if links is None:
+            # A partial build keeps the index entries of the pages it does not
+            # look at, which may have been deleted since
+            if os.path.exists(src_path):
+                to_parse.append((src_path, entry["meta"]))
+        else:
+            site_links[source_url(src_path, content_dir)] = links
+    for src_path, (_, _, _, refs) in iter_parse_pages(to_parse, template_path, jobs):
+        record_links(graph, src_path, metadata[src_path], refs["links"])
+        site_links[source_url(src_path, content_dir)] = refs["links"]
+    return site_links, len(to_parse)
+
+def refresh_link_graph(metadata, include_drafts=False, jobs=1):
+    """
+    Bring the stored link graph up to date with the pages of the site.
+    Returns the links of every page; see site_page_links.
+    """
+    graph = load_link_graph(LINK_GRAPH_PATH)
+    try:
+        site_links, parsed = site_page_links(metadata, graph, "content", "template.html", include_drafts, jobs)
+    finally:
+        # Whatever was parsed before an interruption is not parsed again
+        save_link_graph({path: graph[path] for path in metadata if path in graph}, LINK_GRAPH_PATH)
+    print(f"Link graph: {len(site_links)} pages, {parsed} parsed")
+    return site_links, parsed
+
+def static_references(pages, dest_dir):
+    """
+    Return the output paths (relative to dest_dir, "/"-separated) of the
+    stylesheets, images and other files the pages reference.
+    """
+    referenced = set()
+    for page in pages:
+        url = page_url(os.path.relpath(page["dest"], dest_dir))
+        for href in page["stylesheets"] + page["images"] + page["links"]:
+            path = resource_path(url, href, dest_dir)
+            if path is not None:
+                referenced.add(os.path.relpath(path, dest_dir).replace(os.sep, "/"))
+    return referenced
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site")
+    parser.add_argument("basepath", nargs="?", default="/",
+                        help="root path the site is served from (default: /)")
+    parser.add_argument("--output", default=None,
+                        help="output directory (default: docs, or docs-shard-i-of-n with --shard)")
+    parser.add_argument("--target", action="append", default=[], metavar="BASEPATH=DIR",
+                        help="build for this basepath into DIR; repeat to build several variants "
+                             "from one parse of the site (replaces basepath and --output)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted build, skipping the pages it already wrote")
+    parser.add_argument("--jobs", type=int, default=None, metavar="N",
+                        help="number of processes to parse pages with (default: one per CPU)")
+    parser.add_argument("--atomic", action="store_true",
+                        help="build into a staging copy of the output and swap it in when done; "
+                             "the output directory becomes a link to the live generation")
+    parser.add_argument("--keep-generations", type=int, default=3, metavar="N",
+                        help="with --atomic, keep N previous generations for rollback (default: 3)")
+    parser.add_argument("--output-archive", default=None, metavar="SITE.zip|SITE.tar",
+                        help="write the whole site into one archive instead of a directory")
+    parser.add_argument("--site-url", default="",
+                        help="absolute site origin, e.g. https://example.com; "
+                             "enables sitemap.xml and feed.xml")
+    parser.add_argument("--drafts", action="store_true",
+                        help="also build pages marked draft in their front matter")
+    parser.add_argument("--shard", default=None, metavar="I/N",
+                        help="only build shard I of N of the pages, with a partial manifest. Every shard "
+                             "needs the links of the whole site: run `main.py links` once first and give "
+                             "every shard a copy of .cache/links.json, or each one parses the whole site")
+    parser.add_argument("--shard-by", choices=["hash", "cost"], default="hash",
+                        help="split shards by path hash or by recorded cost (default: hash)")
+    parser.add_argument("--weight-report", action="store_true",
+                        help="report the HTML, CSS and image weight of every page")
+    parser.add_argument("--budget", action="append", default=[], metavar="KIND=SIZE",
+                        help="transfer weight budget per page for html, css, images or total, "
+                             "e.g. images=500KB (implies --weight-report)")
+    parser.add_argument("--fail-over-budget", action="store_true",
+                        help="fail the build if a page goes over budget (implies --weight-report)")
+    parser.add_argument("--only", action="append", default=[], metavar="GLOB",
+                        help="only build the pages matching GLOB (relative to content/, e.g. 'blog/*'); "
+                             "static files are copied only if those pages reference them. Only the "
+                             "selected files are scanned: menus and the links of the other pages come "
+                             "from .cache as of the last build that saw them, so changes outside the "
+                             "selection show up on the next full build. Without a .cache, the first "
+                             "partial build scans and parses the whole site (`main.py links` does it ahead)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="do not build the pages matching GLOB (relative to content/)")
+    parser.add_argument("--service-worker", action="store_true",
+                        help="emit a service worker and a precache manifest of the pages and static files")
+    parser.add_argument("--precache-include", action="append", default=[], metavar="GLOB",
+                        help="only precache output files matching GLOB (e.g. '*.css')")
+    parser.add_argument("--precache-exclude", action="append", default=[], metavar="GLOB",
+                        help="do not precache output files matching GLOB")
+    parser.add_argument("--precache-max-file-size", default=None, metavar="SIZE",
+                        help="do not precache files larger than SIZE (e.g. 500KB)")
+    parser.add_argument("--precache-max-total-size", default=None, metavar="SIZE",
+                        help="stop adding files once the precache reaches SIZE")
+    return parser.parse_args(argv)
+
+def parse_merge_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py merge",
+                                     description="Merge shard build outputs into one site")
+    parser.add_argument("shard_dirs", nargs="+", help="output directories of the shard builds")
+    parser.add_argument("--output", default="docs", help="merged output directory (default: docs)")
+    parser.add_argument("--basepath", default="/", help="root path the site is served from (default: /)")
+    parser.add_argument("--site-url", default="",
+                        help="absolute site origin; enables sitemap.xml and feed.xml")
+    return parser.parse_args(argv)
+
+def parse_rollback_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py rollback",
+                                     description="Point the output back at an earlier generation")
+    parser.add_argument("--output", default="docs", help="output directory (default: docs)")
+    parser.add_argument("--to", type=int, default=None, metavar="N",
+                        help="generation to go back to (default: the one before the live one)")
+    return parser.parse_args(argv)
+
+def parse_check_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py check",
+                                     description="Check that every markdown file parses, writing nothing")
+    parser.add_argument("paths", nargs="*", default=["content"],
+                        help="markdown files or directories to check (default: content)")
+    parser.add_argument("--jobs", type=int, default=None, metavar="N",
+                        help="number of processes to check with (default: one per CPU)")
+    return parser.parse_args(argv)
+
+def parse_links_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py links",
+                                     description="Refresh the link graph the resource hints are ranked by "
+                                                 "(.cache/links.json), writing no pages")
+    parser.add_argument("--drafts", action="store_true",
+                        help="also include pages marked draft in their front matter")
+    parser.add_argument("--jobs", type=int, default=None, metavar="N",
+                        help="number of processes to parse with (default: one per CPU)")
+    return parser.parse_args(argv)
+
+def parse_serve_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py serve",
+                                     description="Preview the site, rendering pages on request")
+    parser.add_argument("basepath", nargs="?", default="/",
+                        help="root path the site is served from (default: /)")
+    parser.add_argument("--host", default="localhost", help="interface to listen on (default: localhost)")
+    parser.add_argument("--port", type=int, default=8888, help="port to listen on (default: 8888)")
+    parser.add_argument("--archive", default=None, metavar="SITE.zip|SITE.tar",
+                        help="serve a built site archive instead of rendering content/")
+    return parser.parse_args(argv)
+
+def write_site_maps(pages, dest_dir, site_url, basepath, writer=None, index_path=SITEMAP_INDEX_PATH):
+    """
+    Refresh the stored sitemap index from this build's pages and write
+    sitemap.xml and the blog feed from it.
+    """
+    index = update_index(load_index(index_path), pages, dest_dir)
+    save_index(index, index_path)
+    write_sitemaps(index, dest_dir, site_url, basepath, writer)
+    write_feed(index, dest_dir, site_url, basepath, writer=writer)
+
+def report_weights(pages, weights, dest_dir, budgets, report_path=WEIGHT_REPORT_PATH):
+    """
+    Print the page weight report, save it as JSON and return the number of
+    pages over budget.
+    """
+    report = weight_report(pages, weights, dest_dir, budgets)
+    save_json(report, report_path, indent=1)
+    print(format_report(report))
+    over = [entry for entry in report if entry["over"]]
+    print(f"Page weight: {len(over)} of {len(report)} pages over budget -> {report_path}")
+    return len(over)
+
+def write_precache(pages, site_paths, dest_dir, writer, args, state_path=PRECACHE_STATE_PATH):
+    """
+    Update the stored hashes of the site's pages and static files and
+    write the service worker and its precache manifest. site_paths are the
+    output paths of all the pages of the site, relative to dest_dir.
+    """
+    state = load_precache_state(state_path)
+    state["pages"] = update_page_state(state["pages"], pages, site_paths, dest_dir)
+    state["static"], read_count = hash_static_files(state["static"], "static")
+    save_precache_state(state, state_path)
+
+    path_filter = None
+    if args.precache_include or args.precache_exclude:
+        path_filter = PathFilter(args.precache_include, args.precache_exclude)
+    try:
+        max_file_size = parse_size(args.precache_max_file_size) if args.precache_max_file_size else None
+        max_total_size = parse_size(args.precache_max_total_size) if args.precache_max_total_size else None
+    except ValueError as e:
+        sys.exit(str(e))
+    entries, skipped = precache_entries(state, "static", path_filter, max_file_size, max_total_size)
+    version = write_service_worker(entries, dest_dir, writer)
+    print(
+        f"Precache manifest {version}: {len(entries)} files, {skipped} over the size caps, "
+        f"{read_count} static files hashed"
+    )
+
+def finish_output(writer, delete_stale=True, plan_path=DEPLOY_PLAN_PATH):
+    """
+    Delete stale output and record what actually changed, so the deploy
+    only uploads the delta.
+    """
+    plan = writer.finish(delete_stale)
+    save_deploy_plan(plan, plan_path)
+    print(
+        f"Deploy plan: {len(plan['added'])} added, {len(plan['changed'])} changed, "
+        f"{len(plan['deleted'])} deleted, {plan['unchanged']} unchanged -> {plan_path}"
+    )
+
+def build_fingerprint(args, metadata, template_path):
+    """
+    Hash everything the pages of a build depend on: the options, the
+    markdown files (by mtime and size, as in the metadata index) and the
+    templates. A journal is only resumed while this stays the same.
+    """
+    templates = {template_path}
+    for entry in metadata.values():
+        if entry["meta"].get("template"):
+            templates.add(os.path.join(os.path.dirname(template_path), entry["meta"]["template"]))
+    template_stats = {}
+    for path in sorted(templates):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            template_stats[path] = [stat.st_mtime_ns, stat.st_size]
+    options = {
+        key: value for key, value in sorted(vars(args).items())
+        if key not in ("resume", "jobs", "weight_report", "budget", "fail_over_budget")
+    }
+    inputs = {
+        "options": options,
+        "pages": {path: [entry["mtime"], entry["size"]] for path, entry in metadata.items()},
+        "templates": template_stats,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+def parse_targets(specs):
+    """
+    Parse BASEPATH=DIR target options into (basepath, output directory) pairs.
+    """
+    targets = []
+    for spec in specs:
+        basepath, sep, dest_dir = spec.partition("=")
+        if not sep or not basepath or not dest_dir:
+            raise ValueError(f"Invalid target: {spec!r} (expected BASEPATH=DIR, e.g. /=public)")
+        targets.append((basepath, dest_dir))
+    if len({dest_dir for _, dest_dir in targets}) != len(targets):
+        raise ValueError("Every --target needs its own output directory")
+    return targets
 
-    # Delete docs directory if it exists to ensure clean copy
-    if os.path.exists("docs"):
-        shutil.rmtree("docs")
-        print("Deleted existing docs directory")
+def target_cache_path(path, dest_dir, multi_target):
+    """
+    Return where a target keeps its copy of per-output build state
+    (sitemap index, deploy plan, ...). A single-target build uses path
+    as is; with several targets, each gets its own file.
+    """
+    if not multi_target:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{re.sub(r'[^A-Za-z0-9]+', '-', dest_dir).strip('-')}{ext}"
+
+def build(args):
+    shard = parse_shard(args.shard) if args.shard else None
+    dest_dir = args.output
+    if dest_dir is None:
+        dest_dir = f"docs-shard-{shard[0]}-of-{shard[1]}" if shard else "docs"
+
+    multi_target = bool(args.target)
+    if multi_target:
+        if shard is not None or args.output_archive:
+            sys.exit("--target cannot be combined with --shard or --output-archive")
+        try:
+            targets = parse_targets(args.target)
+        except ValueError as e:
+            sys.exit(str(e))
+    else:
+        targets = [(args.basepath, dest_dir)]
+
+    path_filter = None
+    if args.only or args.exclude:
+        if shard is not None or args.output_archive:
+            sys.exit("--only and --exclude cannot be combined with --shard or --output-archive")
+        path_filter = PathFilter(args.only, args.exclude)
+
+    if args.service_worker and shard is not None:
+        sys.exit("--service-worker cannot be combined with --shard")
+
+    report = args.weight_report or args.budget or args.fail_over_budget
+    if report:
+        if shard is not None:
+            sys.exit("--weight-report cannot be combined with --shard")
+        try:
+            budgets = parse_budgets(args.budget)
+        except ValueError as e:
+            sys.exit(str(e))
+
+    if args.output_archive and shard is not None:
+        sys.exit("--output-archive cannot be combined with --shard")
+
+    if args.resume and (args.output_archive or report):
+        sys.exit("--resume cannot be combined with --output-archive or --weight-report")
+
+    if args.jobs is not None and args.jobs < 1:
+        sys.exit("--jobs must be at least 1")
+    jobs = args.jobs or os.cpu_count() or 1
+
+    # out_dirs are where each target is written. With --atomic that is a
+    # staging copy of the live output; targets keep naming the live
+    # directories, which the per-target build state is kept under
+    out_dirs = [target_dir for _, target_dir in targets]
+    if args.atomic:
+        if shard is not None or args.output_archive:
+            sys.exit("--atomic cannot be combined with --shard or --output-archive")
+        if args.keep_generations < 0:
+            sys.exit("--keep-generations cannot be negative")
+        out_dirs = [stage_generation(target_dir, args.resume) for target_dir in out_dirs]
+
+    writers = []
+    for target_dir in out_dirs:
+        # Filled in by the writer as it writes, so no file is read twice
+        weights = Weights() if report else None
+        if args.output_archive:
+            # Everything is streamed into the archive; dest_dir only names paths
+            writers.append(ArchiveWriter(args.output_archive, target_dir, weights))
+        else:
+            # Files already in the output are only rewritten if their content changes;
+            # whatever this build does not produce is deleted at the end
+            writers.append(OutputWriter(target_dir, weights))
+
+    # Refresh page metadata, reading only files that changed since last build.
+    # A partial build only looks at the files it selects and takes the rest
+    # of the site from the index; without an index it scans the whole site once
+    stored = load_metadata_index(METADATA_INDEX_PATH)
+    scan_filter = path_filter if stored else None
+    metadata, read_count = refresh_metadata_index(stored, "content", scan_filter)
+    save_metadata_index(metadata, METADATA_INDEX_PATH)
+    print(f"Metadata index: {len(metadata)} pages, {read_count} read")
+
+    # One pass over content/ finds the pages and builds the navigation tree;
+    # a partial build still needs the whole tree for its menus, which
+    # SiteIndex fills in from the metadata index where scan_filter prunes
+    base_dir = out_dirs[0]
+    site_index = SiteIndex("content", base_dir, metadata, args.drafts, scan_filter)
+    sources = site_index.sources(path_filter)
+    if shard is not None:
+        costs = None
+        if args.shard_by == "cost":
+            costs = {path: entry["size"] for path, entry in metadata.items()}
+        shards = assign_shards([page[0] for page in sources], shard[1], "content", costs)
+        sources = [page for page in sources if shards[page[0]] == shard[0]]
+        print(f"Shard {shard[0]}/{shard[1]}: {len(sources)} pages")
 
-    # Copy static to docs
-    copy_directory("static", "docs")
+    # The links of every page count towards the resource hints of the
+    # others, including the pages a partial or shard build leaves out
+    site_links, parsed = refresh_link_graph(metadata, args.drafts, jobs)
+    if shard is not None and parsed:
+        print(f"Parsed {parsed} pages for their links: run `main.py links` once before sharding "
+              f"and give every shard a copy of {LINK_GRAPH_PATH}")
+    if path_filter is not None:
+        print(f"Partial build: {len(sources)} pages")
 
-    # Generate all pages recursively
-    generate_pages_recursive("content", "template.html", "docs", basepath)
+    # Every page written is journaled, so an interrupted build can be
+    # resumed with --resume; pages the journal lists are not built again.
+    # Pages are parsed and written one after the other, so an interruption
+    # only loses the pages in flight; the pages parsed above for their
+    # links are kept in the link graph.
+    # It also records what the writers added or changed, which the deploy
+    # plan of the next build still has to list
+    journal_path = target_cache_path(JOURNAL_PATH, targets[0][1], True)
+    journal_writers = {}
+    if not args.output_archive:
+        journal_writers = {target_dir: writer for (_, target_dir), writer in zip(targets, writers)}
+    journal = BuildJournal(journal_path, build_fingerprint(args, metadata, "template.html"), args.resume,
+                           journal_writers)
+    with journal:
+        done = {page[0]: journal.completed[page[0]] for page in sources if page[0] in journal.completed}
+        if done:
+            print(f"Resuming: {len(done)} pages already built, {len(sources) - len(done)} to go")
+            for src_path, dest_path, url in sources:
+                if src_path in done:
+                    for writer, record in zip(writers, done[src_path]):
+                        writer.keep(record["dest"])
+
+        # Copy static files; when sharding, the first shard owns them.
+        # A partial build copies only what its pages reference, once they are built
+        if path_filter is None and (shard is None or shard[0] == 1):
+            for out_dir, writer in zip(out_dirs, writers):
+                copy_directory("static", out_dir, writer)
+        journal.record_outputs()
+
+        # Generate all pages: each is parsed once and written to every target
+        load_highlight_cache(HIGHLIGHT_CACHE_PATH)
+        render_times = load_render_times(RENDER_TIMES_PATH)
+        page_targets = [
+            (basepath, out_dir, writer) for (basepath, _), out_dir, writer in zip(targets, out_dirs, writers)
+        ]
+        remaining = [page for page in sources if page[0] not in done]
+        built = generate_pages_for_targets(remaining, "template.html", page_targets, metadata, args.drafts,
+                                           site_links, site_index, args.service_worker, base_dir, journal,
+                                           jobs, render_times)
+        save_highlight_cache(HIGHLIGHT_CACHE_PATH)
+        save_render_times({path: render_times[path] for path in metadata if path in render_times},
+                          RENDER_TIMES_PATH)
+
+        # Put the journaled pages back in discovery order
+        pages_by_target = []
+        for i, target_pages in enumerate(built):
+            by_source = {page["source"]: page for page in target_pages}
+            by_source.update((src_path, records[i]) for src_path, records in done.items())
+            pages_by_target.append([by_source[page[0]] for page in sources if page[0] in by_source])
+
+        if shard is not None:
+            # Site-wide outputs (sitemap, feed, deploy plan) are left to merge
+            pages = pages_by_target[0]
+            writers[0].finish()
+            write_manifest(dest_dir, shard[0], shard[1], pages, hash_tree(dest_dir))
+            print(f"Wrote shard manifest: {os.path.join(dest_dir, MANIFEST_NAME)}")
+            journal.finish()
+            return
+
+        site_paths = {
+            os.path.relpath(node["dest"], base_dir).replace(os.sep, "/")
+            for node in site_index.nodes.values()
+            if node["source"] is not None
+        }
+        over_budget = 0
+        for (basepath, target_dir), out_dir, writer, pages in zip(targets, out_dirs, writers, pages_by_target):
+            if multi_target:
+                print(f"Target {target_dir} ({basepath}):")
+            if path_filter is not None:
+                copy_directory("static", out_dir, writer, static_references(pages, out_dir))
+                if args.site_url:
+                    print("Skipping sitemap and feed for a partial build")
+            elif args.site_url:
+                index_path = target_cache_path(SITEMAP_INDEX_PATH, target_dir, multi_target)
+                write_site_maps(pages, out_dir, args.site_url, basepath, writer, index_path)
+            if args.service_worker:
+                state_path = target_cache_path(PRECACHE_STATE_PATH, target_dir, multi_target)
+                write_precache(pages, site_paths, out_dir, writer, args, state_path)
+            # A partial build leaves pages and files outside its selection as they are
+            plan_path = target_cache_path(DEPLOY_PLAN_PATH, target_dir, multi_target)
+            journal.record_outputs()
+            finish_output(writer, path_filter is None, plan_path)
+
+            if report:
+                report_path = target_cache_path(WEIGHT_REPORT_PATH, target_dir, multi_target)
+                over_budget += report_weights(pages, writer.weights, out_dir, budgets, report_path)
+
+        if args.atomic:
+            # Every target is complete before any of them goes live
+            for (basepath, target_dir), out_dir in zip(targets, out_dirs):
+                publish_generation(target_dir, out_dir, args.keep_generations)
+
+        journal.finish()
+
+    if over_budget and args.fail_over_budget:
+        sys.exit(f"{over_budget} pages over budget")
+
+def check(args):
+    if args.jobs is not None and args.jobs < 1:
+        sys.exit("--jobs must be at least 1")
+    paths = find_markdown_files(args.paths)
+    errors = check_files(paths, args.jobs)
+    for error in errors:
+        print(format_error(error))
+    if errors:
+        files = len({error[0] for error in errors})
+        sys.exit(f"{len(errors)} errors in {files} of {len(paths)} files")
+    print(f"Checked {len(paths)} files: no errors")
+
+def links(args):
+    if args.jobs is not None and args.jobs < 1:
+        sys.exit("--jobs must be at least 1")
+    metadata, read_count = refresh_metadata_index(load_metadata_index(METADATA_INDEX_PATH), "content")
+    save_metadata_index(metadata, METADATA_INDEX_PATH)
+    print(f"Metadata index: {len(metadata)} pages, {read_count} read")
+    refresh_link_graph(metadata, args.drafts, args.jobs or os.cpu_count() or 1)
+
+def merge(args):
+    writer = OutputWriter(args.output)
+    try:
+        pages = merge_shards(args.shard_dirs, args.output, writer)
+    except ValueError as e:
+        sys.exit(f"Cannot merge shards: {e}")
+    print(f"Merged {len(args.shard_dirs)} shards into {args.output}: {len(pages)} pages")
+    if args.site_url:
+        write_site_maps(pages, args.output, args.site_url, args.basepath, writer)
+    finish_output(writer)
+
+def main():
+    argv = sys.argv[1:]
+    if argv and argv[0] == "merge":
+        merge(parse_merge_args(argv[1:]))
+    elif argv and argv[0] == "check":
+        check(parse_check_args(argv[1:]))
+    elif argv and argv[0] == "links":
+        links(parse_links_args(argv[1:]))
+    elif argv and argv[0] == "rollback":
+        args = parse_rollback_args(argv[1:])
+        try:
+            rollback(args.output, args.to)
+        except ValueError as e:
+            sys.exit(str(e))
+    elif argv and argv[0] == "serve":
+        args = parse_serve_args(argv[1:])
+        if args.archive:
+            serve_archive(args.archive, args.basepath, args.host, args.port)
+        else:
+            serve(render_page, "content", "static", "template.html", args.basepath, args.host, args.port)
+    else:
+        build(parse_args(argv))
 
-main()
+if __name__ == "__main__":
+    main()
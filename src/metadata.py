@@ -0,0 +1,136 @@
+import os
+from output import load_json, save_json, scan_files, refresh_file_index
+
+FRONT_MATTER_FENCE = "---"
+
+def parse_front_matter(text):
+    """
+    Parse YAML-lite front matter: one "key: value" pair per line.
+    "draft" becomes a bool and "tags" a list (either "[a, b]" or "a, b");
+    every other value is kept as a string.
+    """
+    meta = {}
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if ":" not in line:
+            raise ValueError(f"Invalid front matter line: {line}")
+        key, value = line.split(":", 1)
+        key = key.strip()
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        if key == "draft":
+            value = value.lower() in ("true", "yes", "1")
+        elif key == "tags":
+            if value.startswith("[") and value.endswith("]"):
+                value = value[1:-1]
+            value = [tag.strip().strip("\"'") for tag in value.split(",") if tag.strip()]
+        meta[key] = value
+    return meta
+
+def split_front_matter(markdown):
+    """
+    Split a markdown document into its front matter and body.
+    Returns (meta, body); meta is empty if the document has no front matter.
+    """
+    if not markdown.startswith(FRONT_MATTER_FENCE + "\n"):
+        return {}, markdown
+    closing = "\n" + FRONT_MATTER_FENCE + "\n"
+    end = markdown.find(closing, len(FRONT_MATTER_FENCE))
+    if end == -1:
+        if not markdown.endswith(closing[:-1]):
+            raise ValueError("Invalid front matter: no closing ---")
+        end = len(markdown) - len(closing) + 1
+    meta = parse_front_matter(markdown[len(FRONT_MATTER_FENCE) + 1:end])
+    return meta, markdown[end + len(closing):]
+
+def read_metadata(path):
+    """
+    Read the metadata of a markdown file without parsing its body.
+    Only the front matter and, if it has no title, the lines up to the
+    first h1 header are read.
+    """
+    meta = {}
+    with open(path, "r") as f:
+        first_line = f.readline()
+        line = first_line
+        if first_line.rstrip("\n") == FRONT_MATTER_FENCE:
+            front_matter = []
+            for line in f:
+                if line.rstrip("\n") == FRONT_MATTER_FENCE:
+                    break
+                front_matter.append(line)
+            else:
+                raise ValueError(f"Invalid front matter in {path}: no closing ---")
+            try:
+                meta = parse_front_matter("".join(front_matter))
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}") from None
+            line = f.readline()
+        if "title" not in meta:
+            while line:
+                if line.startswith("# "):
+                    meta["title"] = line[2:].strip()
+                    break
+                line = f.readline()
+    return meta
+
+def load_metadata_index(index_path):
+    """
+    Load the stored metadata index, or an empty one if there is none yet.
+    """
+    return load_json(index_path, {})
+
+def save_metadata_index(index, index_path):
+    """
+    Write the metadata index to disk.
+    """
+    save_json(index, index_path, indent=1, sort_keys=True)
+
+def _read_entry(path):
+    return {"meta": read_metadata(path)}
+
+def refresh_metadata_index(index, content_dir, path_filter=None):
+    """
+    Bring the metadata index up to date with the markdown files in
+    content_dir. Only files whose mtime or size changed are re-read;
+    entries for deleted files are dropped.
+    With a path_filter, only the files it selects are looked at, without
+    listing the directories it rules out; the entries of the other files
+    are kept as they are.
+    Returns (new_index, number_of_files_read).
+    """
+    if path_filter is None:
+        return refresh_file_index(index, scan_files(content_dir, ".md"), _read_entry)
+    kept = {}
+    selected = {}
+    for path, entry in index.items():
+        if path_filter.includes_file(os.path.relpath(path, content_dir).replace(os.sep, "/")):
+            selected[path] = entry
+        else:
+            kept[path] = entry
+    new_index, read_count = refresh_file_index(selected, scan_files(content_dir, ".md", path_filter), _read_entry)
+    kept.update(new_index)
+    return kept, read_count
+
+def list_pages(index, section="", tag=None, include_drafts=False):
+    """
+    List (source_path, meta) pairs from the metadata index for the pages
+    under section, optionally filtered by tag. Newest first by date,
+    then by title.
+    """
+    pages = []
+    for path, entry in index.items():
+        meta = entry["meta"]
+        if section and not path.startswith(section):
+            continue
+        if meta.get("draft") and not include_drafts:
+            continue
+        if tag is not None and tag not in meta.get("tags", []):
+            continue
+        pages.append((path, meta))
+    pages.sort(key=lambda page: page[1].get("title", ""))
+    pages.sort(key=lambda page: page[1].get("date", ""), reverse=True)
+    return pages
@@ -0,0 +1,270 @@
+import os
+import json
+import shutil
+import hashlib
+
+class OutputWriter:
+    """
+    Writes build output into dest_dir, leaving files whose content is
+    unchanged untouched so their mtimes are preserved.
+    Keeps track of what was added, changed and left alone, so that files
+    from a previous build that were not produced again can be deleted and
+    a deploy plan can be written at the end.
+    If weights (a budget.Weights) is given, every file written or found
+    already in place is recorded in it.
+    The files an interrupted build added or changed are already in place
+    when the next build runs; resume_statuses() hands their statuses over
+    so that the deploy plan still lists them.
+    """
+
+    def __init__(self, dest_dir, weights=None):
+        self.dest_dir = dest_dir
+        self.weights = weights
+        self.previous = set()
+        if os.path.isdir(dest_dir):
+            for root, _, files in os.walk(dest_dir):
+                for name in files:
+                    self.previous.add(os.path.join(root, name))
+        self.added = []
+        self.changed = []
+        self.unchanged = []
+        self.deleted = []
+        # Relative path -> "added" or "changed", for the files written by
+        # an interrupted build before this one
+        self.resumed = {}
+        # The same for the files this build wrote, until take_written()
+        self.written = {}
+
+    def _record(self, path, existed, same):
+        rel_path = os.path.relpath(path, self.dest_dir)
+        if same:
+            self.unchanged.append(rel_path)
+        elif existed:
+            self.changed.append(rel_path)
+            self.written[rel_path] = "changed"
+        else:
+            self.added.append(rel_path)
+            self.written[rel_path] = "added"
+        self.previous.discard(path)
+
+    def resume_statuses(self, statuses):
+        """
+        Take the statuses (relative path -> "added" or "changed") of the
+        files an interrupted build wrote. They override what this build
+        finds, since the files were already in place when it started.
+        """
+        self.resumed.update(statuses)
+
+    def take_written(self):
+        """
+        Return the statuses of the files written since the last call.
+        """
+        written = self.written
+        self.written = {}
+        return written
+
+    def _make_parent(self, path):
+        parent = os.path.dirname(path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent)
+
+    def _replace(self, path, write):
+        # Write next to the destination and rename into place, so an
+        # interrupted build never leaves a half-written file behind
+        self._make_parent(path)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def keep(self, path):
+        """
+        Count a file already in place as output of this build without
+        reading or rewriting it, e.g. a page written by the interrupted
+        build that this one resumes.
+        """
+        self._record(path, True, True)
+
+    def write_bytes(self, path, data):
+        """
+        Write data to path unless the file already holds exactly that data.
+        Returns True if the file was written.
+        """
+        if self.weights is not None:
+            self.weights.record(path, data)
+        existed = os.path.isfile(path)
+        if existed and os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    self._record(path, existed, True)
+                    return False
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        self._replace(path, write)
+        self._record(path, existed, False)
+        return True
+
+    def write_text(self, path, text):
+        """
+        Write text to path (UTF-8) unless the file already holds it.
+        Returns True if the file was written.
+        """
+        return self.write_bytes(path, text.encode("utf-8"))
+
+    def copy_file(self, src_path, dest_path):
+        """
+        Copy src_path to dest_path unless dest_path already has the same content.
+        Returns True if the file was copied.
+        """
+        if self.weights is not None:
+            # The content is needed for the weights, so write it from memory
+            with open(src_path, "rb") as f:
+                copied = self.write_bytes(dest_path, f.read())
+            if copied:
+                shutil.copymode(src_path, dest_path)
+            return copied
+        existed = os.path.isfile(dest_path)
+        if existed and os.path.getsize(dest_path) == os.path.getsize(src_path):
+            with open(src_path, "rb") as src, open(dest_path, "rb") as dest:
+                if src.read() == dest.read():
+                    self._record(dest_path, existed, True)
+                    return False
+        self._replace(dest_path, lambda tmp_path: shutil.copy(src_path, tmp_path))
+        self._record(dest_path, existed, False)
+        return True
+
+    def finish(self, delete_stale=True):
+        """
+        Delete files left over from the previous build that were not produced
+        this time, along with any directories that became empty. A partial
+        build passes delete_stale=False to leave them in place.
+        Returns the deploy plan.
+        """
+        if not delete_stale:
+            self.previous = set()
+            return self.plan()
+        for path in sorted(self.previous):
+            os.remove(path)
+            rel_path = os.path.relpath(path, self.dest_dir)
+            # A file only the interrupted build added was never deployed
+            if self.resumed.get(rel_path) != "added":
+                self.deleted.append(rel_path)
+            print(f"Deleted stale file: {path}")
+        self.previous = set()
+
+        for root, dirs, files in os.walk(self.dest_dir, topdown=False):
+            if root != self.dest_dir and not os.listdir(root):
+                os.rmdir(root)
+        return self.plan()
+
+    def plan(self):
+        """
+        Return the added, changed and deleted files (relative to dest_dir).
+        """
+        statuses = {"added": [], "changed": [], "unchanged": []}
+        for status in statuses:
+            for rel_path in getattr(self, status):
+                statuses[self.resumed.get(rel_path, status)].append(rel_path)
+        return {
+            "added": sorted(statuses["added"]),
+            "changed": sorted(statuses["changed"]),
+            "deleted": sorted(self.deleted),
+            "unchanged": len(statuses["unchanged"]),
+        }
+
+def write_text_file(path, text, writer=None):
+    """
+    Write text to path, through writer when one is given.
+    """
+    if writer is not None:
+        writer.write_text(path, text)
+        return
+    parent = os.path.dirname(path)
+    if parent and not os.path.exists(parent):
+        os.makedirs(parent)
+    with open(path, "w") as f:
+        f.write(text)
+
+def scan_files(dir_path, suffix="", path_filter=None, rel_dir=""):
+    """
+    Yield the os.DirEntry of every file under dir_path (recursively) whose
+    name ends with suffix. With a path_filter (a pathfilter.PathFilter for
+    paths relative to dir_path), only the files it selects are yielded and
+    the directories it rules out are not listed.
+    """
+    for entry in os.scandir(dir_path):
+        rel_path = rel_dir + entry.name
+        if entry.is_dir():
+            if path_filter is None or path_filter.includes_dir(rel_path):
+                yield from scan_files(entry.path, suffix, path_filter, rel_path + "/")
+        elif entry.name.endswith(suffix) and (path_filter is None or path_filter.includes_file(rel_path)):
+            yield entry
+
+def file_hash(path):
+    """
+    Return the SHA-256 of the file's content, as hex.
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def same_stamp(entry, stamp):
+    """
+    Return True if the stored entry was made from a file with the "mtime"
+    and "size" of stamp.
+    """
+    return entry is not None and entry["mtime"] == stamp["mtime"] and entry["size"] == stamp["size"]
+
+def refresh_file_index(index, entries, read):
+    """
+    Bring an index of files (path -> entry) up to date with the os.DirEntry
+    entries. Every entry holds the file's "mtime" and "size" along with
+    whatever read(path) returns. Only files whose mtime or size changed
+    are read; entries for deleted files are dropped.
+    Returns (new_index, number_of_files_read).
+    """
+    new_index = {}
+    read_count = 0
+    for entry in entries:
+        stat = entry.stat()
+        stamp = {"mtime": stat.st_mtime_ns, "size": stat.st_size}
+        old_entry = index.get(entry.path)
+        if same_stamp(old_entry, stamp):
+            new_index[entry.path] = old_entry
+            continue
+        new_index[entry.path] = dict(stamp, **read(entry.path))
+        read_count += 1
+    return new_index, read_count
+
+def load_json(path, default):
+    """
+    Load the JSON stored at path, or return default if there is none yet.
+    """
+    if not os.path.exists(path):
+        return default
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save_json(data, path, **kwargs):
+    """
+    Write data as JSON to path atomically: the file is written next to its
+    destination and renamed into place, so concurrent builds never read a
+    half-written file.
+    """
+    parent = os.path.dirname(path)
+    if parent and not os.path.exists(parent):
+        os.makedirs(parent, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp_path, path)
+
+def save_deploy_plan(plan, plan_path):
+    """
+    Write the deploy plan as JSON.
+    """
+    save_json(plan, plan_path, indent=1)
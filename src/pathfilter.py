@@ -0,0 +1,59 @@
+import re
+from fnmatch import fnmatchcase
+
+_WILDCARD_PATTERN = re.compile(r"[*?\[]")
+
+def _literal_prefix(pattern):
+    match = _WILDCARD_PATTERN.search(pattern)
+    return pattern if match is None else pattern[:match.start()]
+
+def _ancestors(rel_path):
+    parts = rel_path.split("/")[:-1]
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+class PathFilter:
+    """
+    Selects paths by --only and --exclude glob patterns. Paths are relative
+    to the directory being walked and use "/" separators; "*" also matches
+    across "/". A pattern matching a directory stands for everything in
+    it, so "--exclude blog" skips the whole blog/ subtree.
+    A path is selected if it matches one of the only patterns (or there
+    are none) and none of the exclude patterns.
+    """
+
+    def __init__(self, only=(), exclude=()):
+        self.only = [pattern.strip("/") for pattern in only]
+        self.exclude = [pattern.strip("/") for pattern in exclude]
+
+    def _matches(self, rel_path, patterns):
+        candidates = _ancestors(rel_path) + [rel_path]
+        return any(fnmatchcase(path, pattern) for pattern in patterns for path in candidates)
+
+    def includes_file(self, rel_path):
+        """
+        Whether the file at rel_path is selected.
+        """
+        if self._matches(rel_path, self.exclude):
+            return False
+        return not self.only or self._matches(rel_path, self.only)
+
+    def includes_dir(self, rel_dir):
+        """
+        Whether the directory at rel_dir may contain selected files.
+        Walks can skip a directory for which this is False without
+        listing it; it is only called for directories whose parents
+        were included.
+        """
+        if any(fnmatchcase(rel_dir, pattern) for pattern in self.exclude):
+            return False
+        if not self.only:
+            return True
+        for pattern in self.only:
+            prefix = _literal_prefix(pattern)
+            if (
+                fnmatchcase(rel_dir, pattern)
+                or (rel_dir + "/").startswith(prefix)
+                or prefix.startswith(rel_dir + "/")
+            ):
+                return True
+        return False
@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+from output import load_json, save_json, write_text_file, scan_files, refresh_file_index, file_hash
+
+SERVICE_WORKER_NAME = "sw.js"
+PRECACHE_MANIFEST_NAME = "precache-manifest.json"
+
+# Revisions are content hashes cut to this many hex digits
+REVISION_LENGTH = 16
+
+# The service worker installs by fetching the manifest and downloading only
+# the entries whose revision differs from the manifest it cached last time.
+# VERSION changes whenever the manifest does, which makes the browser pick
+# up the new worker after a deploy.
+SERVICE_WORKER_TEMPLATE = """// Generated by the site build
+const VERSION = "{version}";
+const CACHE_NAME = "precache";
+const MANIFEST_URL = new URL("{manifest}", self.registration.scope).href;
+
+async function readRevisions(response) {{
+  const manifest = await response.json();
+  const revisions = new Map();
+  for (const entry of manifest.entries) {{
+    revisions.set(new URL(entry.url, self.registration.scope).href, entry.revision);
+  }}
+  return revisions;
+}}
+
+self.addEventListener("install", (event) => {{
+  event.waitUntil((async () => {{
+    const cache = await caches.open(CACHE_NAME);
+    const response = await fetch(MANIFEST_URL, {{ cache: "no-cache" }});
+    const revisions = await readRevisions(response.clone());
+    const previous = await cache.match(MANIFEST_URL);
+    const old = previous ? await readRevisions(previous) : new Map();
+    const changed = [];
+    for (const [url, revision] of revisions) {{
+      if (old.get(url) !== revision || !(await cache.match(url))) {{
+        changed.push(cache.add(new Request(url, {{ cache: "no-cache" }})));
+      }}
+    }}
+    await Promise.all(changed);
+    for (const url of old.keys()) {{
+      if (!revisions.has(url)) {{
+        await cache.delete(url);
+      }}
+    }}
+    await cache.put(MANIFEST_URL, response);
+    await self.skipWaiting();
+  }})());
+}});
+
+self.addEventListener("activate", (event) => {{
+  event.waitUntil(self.clients.claim());
+}});
+
+self.addEventListener("fetch", (event) => {{
+  if (event.request.method !== "GET" || event.request.url === MANIFEST_URL) {{
+    return;
+  }}
+  event.respondWith((async () => {{
+    const cached = await caches.match(event.request, {{ cacheName: CACHE_NAME, ignoreSearch: true }});
+    return cached || fetch(event.request);
+  }})());
+}});
+"""
+
+def service_worker_script():
+    """
+    Return the <script> that registers the service worker from a page.
+    The URL is root-relative; it is put under the basepath with the
+    page's other URLs.
+    """
+    return (
+        '<script>if ("serviceWorker" in navigator) '
+        f'{{ navigator.serviceWorker.register("/{SERVICE_WORKER_NAME}"); }}</script>'
+    )
+
+def load_precache_state(state_path):
+    """
+    Load the stored precache state, or an empty one if there is none yet.
+    It holds the hash and size of every page ("pages", by output path
+    relative to the output directory) and of every static file ("static",
+    by source path, with its mtime).
+    """
+    return load_json(state_path, {"pages": {}, "static": {}})
+
+def save_precache_state(state, state_path):
+    """
+    Write the precache state to disk.
+    """
+    save_json(state, state_path, sort_keys=True)
+
+def hash_static_files(static_state, static_dir):
+    """
+    Bring the hashes of the files in static_dir up to date. Only files
+    whose mtime or size changed are read; entries for deleted files are
+    dropped.
+    Returns (new_static_state, number_of_files_read).
+    """
+    return refresh_file_index(static_state, scan_files(static_dir), lambda path: {"hash": file_hash(path)})
+
+def update_page_state(page_state, pages, site_paths, dest_dir):
+    """
+    Record the hash and size of the pages built this time. Pages of the
+    site that were not built (in a partial build) keep their entry; pages
+    whose output path is no longer in site_paths are dropped.
+    """
+    new_state = {rel_path: entry for rel_path, entry in page_state.items() if rel_path in site_paths}
+    for page in pages:
+        rel_path = os.path.relpath(page["dest"], dest_dir).replace(os.sep, "/")
+        new_state[rel_path] = {"hash": page["hash"], "size": page["size"]}
+    return new_state
+
+def precache_entries(state, static_dir, path_filter=None, max_file_size=None, max_total_size=None):
+    """
+    List the manifest entries for the pages and static files in state,
+    pages first. Entries are selected by path_filter (matched against
+    their path in the output) and skipped if they are larger than
+    max_file_size or no longer fit in max_total_size.
+    Returns (entries, number of entries skipped).
+    """
+    candidates = []
+    for rel_path, entry in sorted(state["pages"].items()):
+        candidates.append((rel_path, entry))
+    for src_path, entry in sorted(state["static"].items()):
+        candidates.append((os.path.relpath(src_path, static_dir).replace(os.sep, "/"), entry))
+
+    entries = []
+    skipped = 0
+    total_size = 0
+    for rel_path, entry in candidates:
+        if path_filter is not None and not path_filter.includes_file(rel_path):
+            continue
+        size = entry["size"]
+        if max_file_size is not None and size > max_file_size:
+            skipped += 1
+            continue
+        if max_total_size is not None and total_size + size > max_total_size:
+            skipped += 1
+            continue
+        total_size += size
+        url = rel_path
+        if url == "index.html" or url.endswith("/index.html"):
+            url = url[:-len("index.html")] or "./"
+        entries.append({"url": url, "revision": entry["hash"][:REVISION_LENGTH], "size": size})
+    return entries, skipped
+
+def write_service_worker(entries, dest_dir, writer=None):
+    """
+    Write the precache manifest and the service worker into dest_dir.
+    Both only change, and so only get re-uploaded, when an entry does.
+    Returns the manifest version.
+    """
+    manifest_json = json.dumps({"entries": entries}, indent=1, sort_keys=True)
+    version = hashlib.sha256(manifest_json.encode("utf-8")).hexdigest()[:REVISION_LENGTH]
+    manifest_json = json.dumps({"version": version, "entries": entries}, indent=1, sort_keys=True)
+    script = SERVICE_WORKER_TEMPLATE.format(version=version, manifest=PRECACHE_MANIFEST_NAME)
+    write_text_file(os.path.join(dest_dir, PRECACHE_MANIFEST_NAME), manifest_json, writer)
+    write_text_file(os.path.join(dest_dir, SERVICE_WORKER_NAME), script, writer)
+    return version
@@ -0,0 +1,88 @@
+from output import load_json, save_json
+
+# Below this many items per worker, starting a process pool costs more than it saves
+MIN_ITEMS_PER_JOB = 8
+
+# Aim for this many batches per worker: enough that the workers even out
+# at the end, few enough that small pages do not cost a round trip each
+BATCHES_PER_JOB = 4
+
+def load_render_times(times_path):
+    """
+    Load the recorded render times: source path -> {"seconds", "size"},
+    size being the file size the time was measured at.
+    """
+    return load_json(times_path, {})
+
+def save_render_times(times, times_path):
+    """
+    Write the render times to disk.
+    """
+    save_json(times, times_path, sort_keys=True)
+
+def pool_size(items, jobs):
+    """
+    Return how many worker processes are worth starting for items on up to
+    jobs of them, each getting at least MIN_ITEMS_PER_JOB; 1 means doing
+    the work in this process.
+    """
+    if jobs <= 1 or items < 2 * MIN_ITEMS_PER_JOB:
+        return 1
+    return min(jobs, items // MIN_ITEMS_PER_JOB)
+
+def estimate_costs(sizes, times):
+    """
+    Estimate the render time of each source from sizes (source path -> file
+    size). A page timed before is expected to take as long again, scaled by
+    how much it grew; other pages are priced by size at the average rate of
+    the timed ones. Without any timings, the cost is just the size.
+    Returns a dict of source path -> cost.
+    """
+    timed_seconds = sum(entry["seconds"] for entry in times.values())
+    timed_bytes = sum(entry["size"] for entry in times.values())
+    rate = timed_seconds / timed_bytes if timed_seconds and timed_bytes else 1
+    costs = {}
+    for path, size in sizes.items():
+        entry = times.get(path)
+        if entry is None:
+            costs[path] = size * rate
+        elif entry["size"]:
+            costs[path] = entry["seconds"] * size / entry["size"]
+        else:
+            costs[path] = entry["seconds"]
+    return costs
+
+def make_batches(items, costs, jobs, max_items=None):
+    """
+    Group items into batches for jobs workers, costliest first. A batch
+    takes items until it reaches a fair share of the total cost, so large
+    items go out alone and small ones travel together. With max_items, a
+    batch also ends once it holds that many items.
+    Returns a list of lists of items, costliest batch first.
+    """
+    ordered = sorted(items, key=lambda item: -costs[item])
+    target = sum(costs[item] for item in ordered) / (jobs * BATCHES_PER_JOB)
+    batches = []
+    batch = []
+    batch_cost = 0
+    for item in ordered:
+        batch.append(item)
+        batch_cost += costs[item]
+        if batch_cost >= target or len(batch) == max_items:
+            batches.append((batch_cost, batch))
+            batch = []
+            batch_cost = 0
+    if batch:
+        batches.append((batch_cost, batch))
+    batches.sort(key=lambda entry: -entry[0])
+    return [batch for _, batch in batches]
+
+def lower_bound(seconds, jobs):
+    """
+    The shortest possible wall-clock time to run tasks taking seconds each
+    on jobs workers: no worker can do less than its share, and no task can
+    be split.
+    """
+    if not seconds:
+        return 0
+    return max(sum(seconds) / jobs, max(seconds))
@@ -0,0 +1,207 @@
+import os
+import mimetypes
+import threading
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote
+from archive import ArchiveReader
+
+class PageCache:
+    """
+    Renders pages on first request and keeps the HTML in memory.
+    An entry is dropped as soon as the mtime of its source or of the
+    template it was rendered with changes.
+    """
+
+    def __init__(self, render, template_path, basepath="/"):
+        self.render = render
+        self.template_path = template_path
+        self.basepath = basepath
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _mtimes(self, source_path, template_path):
+        return os.stat(source_path).st_mtime_ns, os.stat(template_path).st_mtime_ns
+
+    def get(self, source_path):
+        """
+        Return the rendered HTML for source_path, rendering it if it is not
+        cached or its inputs changed since it was cached.
+        """
+        with self.lock:
+            entry = self.entries.get(source_path)
+        if entry is not None:
+            mtimes, html, template_path = entry
+            try:
+                if self._mtimes(source_path, template_path) == mtimes:
+                    return html
+            except FileNotFoundError:
+                pass
+
+        # Stat before rendering so an edit made while rendering is noticed next time
+        source_mtime = os.stat(source_path).st_mtime_ns
+        _, html, template_path = self.render(source_path, self.template_path, self.basepath)
+        mtimes = (source_mtime, os.stat(template_path).st_mtime_ns)
+        with self.lock:
+            self.entries[source_path] = (mtimes, html, template_path)
+        return html
+
+def resolve_page(content_dir, url_path):
+    """
+    Map a request path to the markdown file that renders it:
+    "/blog/tom/", "/blog/tom" and "/blog/tom/index.html" all map to
+    content/blog/tom/index.md. Returns None if there is no such page.
+    """
+    rel_path = os.path.normpath(unquote(url_path).lstrip("/"))
+    if rel_path.startswith("..") or os.path.isabs(rel_path):
+        return None
+    if rel_path == ".":
+        rel_path = ""
+    if rel_path.endswith(".html"):
+        candidates = [rel_path[:-len(".html")] + ".md"]
+    else:
+        candidates = [os.path.join(rel_path, "index.md")]
+    for candidate in candidates:
+        source_path = os.path.join(content_dir, candidate)
+        if os.path.isfile(source_path):
+            return source_path
+    return None
+
+def make_handler(cache, content_dir, static_dir, basepath="/"):
+    """
+    Build a request handler class that renders pages from content_dir
+    through cache and serves everything else straight from static_dir.
+    """
+
+    class PreviewHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=static_dir, **kwargs)
+
+        def _site_path(self):
+            path = urlsplit(self.path).path
+            prefix = basepath.rstrip("/")
+            if prefix and path.startswith(prefix):
+                path = path[len(prefix):]
+            return path or "/"
+
+        def _send_page(self, head_only):
+            site_path = self._site_path()
+            source_path = resolve_page(content_dir, site_path)
+            if source_path is None:
+                return False
+            if not site_path.endswith("/") and not site_path.endswith(".html"):
+                # Redirect so relative links resolve against the page directory
+                self.send_response(301)
+                self.send_header("Location", self.path.split("?", 1)[0] + "/")
+                self.end_headers()
+                return True
+            try:
+                body = cache.get(source_path).encode("utf-8")
+            except ValueError as e:
+                self.send_error(500, f"Cannot render {source_path}: {e}")
+                return True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            if not head_only:
+                self.wfile.write(body)
+            return True
+
+        def translate_path(self, path):
+            prefix = basepath.rstrip("/")
+            url_path = urlsplit(path).path
+            if prefix and url_path.startswith(prefix):
+                path = url_path[len(prefix):] or "/"
+            return super().translate_path(path)
+
+        def do_GET(self):
+            if not self._send_page(head_only=False):
+                super().do_GET()
+
+        def do_HEAD(self):
+            if not self._send_page(head_only=True):
+                super().do_HEAD()
+
+    return PreviewHandler
+
+def serve(render, content_dir, static_dir, template_path, basepath="/", host="localhost", port=8888):
+    """
+    Serve the site, rendering each page lazily on its first request.
+    Nothing is built up front, so the first page is ready immediately
+    regardless of how many pages the site has.
+    """
+    cache = PageCache(render, template_path, basepath)
+    handler = make_handler(cache, content_dir, static_dir, basepath)
+    with ThreadingHTTPServer((host, port), handler) as httpd:
+        print(f"Serving {content_dir} on http://{host}:{port}{basepath}")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("Stopped")
+
+def archive_member(reader, url_path):
+    """
+    Map a request path to an archive member name, the way a static file
+    server maps it to a file: directories are served by their index.html.
+    Returns (name, redirect); redirect is True when the path names a
+    directory but lacks its trailing slash. name is None if not found.
+    """
+    name = unquote(url_path).lstrip("/")
+    if name == "" or name.endswith("/"):
+        name += "index.html"
+    if name in reader:
+        return name, False
+    if name + "/index.html" in reader:
+        return name + "/index.html", True
+    return None, False
+
+def make_archive_handler(reader, basepath="/"):
+    """
+    Build a request handler class that serves files out of a site archive.
+    """
+
+    class ArchiveHandler(BaseHTTPRequestHandler):
+        def _send(self, head_only):
+            path = urlsplit(self.path).path
+            prefix = basepath.rstrip("/")
+            if prefix and path.startswith(prefix):
+                path = path[len(prefix):]
+            name, redirect = archive_member(reader, path)
+            if name is None:
+                self.send_error(404, "File not found")
+                return
+            if redirect:
+                self.send_response(301)
+                self.send_header("Location", self.path.split("?", 1)[0] + "/")
+                self.end_headers()
+                return
+            body = reader.read(name)
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head_only:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._send(head_only=False)
+
+        def do_HEAD(self):
+            self._send(head_only=True)
+
+    return ArchiveHandler
+
+def serve_archive(archive_path, basepath="/", host="localhost", port=8888):
+    """
+    Serve a site straight out of a .zip or .tar built with --output-archive.
+    """
+    reader = ArchiveReader(archive_path)
+    handler = make_archive_handler(reader, basepath)
+    with ThreadingHTTPServer((host, port), handler) as httpd:
+        print(f"Serving {archive_path} ({len(reader.members)} files) on http://{host}:{port}{basepath}")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("Stopped")
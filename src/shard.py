@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+
+MANIFEST_NAME = "shard-manifest.json"
+
+def parse_shard(spec):
+    """
+    Parse a shard spec "i/n" (1-based) into (i, n).
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard spec: {spec} (expected i/n)")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard spec: {spec} (need 1 <= i <= n)")
+    return index, count
+
+def _path_key(path, content_dir):
+    return os.path.relpath(path, content_dir).replace(os.sep, "/")
+
+def assign_shards(sources, count, content_dir, costs=None):
+    """
+    Assign each source path to a shard number in 1..count.
+    Without costs, a source goes to the shard picked by a stable hash of its
+    path relative to content_dir. With costs (source path -> cost), sources
+    are spread longest-first onto the least loaded shard, which is just as
+    deterministic as long as every runner sees the same costs.
+    Returns a dict of source path -> shard number.
+    """
+    if costs is None:
+        shards = {}
+        for source in sources:
+            digest = hashlib.sha256(_path_key(source, content_dir).encode("utf-8")).digest()
+            shards[source] = int.from_bytes(digest[:8], "big") % count + 1
+        return shards
+
+    loads = [0] * count
+    shards = {}
+    ordered = sorted(sources, key=lambda source: (-costs.get(source, 0), _path_key(source, content_dir)))
+    for source in ordered:
+        shard = min(range(count), key=lambda i: (loads[i], i))
+        loads[shard] += costs.get(source, 0)
+        shards[source] = shard + 1
+    return shards
+
+def write_manifest(shard_dir, shard, count, pages, files):
+    """
+    Write the partial manifest of a shard build into shard_dir.
+    files maps output paths (relative to shard_dir) to content hashes.
+    """
+    manifest = {
+        "shard": [shard, count],
+        "files": files,
+        "pages": [
+            dict(page, dest=os.path.relpath(page["dest"], shard_dir))
+            for page in pages
+        ],
+    }
+    with open(os.path.join(shard_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+def load_manifest(shard_dir):
+    with open(os.path.join(shard_dir, MANIFEST_NAME), "r") as f:
+        return json.load(f)
+
+def hash_tree(root):
+    """
+    Hash every file under root, except the shard manifest.
+    Returns a dict of relative path -> sha256.
+    """
+    files = {}
+    for dir_path, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dir_path, name)
+            rel_path = os.path.relpath(path, root)
+            if rel_path == MANIFEST_NAME:
+                continue
+            with open(path, "rb") as f:
+                files[rel_path] = hashlib.sha256(f.read()).hexdigest()
+    return files
+
+def merge_shards(shard_dirs, dest_dir, writer):
+    """
+    Combine the outputs of shard builds into dest_dir through writer.
+    Raises ValueError if the shards are incomplete or inconsistent, or if
+    two shards produced the same output file.
+    Returns the combined page records, with dest paths under dest_dir.
+    """
+    manifests = [load_manifest(shard_dir) for shard_dir in shard_dirs]
+    counts = {manifest["shard"][1] for manifest in manifests}
+    if len(counts) != 1:
+        raise ValueError(f"Shards come from different splits: {sorted(counts)}")
+    seen = sorted(manifest["shard"][0] for manifest in manifests)
+    expected = list(range(1, counts.pop() + 1))
+    if seen != expected:
+        raise ValueError(f"Expected shards {expected}, got {seen}")
+
+    owners = {}
+    for shard_dir, manifest in zip(shard_dirs, manifests):
+        for rel_path in manifest["files"]:
+            if rel_path in owners:
+                raise ValueError(f"{rel_path} is produced by both {owners[rel_path]} and {shard_dir}")
+            owners[rel_path] = shard_dir
+
+    pages = []
+    for shard_dir, manifest in zip(shard_dirs, manifests):
+        for rel_path in manifest["files"]:
+            src_path = os.path.join(shard_dir, rel_path)
+            writer.copy_file(src_path, os.path.join(dest_dir, rel_path))
+        for page in manifest["pages"]:
+            pages.append(dict(page, dest=os.path.join(dest_dir, page["dest"])))
+    return pages
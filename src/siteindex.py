@@ -0,0 +1,188 @@
+import os
+from html import escape
+
+def _order_key(node):
+    # Pages with an "order" in their front matter come first, lowest first
+    try:
+        order = float(node["order"])
+    except (TypeError, ValueError):
+        return (1, 0, node["title"].lower())
+    return (0, order, node["title"].lower())
+
+def _title_from_name(name):
+    return name.replace("-", " ").replace("_", " ").capitalize()
+
+class SiteIndex:
+    """
+    The page hierarchy of the site, built in a single os.scandir pass over
+    the content directory. Every directory and every page is a node keyed
+    by its site URL ("", "blog/", "blog/tom/", "notes.html"); the index.md
+    of a directory is the page of the directory's node. Titles and sort
+    order come from the metadata index, so no markdown file is read.
+    Drafts are left out of the navigation unless include_drafts is set.
+    With a path_filter (a pathfilter.PathFilter), the directories it rules
+    out are not listed: their pages are taken from the metadata index, as
+    of the last build that looked at them.
+    Menus and breadcrumb trails are rendered once per directory and shared
+    by every page in it.
+    """
+
+    def __init__(self, content_dir, dest_dir, metadata, include_drafts=False, path_filter=None):
+        self.metadata = metadata
+        self.include_drafts = include_drafts
+        self.path_filter = path_filter
+        self.nodes = {}
+        # (source path, destination path, site URL, path relative to content_dir)
+        # of every markdown file, in discovery order
+        self.pages = []
+        self._menus = {}
+        self._trails = {}
+        self._indexed = self._index_entries(content_dir) if path_filter is not None else None
+        self._scan(content_dir, dest_dir, "", None)
+
+    def _index_entries(self, content_dir):
+        # Directory path -> {name: (path, is directory)} of the markdown
+        # files in the metadata index and the directories leading to them
+        entries = {}
+        for path in self.metadata:
+            parts = os.path.relpath(path, content_dir).split(os.sep)
+            dir_path = content_dir
+            for i, name in enumerate(parts):
+                child_path = os.path.join(dir_path, name)
+                entries.setdefault(dir_path, {})[name] = (child_path, i < len(parts) - 1)
+                dir_path = child_path
+        return entries
+
+    def _list(self, dir_path, from_index):
+        # The (name, path, is directory) entries of a directory, by name
+        if from_index:
+            return sorted((name, path, is_dir) for name, (path, is_dir) in self._indexed.get(dir_path, {}).items())
+        with os.scandir(dir_path) as it:
+            return sorted((entry.name, entry.path, entry.is_dir()) for entry in it)
+
+    def _node(self, url, parent, title):
+        node = {
+            "url": url,
+            "title": title,
+            "source": None,
+            "dest": None,
+            "order": None,
+            "parent": parent,
+            "children": [],
+        }
+        self.nodes[url] = node
+        return node
+
+    def _set_page(self, node, src_path, dest_path):
+        meta = self.metadata.get(src_path, {}).get("meta", {})
+        node["source"] = src_path
+        node["dest"] = dest_path
+        node["order"] = meta.get("order")
+        if meta.get("title"):
+            node["title"] = meta["title"]
+
+    def _scan(self, dir_path, dest_path, url, parent, from_index=False):
+        name = os.path.basename(url.rstrip("/"))
+        node = self._node(url, parent, _title_from_name(name) if name else "Home")
+        for entry_name, entry_path, is_dir in self._list(dir_path, from_index):
+            if is_dir:
+                pruned = from_index or (
+                    self.path_filter is not None and not self.path_filter.includes_dir(url + entry_name)
+                )
+                child = self._scan(entry_path, os.path.join(dest_path, entry_name), url + entry_name + "/", url,
+                                   pruned)
+                if child["source"] is None and not child["children"]:
+                    # Nothing to link to in this directory
+                    del self.nodes[child["url"]]
+                else:
+                    node["children"].append(child["url"])
+                continue
+            if not entry_name.endswith(".md"):
+                continue
+            dest_file = entry_name[:-len(".md")] + ".html"
+            page_dest = os.path.join(dest_path, dest_file)
+            page_url = url if entry_name == "index.md" else url + dest_file
+            self.pages.append((entry_path, page_dest, page_url, url + entry_name))
+            meta = self.metadata.get(entry_path, {}).get("meta", {})
+            if meta.get("draft") and not self.include_drafts:
+                continue
+            if entry_name == "index.md":
+                self._set_page(node, entry_path, page_dest)
+            else:
+                child = self._node(page_url, url, _title_from_name(entry_name[:-len(".md")]))
+                self._set_page(child, entry_path, page_dest)
+                node["children"].append(page_url)
+        node["children"].sort(key=lambda child_url: _order_key(self.nodes[child_url]))
+        return node
+
+    def sources(self, path_filter=None):
+        """
+        Return the (source path, destination path, site URL) triples of the
+        markdown files to build, drafts included, optionally only those
+        selected by path_filter.
+        """
+        return [
+            (src_path, dest_path, url)
+            for src_path, dest_path, url, rel_path in self.pages
+            if path_filter is None or path_filter.includes_file(rel_path)
+        ]
+
+    def _link(self, node):
+        title = escape(node["title"], quote=False)
+        if node["source"] is None:
+            return f"<span>{title}</span>"
+        return f'<a href="/{node["url"]}">{title}</a>'
+
+    def _menu(self, dir_url):
+        menu = self._menus.get(dir_url)
+        if menu is not None:
+            return menu
+        node = self.nodes[dir_url]
+        items = [self.nodes[child_url] for child_url in node["children"]]
+        if node["parent"] is None:
+            # The site menu starts with the home page
+            items.insert(0, node)
+            css_class = "menu"
+        else:
+            css_class = "menu section"
+        links = "".join(f"<li>{self._link(item)}</li>" for item in items)
+        menu = f'<nav class="{css_class}"><ul>{links}</ul></nav>'
+        self._menus[dir_url] = menu
+        return menu
+
+    def _trail(self, url):
+        trail = self._trails.get(url)
+        if trail is not None:
+            return trail
+        node = self.nodes[url]
+        trail = self._link(node)
+        if node["parent"] is not None:
+            trail = f"{self._trail(node['parent'])} / {trail}"
+        self._trails[url] = trail
+        return trail
+
+    def nav(self, url):
+        """
+        Return the navigation for the page at url: the site menu, followed
+        by the menu of the section the page belongs to.
+        Pages that are not in the index (such as drafts) get the site menu.
+        """
+        parts = [self._menu("")]
+        node = self.nodes.get(url)
+        if node is not None and node["parent"]:
+            parts.append(self._menu(node["parent"]))
+        return "\n    ".join(parts)
+
+    def breadcrumbs(self, url):
+        """
+        Return the breadcrumb trail from the home page to the page at url,
+        or an empty string for the home page and pages not in the index.
+        """
+        node = self.nodes.get(url)
+        if node is None or node["parent"] is None:
+            return ""
+        title = escape(node["title"], quote=False)
+        return (
+            f'<nav class="breadcrumbs">{self._trail(node["parent"])} / '
+            f'<span aria-current="page">{title}</span></nav>'
+        )
@@ -0,0 +1,145 @@
+import os
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+from output import write_text_file, load_json, save_json
+
+# The sitemap protocol allows at most 50,000 URLs per file
+MAX_URLS_PER_SITEMAP = 50000
+
+# <updated> of a feed for a site with no pages at all
+FEED_EPOCH = "1970-01-01T00:00:00Z"
+
+def page_url(rel_path):
+    """
+    Convert an output path relative to the site root into a site URL path.
+    "blog/tom/index.html" becomes "blog/tom/" and "index.html" becomes "".
+    """
+    rel_path = rel_path.replace(os.sep, "/")
+    if rel_path == "index.html":
+        return ""
+    if rel_path.endswith("/index.html"):
+        return rel_path[:-len("index.html")]
+    return rel_path
+
+def load_index(index_path):
+    """
+    Load the stored sitemap index, or an empty one if there is none yet.
+    """
+    return load_json(index_path, {})
+
+def save_index(index, index_path):
+    """
+    Write the sitemap index to disk.
+    """
+    save_json(index, index_path, indent=1, sort_keys=True)
+
+def update_index(index, pages, dest_dir, build_time=None):
+    """
+    Update the sitemap index with the pages produced by this build.
+    An entry keeps its lastmod as long as the hash of the page's own title
+    and content is unchanged; navigation and hints that change with other
+    pages do not count. The front matter date of a page is kept with it.
+    Pages that were not produced by this build are dropped.
+    Returns the new index.
+    """
+    if build_time is None:
+        build_time = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    new_index = {}
+    for page in pages:
+        url = page_url(os.path.relpath(page["dest"], dest_dir))
+        old_entry = index.get(url)
+        lastmod = build_time
+        if old_entry is not None and old_entry.get("content_hash") == page["content_hash"]:
+            lastmod = old_entry["lastmod"]
+        new_index[url] = {
+            "title": page["title"],
+            "content_hash": page["content_hash"],
+            "lastmod": lastmod,
+        }
+        if page.get("date"):
+            new_index[url]["date"] = page["date"]
+    return new_index
+
+def _absolute_url(site_url, basepath, url):
+    return site_url.rstrip("/") + basepath + url
+
+def _urlset(urls, index, site_url, basepath):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n',
+    ]
+    for url in urls:
+        loc = escape(_absolute_url(site_url, basepath, url))
+        lines.append(f"  <url><loc>{loc}</loc><lastmod>{index[url]['lastmod']}</lastmod></url>\n")
+    lines.append("</urlset>\n")
+    return "".join(lines)
+
+def write_sitemaps(index, dest_dir, site_url, basepath="/", writer=None):
+    """
+    Write sitemap.xml for every page in the index.
+    Past MAX_URLS_PER_SITEMAP URLs, sitemap.xml becomes a sitemap index
+    pointing at sitemap-1.xml, sitemap-2.xml, ...
+    """
+    urls = sorted(index)
+    sitemap_path = os.path.join(dest_dir, "sitemap.xml")
+    if len(urls) <= MAX_URLS_PER_SITEMAP:
+        write_text_file(sitemap_path, _urlset(urls, index, site_url, basepath), writer)
+        print(f"Wrote sitemap: {sitemap_path}")
+        return
+
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n',
+    ]
+    count = 0
+    for i in range(0, len(urls), MAX_URLS_PER_SITEMAP):
+        chunk = urls[i:i + MAX_URLS_PER_SITEMAP]
+        name = f"sitemap-{i // MAX_URLS_PER_SITEMAP + 1}.xml"
+        write_text_file(os.path.join(dest_dir, name), _urlset(chunk, index, site_url, basepath), writer)
+        lastmod = max(index[url]["lastmod"] for url in chunk)
+        loc = escape(_absolute_url(site_url, basepath, name))
+        lines.append(f"  <sitemap><loc>{loc}</loc><lastmod>{lastmod}</lastmod></sitemap>\n")
+        count += 1
+    lines.append("</sitemapindex>\n")
+    write_text_file(sitemap_path, "".join(lines), writer)
+    print(f"Wrote sitemap index: {sitemap_path} ({count} sitemaps)")
+
+def write_feed(index, dest_dir, site_url, basepath="/", section="blog/", writer=None):
+    """
+    Write an Atom feed (feed.xml) for the pages under section, newest
+    first by front matter date, or by lastmod for pages without one.
+    """
+    urls = [url for url in index if url.startswith(section) and url != section]
+    urls.sort(key=lambda url: (index[url].get("date") or index[url]["lastmod"], url), reverse=True)
+
+    feed_id = escape(_absolute_url(site_url, basepath, section))
+    feed_title = escape(index.get("", {}).get("title", "Blog"))
+    # Derived from the index rather than the clock, so the feed only
+    # changes when a page does
+    if urls:
+        updated = max(index[url]["lastmod"] for url in urls)
+    else:
+        updated = max((entry["lastmod"] for entry in index.values()), default=FEED_EPOCH)
+
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<feed xmlns="http://www.w3.org/2005/Atom">\n',
+        f"  <id>{feed_id}</id>\n",
+        f"  <title>{feed_title}</title>\n",
+        f"  <updated>{updated}</updated>\n",
+        f"  <author><name>{feed_title}</name></author>\n",
+        f'  <link rel="self" href="{escape(_absolute_url(site_url, basepath, "feed.xml"))}" />\n',
+    ]
+    for url in urls:
+        loc = escape(_absolute_url(site_url, basepath, url))
+        lines.append("  <entry>\n")
+        lines.append(f"    <id>{loc}</id>\n")
+        lines.append(f"    <title>{escape(index[url]['title'])}</title>\n")
+        lines.append(f'    <link href="{loc}" />\n')
+        lines.append(f"    <updated>{index[url]['lastmod']}</updated>\n")
+        lines.append("  </entry>\n")
+    lines.append("</feed>\n")
+
+    feed_path = os.path.join(dest_dir, "feed.xml")
+    write_text_file(feed_path, "".join(lines), writer)
+    print(f"Wrote feed: {feed_path}")
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from archive import ArchiveWriter, ArchiveReader
+from server import archive_member
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.image = os.path.join(self.root, "tom.png")
+        with open(self.image, "wb") as f:
+            f.write(b"\x89PNG fake image data")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def build(self, name):
+        archive_path = os.path.join(self.root, name)
+        writer = ArchiveWriter(archive_path, "docs")
+        writer.write_text(os.path.join("docs", "index.html"), "<h1>Home</h1>" * 50)
+        writer.write_text(os.path.join("docs", "blog", "tom", "index.html"), "<h1>Tom</h1>")
+        writer.copy_file(self.image, os.path.join("docs", "images", "tom.png"))
+        plan = writer.finish()
+        self.assertEqual(plan["added"], ["blog/tom/index.html", "images/tom.png", "index.html"])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "docs")))
+        return archive_path
+
+    def check_reader(self, archive_path):
+        reader = ArchiveReader(archive_path)
+        try:
+            self.assertEqual(bytes(reader.read("index.html")), b"<h1>Home</h1>" * 50)
+            self.assertEqual(bytes(reader.read("blog/tom/index.html")), b"<h1>Tom</h1>")
+            self.assertEqual(bytes(reader.read("images/tom.png")), b"\x89PNG fake image data")
+            self.assertEqual(archive_member(reader, "/"), ("index.html", False))
+            self.assertEqual(archive_member(reader, "/blog/tom/"), ("blog/tom/index.html", False))
+            self.assertEqual(archive_member(reader, "/blog/tom"), ("blog/tom/index.html", True))
+            self.assertEqual(archive_member(reader, "/missing.css"), (None, False))
+        finally:
+            reader.close()
+
+    def test_zip(self):
+        archive_path = self.build("site.zip")
+        with zipfile.ZipFile(archive_path) as archive:
+            self.assertEqual(archive.getinfo("images/tom.png").compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(archive.getinfo("index.html").compress_type, zipfile.ZIP_DEFLATED)
+        self.check_reader(archive_path)
+
+    def test_tar(self):
+        self.check_reader(self.build("site.tar"))
+
+    def test_zip_is_reproducible(self):
+        first = self.build("site.zip")
+        with open(first, "rb") as f:
+            data = f.read()
+        os.remove(first)
+        with open(self.build("site.zip"), "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_duplicate_member(self):
+        writer = ArchiveWriter(os.path.join(self.root, "site.zip"), "docs")
+        writer.write_text(os.path.join("docs", "index.html"), "a")
+        with self.assertRaises(ValueError):
+            writer.write_text(os.path.join("docs", "index.html"), "b")
+        writer.finish()
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            ArchiveWriter(os.path.join(self.root, "site.rar"), "docs")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from budget import (
+    DEFAULT_BUDGETS,
+    Weights,
+    parse_size,
+    parse_budgets,
+    file_weight,
+    resource_path,
+    page_weight,
+    weight_report,
+)
+from output import OutputWriter
+
+
+class TestBudget(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size("2048"), 2048)
+        self.assertEqual(parse_size("50KB"), 50 * 1024)
+        self.assertEqual(parse_size("1.5m"), 1536 * 1024)
+        with self.assertRaises(ValueError):
+            parse_size("lots")
+
+    def test_parse_budgets(self):
+        budgets = parse_budgets(["images=500KB"])
+        self.assertEqual(budgets["images"], 500 * 1024)
+        self.assertEqual(budgets["html"], DEFAULT_BUDGETS["html"])
+        with self.assertRaises(ValueError):
+            parse_budgets(["fonts=1MB"])
+        with self.assertRaises(ValueError):
+            parse_budgets(["images"])
+
+    def test_file_weight(self):
+        html = b"<p>hello</p>" * 100
+        size, transfer = file_weight("index.html", html)
+        self.assertEqual(size, len(html))
+        self.assertLess(transfer, size)
+        # Already compressed formats are not compressed again
+        self.assertEqual(file_weight("tom.png", html), (len(html), len(html)))
+
+    def test_resource_path(self):
+        self.assertEqual(resource_path("blog/tom/", "/images/tom.png", "docs"), "docs/images/tom.png")
+        self.assertEqual(resource_path("blog/tom/", "tom.png", "docs"), "docs/blog/tom/tom.png")
+        self.assertIsNone(resource_path("blog/tom/", "https://example.com/tom.png", "docs"))
+
+    def test_page_weight(self):
+        weights = {
+            "docs/blog/tom/index.html": (1000, 400),
+            "docs/index.css": (300, 100),
+            "docs/images/tom.png": (5000, 5000),
+        }
+        page = {
+            "dest": "docs/blog/tom/index.html",
+            "stylesheets": ["/index.css"],
+            "images": ["/images/tom.png", "/images/tom.png", "/images/gone.png", "https://example.com/x.png"],
+        }
+        weight = page_weight(page, weights, "docs")
+        self.assertEqual(weight["url"], "blog/tom/")
+        self.assertEqual(weight["html"], [1000, 400])
+        self.assertEqual(weight["css"], [300, 100])
+        # Each image counts once, however often the page shows it
+        self.assertEqual(weight["images"], [5000, 5000])
+        self.assertEqual(weight["total"], [6300, 5500])
+        self.assertEqual(weight["missing"], ["/images/gone.png"])
+
+    def test_weight_report_flags_pages_over_budget(self):
+        weights = {
+            "docs/index.html": (100, 50),
+            "docs/heavy/index.html": (100, 50),
+            "docs/big.png": (10000, 10000),
+        }
+        pages = [
+            {"dest": "docs/index.html", "stylesheets": [], "images": []},
+            {"dest": "docs/heavy/index.html", "stylesheets": [], "images": ["/big.png"]},
+        ]
+        budgets = dict(DEFAULT_BUDGETS, images=5000)
+        report = weight_report(pages, weights, "docs", budgets)
+        self.assertEqual([entry["url"] for entry in report], ["heavy/", ""])
+        self.assertEqual(report[0]["over"], ["images"])
+        self.assertEqual(report[1]["over"], [])
+
+    def test_writer_records_weights_without_extra_reads(self):
+        dest_dir = tempfile.mkdtemp()
+        src_dir = tempfile.mkdtemp()
+        try:
+            src_path = os.path.join(src_dir, "index.css")
+            with open(src_path, "w") as f:
+                f.write("body { color: red; }")
+            weights = Weights()
+            writer = OutputWriter(dest_dir, weights)
+            writer.write_text(os.path.join(dest_dir, "index.html"), "<p>hi</p>")
+            writer.copy_file(src_path, os.path.join(dest_dir, "index.css"))
+            self.assertEqual(weights[os.path.join(dest_dir, "index.html")][0], 9)
+            self.assertEqual(weights[os.path.join(dest_dir, "index.css")][0], 20)
+
+            # Files already in place are recorded too
+            weights = Weights()
+            writer = OutputWriter(dest_dir, weights)
+            self.assertFalse(writer.copy_file(src_path, os.path.join(dest_dir, "index.css")))
+            self.assertIn(os.path.join(dest_dir, "index.css"), weights)
+        finally:
+            shutil.rmtree(dest_dir)
+            shutil.rmtree(src_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
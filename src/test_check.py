@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from check import find_markdown_files, check_file, check_files, format_error
+
+
+class TestCheck(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_find_markdown_files(self):
+        a = self.write("a.md", "# A")
+        b = self.write(os.path.join("blog", "b.md"), "# B")
+        self.write("notes.txt", "not markdown")
+        self.assertEqual(find_markdown_files([self.root]), sorted([a, b]))
+        self.assertEqual(find_markdown_files([b]), [b])
+
+    def test_line_numbers_count_front_matter(self):
+        path = self.write("a.md", "---\ntitle: A\n---\nIntro\n\nThis is _broken\n")
+        self.assertEqual(check_file(path), [(path, 6, "Invalid markdown: unmatched delimiter")])
+
+    def test_missing_title(self):
+        path = self.write("a.md", "No header here\n")
+        self.assertEqual(check_file(path), [(path, 1, "No h1 header found in markdown")])
+        path = self.write("b.md", "---\ntitle: From front matter\n---\nNo header here\n")
+        self.assertEqual(check_file(path), [])
+
+    def test_invalid_front_matter(self):
+        path = self.write("a.md", "---\ntitle: A\n# A\n")
+        self.assertEqual(check_file(path), [(path, 1, "Invalid front matter: no closing ---")])
+
+    def test_check_files_in_parallel_matches_serial(self):
+        paths = []
+        for i in range(40):
+            text = "# Page\n\nSome **bold** text\n" if i % 7 else "# Page\n\nSome **bold text\n"
+            paths.append(self.write(f"p{i:02}.md", text))
+        serial = check_files(paths, jobs=1)
+        self.assertEqual(len(serial), 6)
+        self.assertEqual(check_files(paths, jobs=2), serial)
+        self.assertEqual(format_error(serial[0]), f"{paths[0]}:3: Invalid markdown: unmatched delimiter")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+import io
+import gc
+import os
+import sys
+import math
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from contextlib import redirect_stdout
+
+from textnode import text_to_textnodes, markdown_to_html_node, markdown_to_html, markdown_to_html_spans
+from main import generate_pages_recursive
+from siteindex import SiteIndex
+
+# Growth of the number of function calls worse than this exponent
+# (calls ~ n^k) fails the test. Call counts are exact, so linear code
+# measures at most 1.0 and a quadratic loop close to 2.0.
+MAX_CALL_GROWTH_EXPONENT = 1.1
+
+# Call counts miss quadratic work done inside a single C call (such as
+# re-splitting the rest of a string for every match), so the in-memory
+# parser cases are also timed. The build cases touch the disk and are only
+# timed when this environment variable is set.
+TIMING_ENV = "COMPLEXITY_TIMING"
+
+# Growth of wall-clock time worse than this exponent fails a timed case;
+# well clear of the noise around 1.0, well short of a quadratic 2.0
+MAX_TIME_GROWTH_EXPONENT = 1.6
+
+# Each size is timed this many times and the fastest run kept. A timed
+# case that fails is measured once more before it counts, so a single
+# burst of load on the machine does not fail the suite.
+TIMING_REPEATS = 5
+
+# Pages in the deep tree test sit up to this many directories down. Every
+# file operation resolves the whole path, so a single unbounded chain would
+# measure the filesystem rather than the build.
+DEEP_TREE_DEPTH = 30
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+
+def count_calls(func, arg):
+    """
+    Count the Python and builtin function calls made by func(arg).
+    """
+    calls = 0
+
+    def profile(frame, event, _):
+        nonlocal calls
+        if event == "call" or event == "c_call":
+            calls += 1
+
+    sys.setprofile(profile)
+    try:
+        func(arg)
+    finally:
+        sys.setprofile(None)
+    return calls
+
+
+def best_time(func, arg, repeats):
+    best = None
+    for _ in range(repeats):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func(arg)
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def growth_exponent(sizes, costs):
+    """
+    Return the slope of the least-squares fit of log(cost) against log(size).
+    """
+    xs = [math.log(n) for n in sizes]
+    ys = [math.log(cost) for cost in costs]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return covariance / variance
+
+
+def doubling(start, steps=4):
+    return [start * 2 ** i for i in range(steps)]
+
+
+class ComplexityTestCase(unittest.TestCase):
+    # Whether assertLinear times every case, not only counts its calls
+    timed = False
+
+    def timeExponent(self, func, inputs, sizes):
+        return growth_exponent(sizes, [best_time(func, arg, TIMING_REPEATS) for arg in inputs])
+
+    def assertLinear(self, func, make_input, sizes):
+        inputs = [make_input(n) for n in sizes]
+        calls = [count_calls(func, arg) for arg in inputs]
+        exponent = growth_exponent(sizes, calls)
+        self.assertLess(
+            exponent,
+            MAX_CALL_GROWTH_EXPONENT,
+            f"calls grow like n^{exponent:.2f} for sizes {sizes}: {calls}",
+        )
+        if self.timed or os.environ.get(TIMING_ENV):
+            exponent = self.timeExponent(func, inputs, sizes)
+            if exponent >= MAX_TIME_GROWTH_EXPONENT:
+                exponent = min(exponent, self.timeExponent(func, inputs, sizes))
+            self.assertLess(
+                exponent,
+                MAX_TIME_GROWTH_EXPONENT,
+                f"time grows like n^{exponent:.2f} for sizes {sizes}",
+            )
+
+
+class TestParserComplexity(ComplexityTestCase):
+    timed = True
+
+    def test_many_links(self):
+        self.assertLinear(
+            text_to_textnodes,
+            lambda n: " ".join(f"see [link {i}](https://example.com/{i})" for i in range(n)),
+            doubling(4000),
+        )
+
+    def test_many_images(self):
+        self.assertLinear(
+            text_to_textnodes,
+            lambda n: " ".join(f"look ![img {i}](/images/{i}.png)" for i in range(n)),
+            doubling(4000),
+        )
+
+    def test_many_delimiters(self):
+        self.assertLinear(
+            text_to_textnodes,
+            lambda n: " ".join(f"**b{i}** _i{i}_ `c{i}`" for i in range(n)),
+            doubling(1000),
+        )
+
+    def test_long_line(self):
+        self.assertLinear(
+            markdown_to_html_node,
+            lambda n: "word " * n,
+            doubling(20000),
+        )
+
+    def test_many_list_items(self):
+        self.assertLinear(
+            markdown_to_html_node,
+            lambda n: "\n".join(f"{i + 1}. item **{i}**" for i in range(n)),
+            doubling(1000),
+        )
+
+    def test_many_blocks_fused(self):
+        self.assertLinear(
+            markdown_to_html,
+            lambda n: "\n\n".join(f"## Heading {i}\n\nParagraph [{i}](/p/{i}) with _text_" for i in range(n)),
+            doubling(500),
+        )
+
+    def test_many_blocks_spans(self):
+        self.assertLinear(
+            markdown_to_html_spans,
+            lambda n: "\n\n".join(f"## Heading {i}\n\nParagraph [{i}](/p/{i}) with _text_" for i in range(n)),
+            doubling(500),
+        )
+
+
+class MemoryWriter:
+    """
+    Keeps build output in memory, so the timings measure the build rather
+    than the disk.
+    """
+
+    def __init__(self):
+        self.files = {}
+
+    def write_text(self, path, text):
+        self.files[path] = text
+        return True
+
+
+class TestBuildComplexity(ComplexityTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.template_path = os.path.join(self.root, "template.html")
+        with open(self.template_path, "w") as f:
+            f.write(TEMPLATE)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def make_tree(self, n, deep):
+        content_dir = os.path.join(self.root, f"content-{'deep' if deep else 'wide'}-{n}")
+        dir_path = content_dir
+        for i in range(n):
+            if deep:
+                # Chains of DEEP_TREE_DEPTH nested directories, one page per level
+                if i % DEEP_TREE_DEPTH == 0:
+                    dir_path = os.path.join(content_dir, f"chain{i}")
+                else:
+                    dir_path = os.path.join(dir_path, "d")
+            else:
+                dir_path = os.path.join(content_dir, f"page{i}")
+            os.makedirs(dir_path, exist_ok=True)
+            with open(os.path.join(dir_path, "index.md"), "w") as f:
+                f.write(f"# Page {i}\n\nSome [link](/page{i}) and **bold** text.\n")
+        return content_dir
+
+    def build(self, content_dir):
+        with redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                content_dir, self.template_path, content_dir + "-out", writer=MemoryWriter()
+            )
+
+    def test_wide_tree(self):
+        self.assertLinear(self.build, lambda n: self.make_tree(n, False), doubling(100))
+
+    def test_deep_tree(self):
+        self.assertLinear(self.build, lambda n: self.make_tree(n, True), doubling(3 * DEEP_TREE_DEPTH))
+
+    def assertEachDirectoryRenderedOnce(self, content_dir):
+        index = SiteIndex(content_dir, content_dir + "-out", {})
+        with mock.patch.object(SiteIndex, "_link", autospec=True, side_effect=SiteIndex._link) as link:
+            for _, _, url in index.sources():
+                index.nav(url)
+                index.breadcrumbs(url)
+
+        # One menu per directory whose pages were navigated, and one trail
+        # per directory on the way to them
+        parents = {node["parent"] for node in index.nodes.values() if node["parent"] is not None}
+        self.assertEqual(set(index._menus), parents | {""})
+        self.assertEqual(set(index._trails), parents)
+        # Every node is linked from its parent's menu and at most once more
+        # from its trail; the home page also starts the site menu
+        self.assertLessEqual(link.call_count, 2 * len(index.nodes) + 1)
+
+    def test_navigation_wide_tree(self):
+        self.assertEachDirectoryRenderedOnce(self.make_tree(400, False))
+
+    def test_navigation_deep_tree(self):
+        self.assertEachDirectoryRenderedOnce(self.make_tree(12 * DEEP_TREE_DEPTH, True))
+
+if __name__ == "__main__":
+    unittest.main()
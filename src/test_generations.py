@@ -0,0 +1,95 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from generations import (stage_generation, publish_generation, rollback, list_generations,
+                         current_generation)
+from output import OutputWriter
+
+
+class TestGenerations(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.output = os.path.join(self.root, "docs")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def read(self, path):
+        with open(path, "r") as f:
+            return f.read()
+
+    def build(self, files, keep=3, resume=False):
+        with redirect_stdout(io.StringIO()):
+            staging = stage_generation(self.output, resume)
+            writer = OutputWriter(staging)
+            for name, text in files.items():
+                writer.write_text(os.path.join(staging, name), text)
+            writer.finish()
+            return publish_generation(self.output, staging, keep)
+
+    def test_existing_output_becomes_first_generation(self):
+        os.makedirs(self.output)
+        with open(os.path.join(self.output, "index.html"), "w") as f:
+            f.write("old")
+        self.assertEqual(self.build({"index.html": "new"}), 2)
+        self.assertTrue(os.path.islink(self.output))
+        self.assertEqual(self.read(os.path.join(self.output, "index.html")), "new")
+        self.assertEqual(self.read(os.path.join(self.output + ".generations", "1", "index.html")), "old")
+
+    def test_unchanged_files_are_hardlinked_and_old_generation_is_untouched(self):
+        self.build({"index.html": "one", "index.css": "css"})
+        self.build({"index.html": "two", "index.css": "css"})
+        gen_dir = self.output + ".generations"
+        self.assertEqual(
+            os.stat(os.path.join(gen_dir, "1", "index.css")).st_ino,
+            os.stat(os.path.join(gen_dir, "2", "index.css")).st_ino,
+        )
+        self.assertEqual(self.read(os.path.join(gen_dir, "1", "index.html")), "one")
+        self.assertEqual(self.read(os.path.join(self.output, "index.html")), "two")
+
+    def test_stale_files_only_leave_the_new_generation(self):
+        self.build({"index.html": "one", "old.html": "old"})
+        self.build({"index.html": "one"})
+        self.assertFalse(os.path.exists(os.path.join(self.output, "old.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.output + ".generations", "1", "old.html")))
+
+    def test_keeps_only_the_newest_generations(self):
+        for i in range(5):
+            self.build({"index.html": str(i)}, keep=2)
+        self.assertEqual(list_generations(self.output), [3, 4, 5])
+        self.assertEqual(current_generation(self.output), 5)
+
+    def test_interrupted_staging_is_discarded_unless_resumed(self):
+        self.build({"index.html": "one"})
+        with redirect_stdout(io.StringIO()):
+            staging = stage_generation(self.output)
+            with open(os.path.join(staging, "half.html"), "w") as f:
+                f.write("half")
+            self.assertEqual(stage_generation(self.output, resume=True), staging)
+            self.assertTrue(os.path.exists(os.path.join(staging, "half.html")))
+            self.assertEqual(stage_generation(self.output), staging)
+        self.assertFalse(os.path.exists(os.path.join(staging, "half.html")))
+        self.assertEqual(self.read(os.path.join(self.output, "index.html")), "one")
+
+    def test_rollback(self):
+        self.build({"index.html": "one"})
+        self.build({"index.html": "two"})
+        self.build({"index.html": "three"})
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(rollback(self.output), 2)
+            self.assertEqual(self.read(os.path.join(self.output, "index.html")), "two")
+            self.assertEqual(rollback(self.output), 1)
+            with self.assertRaises(ValueError):
+                rollback(self.output)
+            self.assertEqual(rollback(self.output, 3), 3)
+            with self.assertRaises(ValueError):
+                rollback(self.output, 7)
+        self.assertEqual(self.read(os.path.join(self.output, "index.html")), "three")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import highlight
+from highlight import (highlight as highlight_code, load_cache, save_cache, clear_cache,
+                       track_new_entries, take_new_entries, add_entries)
+
+
+class TestHighlight(unittest.TestCase):
+    def setUp(self):
+        clear_cache()
+
+    def tearDown(self):
+        clear_cache()
+
+    def test_python(self):
+        self.assertEqual(
+            highlight_code('def f(): return "a<b"', "python"),
+            '<span class="k">def</span> f(): <span class="k">return</span> <span class="s">"a&lt;b"</span>',
+        )
+
+    def test_alias(self):
+        self.assertEqual(highlight_code("print(1)", "py"), highlight_code("print(1)", "python"))
+
+    def test_bash(self):
+        self.assertEqual(
+            highlight_code('echo "$HOME" # done', "bash"),
+            '<span class="nb">echo</span> <span class="s">"$HOME"</span> <span class="c"># done</span>',
+        )
+
+    def test_json(self):
+        self.assertEqual(
+            highlight_code('{"a": [1, null]}', "json"),
+            '{<span class="nt">"a"</span>: [<span class="m">1</span>, <span class="kc">null</span>]}',
+        )
+
+    def test_html(self):
+        self.assertEqual(
+            highlight_code('<a href="/x">Hi</a>', "html"),
+            '<span class="nt">&lt;a</span> <span class="na">href</span>=<span class="s">"/x"</span>'
+            '<span class="nt">&gt;</span>Hi<span class="nt">&lt;/a</span><span class="nt">&gt;</span>',
+        )
+
+    def test_unsupported_language(self):
+        self.assertIsNone(highlight_code("fn main() {}", "rust"))
+
+    def test_identical_snippets_highlighted_once(self):
+        calls = []
+        original = highlight.HIGHLIGHTERS["python"]
+        highlight.HIGHLIGHTERS["python"] = lambda code, out: (calls.append(code), original(code, out))
+        try:
+            first = highlight_code("x = 1", "python")
+            second = highlight_code("x = 1", "python")
+        finally:
+            highlight.HIGHLIGHTERS["python"] = original
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+
+    def test_cache_is_bounded(self):
+        old_max = highlight.MAX_CACHE_ENTRIES
+        highlight.MAX_CACHE_ENTRIES = 2
+        try:
+            for i in range(5):
+                highlight_code(f"x = {i}", "python")
+            self.assertEqual(len(highlight._cache), 2)
+        finally:
+            highlight.MAX_CACHE_ENTRIES = old_max
+
+    def test_cache_persists(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache_path = os.path.join(cache_dir, "highlight.json")
+            html = highlight_code("x = 1", "python")
+            save_cache(cache_path)
+            clear_cache()
+            load_cache(cache_path)
+            self.assertEqual(list(highlight._cache.values()), [html])
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_cache_from_other_version_is_dropped(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache_path = os.path.join(cache_dir, "highlight.json")
+            highlight_code("x = 1", "python")
+            save_cache(cache_path)
+            clear_cache()
+            old_version = highlight.CACHE_VERSION
+            highlight.CACHE_VERSION = "other"
+            try:
+                with redirect_stdout(io.StringIO()):
+                    load_cache(cache_path)
+            finally:
+                highlight.CACHE_VERSION = old_version
+            self.assertEqual(len(highlight._cache), 0)
+
+            # Caches from before the cache was versioned are dropped too
+            with open(cache_path, "w") as f:
+                json.dump([["python:abc", "stale"]], f)
+            with redirect_stdout(io.StringIO()):
+                load_cache(cache_path)
+            self.assertEqual(len(highlight._cache), 0)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_new_entries_move_between_caches(self):
+        highlight_code("x = 1", "python")
+        self.assertEqual(take_new_entries(), [])
+        track_new_entries()
+        html = highlight_code("y = 2", "python")
+        highlight_code("x = 1", "python")
+        entries = take_new_entries()
+        self.assertEqual([entry[1] for entry in entries], [html])
+        self.assertEqual(take_new_entries(), [])
+        clear_cache()
+        add_entries(entries)
+        self.assertEqual(list(highlight._cache.values()), [html])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from hints import (template_stylesheets, link_to_page, count_inbound, resource_hints,
+                   cached_links, record_links)
+from textnode import markdown_to_html, new_page_refs
+
+
+class TestHints(unittest.TestCase):
+    def test_template_stylesheets(self):
+        template = '<link href="/index.css" rel="stylesheet" /><link rel="icon" href="/favicon.ico" />'
+        self.assertEqual(template_stylesheets(template), ["/index.css"])
+
+    def test_link_to_page(self):
+        self.assertEqual(link_to_page("/"), "")
+        self.assertEqual(link_to_page("/blog/tom"), "blog/tom/")
+        self.assertEqual(link_to_page("/blog/tom/#intro"), "blog/tom/")
+        self.assertEqual(link_to_page("/blog/tom/index.html"), "blog/tom/")
+        self.assertIsNone(link_to_page("https://example.com/blog/"))
+        self.assertIsNone(link_to_page("/images/tom.png"))
+        self.assertIsNone(link_to_page("relative/page"))
+
+    def test_refs_collected_while_parsing(self):
+        refs = new_page_refs()
+        markdown_to_html("![a](/a.png) [home](/)\n\n- [tom](/blog/tom) ![b](/b.png)", refs)
+        self.assertEqual(refs, {"images": ["/a.png", "/b.png"], "links": ["/", "/blog/tom"]})
+
+    def test_count_inbound(self):
+        inbound = count_inbound({
+            "": ["/blog/a", "/blog/b", "/blog/b", "https://example.com"],
+            "blog/a/": ["/", "/blog/b"],
+            "blog/b/": ["/", "/blog/b", "/missing"],
+        })
+        self.assertEqual(inbound, {"": 2, "blog/a/": 1, "blog/b/": 2})
+
+    def test_resource_hints(self):
+        refs = {
+            "images": ["/1.png", "/1.png", "/2.png", "/3.png"],
+            "links": ["/rare", "/", "/popular", "/missing", "https://example.com", "/me"],
+        }
+        inbound = {"": 5, "popular/": 9, "rare/": 1, "me/": 3, "other/": 7}
+        hints = resource_hints("me/", refs, inbound, ["/index.css"])
+        self.assertEqual(
+            hints.split("\n    "),
+            [
+                '<link rel="preload" href="/index.css" as="style" />',
+                '<link rel="preload" href="/1.png" as="image" />',
+                '<link rel="preload" href="/2.png" as="image" />',
+                '<link rel="prefetch" href="/popular/" />',
+                '<link rel="prefetch" href="/" />',
+                '<link rel="prefetch" href="/rare/" />',
+            ],
+        )
+
+    def test_cached_links_invalidated_by_change(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, "index.md")
+        with open(path, "w") as f:
+            f.write("[Tom](/blog/tom)")
+        graph = {}
+        entry = {"mtime": 1, "size": 16, "meta": {}}
+        self.assertIsNone(cached_links(graph, path, entry))
+        record_links(graph, path, entry, ["/blog/tom"])
+        self.assertEqual(cached_links(graph, path, entry), ["/blog/tom"])
+
+        # A fresh checkout only changes the mtime
+        self.assertEqual(cached_links(graph, path, dict(entry, mtime=2)), ["/blog/tom"])
+        self.assertEqual(graph[path]["mtime"], 2)
+
+        with open(path, "w") as f:
+            f.write("[Tim](/blog/tim)")
+        self.assertIsNone(cached_links(graph, path, dict(entry, mtime=3)))
+
+if __name__ == "__main__":
+    unittest.main()
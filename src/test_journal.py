@@ -0,0 +1,123 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from journal import BuildJournal
+from output import OutputWriter
+
+
+class TestBuildJournal(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.root, ".cache", "journal.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def output(self, name):
+        path = os.path.join(self.root, name)
+        with open(path, "w") as f:
+            f.write(name)
+        return [{"source": f"content/{name}.md", "dest": path, "links": []}]
+
+    def open(self, fingerprint="abc", resume=True, writers=None):
+        with redirect_stdout(io.StringIO()):
+            return BuildJournal(self.journal_path, fingerprint, resume, writers)
+
+    def completed(self, fingerprint="abc"):
+        with self.open(fingerprint) as journal:
+            return journal.completed
+
+    def test_resume_lists_completed_pages(self):
+        with self.open(resume=False) as journal:
+            journal.append("content/a.md", self.output("a"))
+            journal.append("content/b.md", self.output("b"))
+
+        journal = self.open()
+        self.assertEqual(sorted(journal.completed), ["content/a.md", "content/b.md"])
+        self.assertEqual(journal.completed["content/a.md"][0]["dest"], os.path.join(self.root, "a"))
+        journal.finish()
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_fresh_build_ignores_journal(self):
+        with self.open(resume=False) as journal:
+            journal.append("content/a.md", self.output("a"))
+        with self.open(resume=False) as journal:
+            self.assertEqual(journal.completed, {})
+
+    def test_changed_inputs_not_resumed(self):
+        with self.open(resume=False) as journal:
+            journal.append("content/a.md", self.output("a"))
+        self.assertEqual(self.completed("other"), {})
+
+    def test_missing_output_not_trusted(self):
+        with self.open(resume=False) as journal:
+            journal.append("content/a.md", self.output("a"))
+            journal.append("content/b.md", self.output("b"))
+        os.remove(os.path.join(self.root, "b"))
+        self.assertEqual(list(self.completed()), ["content/a.md"])
+
+    def test_line_cut_short_by_crash(self):
+        with self.open(resume=False) as journal:
+            journal.append("content/a.md", self.output("a"))
+        with open(self.journal_path, "a") as f:
+            f.write('{"source": "content/b.md", "pa')
+
+        with self.open() as journal:
+            self.assertEqual(list(journal.completed), ["content/a.md"])
+            journal.append("content/c.md", self.output("c"))
+        # The cut line was dropped, so entries after it still load
+        self.assertEqual(sorted(self.completed()), ["content/a.md", "content/c.md"])
+
+    def test_written_outputs_carried_over(self):
+        site = os.path.join(self.root, "site")
+        os.makedirs(site)
+        with open(os.path.join(site, "old.html"), "w") as f:
+            f.write("old")
+
+        writer = OutputWriter(site)
+        with self.open(resume=False, writers={"site": writer}) as journal:
+            writer.write_text(os.path.join(site, "static.css"), "css")
+            journal.record_outputs()
+            writer.write_text(os.path.join(site, "old.html"), "new")
+            writer.write_text(os.path.join(site, "a.html"), "a")
+            journal.append("content/a.md", self.output("a"))
+
+        # Whether or not the next build resumes, it finds those files in
+        # place but still lists them in its plan
+        for resume in (True, False):
+            writer = OutputWriter(site)
+            with self.open(resume=resume, writers={"site": writer}) as journal:
+                for name, text in (("static.css", "css"), ("old.html", "new"), ("a.html", "a")):
+                    writer.write_text(os.path.join(site, name), text)
+            self.assertEqual(writer.plan(), {
+                "added": ["a.html", "static.css"],
+                "changed": ["old.html"],
+                "deleted": [],
+                "unchanged": 0,
+            })
+
+    def test_first_status_of_output_kept(self):
+        site = os.path.join(self.root, "site")
+        writer = OutputWriter(site)
+        with self.open(resume=False, writers={"site": writer}) as journal:
+            writer.write_text(os.path.join(site, "a.html"), "a")
+            journal.record_outputs()
+
+        # A second interrupted build rewrites the file it now finds in place
+        writer = OutputWriter(site)
+        with self.open(writers={"site": writer}) as journal:
+            writer.write_text(os.path.join(site, "a.html"), "a2")
+            journal.record_outputs()
+
+        writer = OutputWriter(site)
+        with self.open(writers={"site": writer}) as journal:
+            writer.write_text(os.path.join(site, "a.html"), "a2")
+        self.assertEqual(writer.plan()["added"], ["a.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,305 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import main
+
+from shard import hash_tree, MANIFEST_NAME
+from main import (
+    build,
+    merge,
+    links,
+    parse_args,
+    parse_merge_args,
+    parse_links_args,
+    fill_template,
+    mark_root_urls,
+    generate_pages,
+    generate_pages_for_targets,
+    parse_pages,
+    parse_targets,
+    target_cache_path,
+)
+
+TEMPLATE = (
+    '<html><title>{{ Title }}</title><link href="/index.css" rel="stylesheet" />'
+    "<body>{{ Content }}{{ ServiceWorker }}</body></html>"
+)
+
+
+class TestTargets(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.template_path = os.path.join(self.root, "template.html")
+        with open(self.template_path, "w") as f:
+            f.write(TEMPLATE)
+        self.sources = []
+        for name, text in [("index", "# Home\n\n[Tom](/blog/tom) ![me](/me.png)"), ("about", "# About\n\nHi")]:
+            src_path = os.path.join(self.root, f"{name}.md")
+            with open(src_path, "w") as f:
+                f.write(text)
+            self.sources.append((src_path, os.path.join(self.root, "out", f"{name}.html"), f"{name}.html"))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_mark_root_urls(self):
+        html = '<a href="/a">x</a><img src="/b.png"><a href="https://c/">y</a>register("/sw.js")'
+        pieces = mark_root_urls(html)
+        self.assertEqual("/".join(pieces), html)
+        self.assertEqual(
+            "/site/".join(pieces),
+            '<a href="/site/a">x</a><img src="/site/b.png"><a href="https://c/">y</a>register("/site/sw.js")',
+        )
+
+    def test_fill_template_basepath(self):
+        html = fill_template(TEMPLATE, "T", '<a href="/x">x</a>', "/site/")
+        self.assertIn('href="/site/index.css"', html)
+        self.assertIn('href="/site/x"', html)
+
+    def test_targets_match_separate_builds(self):
+        with redirect_stdout(io.StringIO()):
+            single = {}
+            for basepath in ["/", "/site/"]:
+                generate_pages(self.sources, self.template_path, basepath, service_worker=True)
+                single[basepath] = [self.read(dest_path) for _, dest_path, _ in self.sources]
+
+            targets = [
+                ("/", os.path.join(self.root, "prod"), None),
+                ("/site/", os.path.join(self.root, "mirror"), None),
+            ]
+            pages = generate_pages_for_targets(self.sources, self.template_path, targets, service_worker=True,
+                                               base_dir=os.path.join(self.root, "out"))
+        self.assertEqual(len(pages), 2)
+        for (basepath, dest_dir, _), target_pages in zip(targets, pages):
+            self.assertEqual([page["dest"] for page in target_pages],
+                             [os.path.join(dest_dir, "index.html"), os.path.join(dest_dir, "about.html")])
+            self.assertEqual([self.read(page["dest"]) for page in target_pages], single[basepath])
+        self.assertNotEqual(pages[0][0]["hash"], pages[1][0]["hash"])
+
+    def test_pages_written_as_they_are_parsed(self):
+        events = []
+        parse_page = main.parse_page
+        write_page = main.write_page
+        def parse(src_path, *args):
+            events.append(("parse", os.path.basename(src_path)))
+            return parse_page(src_path, *args)
+        def write(src_path, *args):
+            events.append(("write", os.path.basename(src_path)))
+            return write_page(src_path, *args)
+
+        # The links of index.md are known, so only about.md is parsed for
+        # its links first; then each page is parsed and written in turn
+        site_links = {"index.html": ["/blog/tom"]}
+        with mock.patch("main.parse_page", parse), mock.patch("main.write_page", write), \
+                redirect_stdout(io.StringIO()):
+            generate_pages_for_targets(self.sources, self.template_path, [("/", None, None)],
+                                       site_links=site_links)
+        self.assertEqual(events, [
+            ("parse", "about.md"),
+            ("parse", "index.md"), ("write", "index.md"),
+            ("parse", "about.md"), ("write", "about.md"),
+        ])
+
+    def test_parse_pages_in_parallel_matches_serial(self):
+        pages = []
+        for i in range(20):
+            src_path = os.path.join(self.root, f"page{i}.md")
+            with open(src_path, "w") as f:
+                f.write(f"# Page {i}\n\n" + "Some **bold** [text](/p)\n\n" * i + "```python\nx = 1\n```")
+            pages.append((src_path, None))
+        serial_times = {}
+        serial = parse_pages(pages, self.template_path, 1, serial_times)
+        times = {}
+        with redirect_stdout(io.StringIO()) as out:
+            parallel = parse_pages(pages, self.template_path, 2, times)
+        self.assertIn("on 2 workers", out.getvalue())
+        self.assertEqual(parallel, serial)
+        self.assertEqual(sorted(times), sorted(src_path for src_path, _ in pages))
+        self.assertEqual(times[pages[3][0]]["size"], os.path.getsize(pages[3][0]))
+
+    def test_parse_targets(self):
+        self.assertEqual(parse_targets(["/=public", "/site/=docs"]), [("/", "public"), ("/site/", "docs")])
+        with self.assertRaises(ValueError):
+            parse_targets(["public"])
+        with self.assertRaises(ValueError):
+            parse_targets(["/=docs", "/site/=docs"])
+
+    def test_target_cache_path(self):
+        self.assertEqual(target_cache_path(".cache/sitemap.json", "docs", False), ".cache/sitemap.json")
+        self.assertEqual(target_cache_path(".cache/sitemap.json", "out/gh", True), ".cache/sitemap-out-gh.json")
+
+
+class SiteBuildTestCase(unittest.TestCase):
+    """
+    Builds a copy of the repository's own site in a temporary directory.
+    """
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for name in ("content", "static"):
+            shutil.copytree(os.path.join(repo, name), os.path.join(self.root, name))
+        shutil.copy(os.path.join(repo, "template.html"), self.root)
+        os.chdir(self.root)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+
+class TestShardedBuild(SiteBuildTestCase):
+    def test_merged_shards_match_full_build(self):
+        with redirect_stdout(io.StringIO()):
+            for shard in ("1/2", "2/2"):
+                build(parse_args(["--shard", shard, "--jobs", "1"]))
+            merge(parse_merge_args(["docs-shard-1-of-2", "docs-shard-2-of-2", "--output", "merged"]))
+            build(parse_args(["--output", "full", "--jobs", "1"]))
+        merged = hash_tree("merged")
+        merged.pop(MANIFEST_NAME, None)
+        self.assertEqual(merged, hash_tree("full"))
+
+
+    def test_shards_reuse_shared_link_graph(self):
+        with redirect_stdout(io.StringIO()):
+            links(parse_links_args(["--jobs", "1"]))
+        # Each shard runs on a fresh checkout with a copy of the link graph
+        os.remove(os.path.join(".cache", "metadata.json"))
+        for root, _, files in os.walk("content"):
+            for name in files:
+                os.utime(os.path.join(root, name), ns=(1, 1))
+
+        parsed = []
+        parse_page = main.parse_page
+        def count_parse(src_path, *args):
+            parsed.append(src_path)
+            return parse_page(src_path, *args)
+        with mock.patch("main.parse_page", count_parse), redirect_stdout(io.StringIO()):
+            build(parse_args(["--shard", "1/2", "--jobs", "1"]))
+        with open(os.path.join("docs-shard-1-of-2", MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        self.assertTrue(manifest["pages"])
+        self.assertEqual(sorted(parsed), sorted(page["source"] for page in manifest["pages"]))
+
+
+class TestPartialBuild(SiteBuildTestCase):
+    def test_only_selected_pages_are_scanned(self):
+        with redirect_stdout(io.StringIO()):
+            build(parse_args(["--jobs", "1"]))
+        with open(os.path.join("content", "contact", "index.md"), "a") as f:
+            f.write("\nEdited since.\n")
+
+        parsed = []
+        parse_page = main.parse_page
+        def count_parse(src_path, *args):
+            parsed.append(src_path)
+            return parse_page(src_path, *args)
+        with mock.patch("main.parse_page", count_parse), mock.patch("os.scandir", wraps=os.scandir) as scandir, \
+                redirect_stdout(io.StringIO()):
+            build(parse_args(["--only", "blog/tom", "--jobs", "1"]))
+        listed = {call.args[0] for call in scandir.call_args_list if call.args[0].startswith("content")}
+        self.assertEqual(parsed, [os.path.join("content", "blog", "tom", "index.md")])
+        self.assertEqual(listed, {"content", os.path.join("content", "blog"), os.path.join("content", "blog", "tom")})
+        # The pages left out are still in the menus
+        with open(os.path.join("docs", "blog", "tom", "index.html")) as f:
+            html = f.read()
+        self.assertIn('href="/contact/"', html)
+        self.assertIn('href="/blog/majesty/"', html)
+
+
+class TestSiteMaps(SiteBuildTestCase):
+    def sitemap_index(self):
+        with redirect_stdout(io.StringIO()):
+            build(parse_args(["--site-url", "https://example.com", "--jobs", "1"]))
+        with open(os.path.join(".cache", "sitemap.json")) as f:
+            return json.load(f)
+
+    def test_new_page_leaves_other_pages_unchanged(self):
+        before = self.sitemap_index()
+        os.makedirs(os.path.join("content", "blog", "new"))
+        with open(os.path.join("content", "blog", "new", "index.md"), "w") as f:
+            f.write("# New post\n\nLinks to [Tom](/blog/tom).\n")
+        after = self.sitemap_index()
+        # Its siblings' menus and hints changed, but not their own content
+        self.assertEqual(sorted(after), sorted(list(before) + ["blog/new/"]))
+        for url, entry in before.items():
+            self.assertEqual(after[url]["content_hash"], entry["content_hash"], url)
+
+
+class TestResumedBuild(SiteBuildTestCase):
+    def interrupted_build(self, argv, pages):
+        """
+        Run a build that crashes after writing the given number of pages.
+        """
+        write_page = main.write_page
+        written = []
+        def crash_after(*args):
+            if len(written) == pages:
+                raise KeyboardInterrupt
+            written.append(args[1])
+            return write_page(*args)
+        with mock.patch("main.write_page", crash_after), self.assertRaises(KeyboardInterrupt):
+            build(parse_args(argv))
+
+    def parse_counts(self, argv, crash_after=None):
+        """
+        Run a build, crashing it after the given number of parse_page calls,
+        and return the sources it parsed.
+        """
+        parse_page = main.parse_page
+        parsed = []
+        def count_parse(src_path, *args):
+            if len(parsed) == crash_after:
+                raise KeyboardInterrupt
+            parsed.append(src_path)
+            return parse_page(src_path, *args)
+        with mock.patch("main.parse_page", count_parse), redirect_stdout(io.StringIO()):
+            if crash_after is None:
+                build(parse_args(argv))
+            else:
+                with self.assertRaises(KeyboardInterrupt):
+                    build(parse_args(argv))
+        return parsed
+
+    def test_crash_while_parsing_is_resumable(self):
+        argv = ["--jobs", "1"]
+        sources = sorted(os.path.join(root, name) for root, _, files in os.walk("content") for name in files)
+        pages = len(sources)
+        # A cold build first parses every page for its links, then parses and
+        # writes them one by one; crash in the first pass, then in the second
+        first = self.parse_counts(argv, 2)
+        resumed = self.parse_counts(argv + ["--resume"], pages)
+        links_pass, written = resumed[:pages - 2], resumed[pages - 2:]
+        self.assertEqual(sorted(first + links_pass), sources)
+
+        # Only the pages not yet written are parsed again
+        finished = self.parse_counts(argv + ["--resume"])
+        self.assertEqual(len(finished), pages - 2)
+        self.assertFalse(set(finished) & set(written))
+
+    def test_resumed_plan_lists_files_of_interrupted_build(self):
+        for options in ([], ["--atomic"]):
+            with self.subTest(options=options):
+                output = f"out{len(options)}"
+                argv = ["--output", output, "--jobs", "1"] + options
+                with redirect_stdout(io.StringIO()):
+                    self.interrupted_build(argv, 2)
+                    build(parse_args(argv + ["--resume"]))
+                with open(os.path.join(".cache", "deploy-plan.json")) as f:
+                    plan = json.load(f)
+                self.assertEqual(plan["added"], sorted(hash_tree(output)))
+                self.assertEqual((plan["changed"], plan["unchanged"]), ([], 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from metadata import (
+    parse_front_matter,
+    split_front_matter,
+    read_metadata,
+    refresh_metadata_index,
+    list_pages,
+)
+from pathfilter import PathFilter
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_parse_front_matter(self):
+        meta = parse_front_matter(
+            'title: "Hello: World"\ndate: 2024-05-01\ntags: [tolkien, elves]\ndraft: true\ntemplate: post.html\n'
+        )
+        self.assertEqual(
+            meta,
+            {
+                "title": "Hello: World",
+                "date": "2024-05-01",
+                "tags": ["tolkien", "elves"],
+                "draft": True,
+                "template": "post.html",
+            },
+        )
+
+    def test_parse_front_matter_plain_tags(self):
+        self.assertEqual(parse_front_matter("tags: a, b"), {"tags": ["a", "b"]})
+
+    def test_parse_front_matter_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_front_matter("no colon here")
+
+    def test_split_front_matter(self):
+        meta, body = split_front_matter("---\ntitle: Hi\n---\n# Heading\n\nText")
+        self.assertEqual(meta, {"title": "Hi"})
+        self.assertEqual(body, "# Heading\n\nText")
+
+    def test_split_front_matter_none(self):
+        md = "# Heading\n\n---\nnot: front matter\n---"
+        self.assertEqual(split_front_matter(md), ({}, md))
+
+    def test_split_front_matter_unclosed(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\ntitle: Hi\n# Heading")
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.content_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.content_dir)
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.content_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_read_metadata_title_from_h1(self):
+        path = self.write("index.md", "Intro\n\n# The Title\n\nBody")
+        self.assertEqual(read_metadata(path), {"title": "The Title"})
+
+    def test_read_metadata_invalid_line_names_file(self):
+        path = self.write("blog/bad.md", "---\ntitle: Bad\nno colon here\n---\n# Bad")
+        with self.assertRaises(ValueError) as cm:
+            read_metadata(path)
+        self.assertIn(path, str(cm.exception))
+        self.assertIn("no colon here", str(cm.exception))
+
+    def test_read_metadata_front_matter_title_wins(self):
+        path = self.write("index.md", "---\ntitle: Front\ndate: 2024-01-01\n---\n# Body Title\n")
+        self.assertEqual(read_metadata(path), {"title": "Front", "date": "2024-01-01"})
+
+    def test_refresh_only_reads_changed_files(self):
+        a = self.write("a/index.md", "# A")
+        b = self.write("b/index.md", "# B")
+        index, read_count = refresh_metadata_index({}, self.content_dir)
+        self.assertEqual(read_count, 2)
+
+        index, read_count = refresh_metadata_index(index, self.content_dir)
+        self.assertEqual(read_count, 0)
+
+        self.write("b/index.md", "# B changed")
+        os.remove(a)
+        index, read_count = refresh_metadata_index(index, self.content_dir)
+        self.assertEqual(read_count, 1)
+        self.assertEqual(list(index), [b])
+        self.assertEqual(index[b]["meta"]["title"], "B changed")
+
+    def test_refresh_with_path_filter_keeps_other_entries(self):
+        a = self.write("a/index.md", "# A")
+        b = self.write("b/index.md", "# B")
+        index, _ = refresh_metadata_index({}, self.content_dir)
+
+        self.write("a/index.md", "# A changed")
+        self.write("b/index.md", "# B changed")
+        c = self.write("b/c.md", "# C")
+        with mock.patch("os.scandir", wraps=os.scandir) as scandir:
+            index, read_count = refresh_metadata_index(index, self.content_dir, PathFilter(only=["b/*"]))
+        # a/ is neither listed nor re-read; its entry is kept as it was
+        listed = sorted(os.path.relpath(call.args[0], self.content_dir) for call in scandir.call_args_list)
+        self.assertEqual(listed, [".", "b"])
+        self.assertEqual(read_count, 2)
+        self.assertEqual(sorted(index), [a, c, b])
+        self.assertEqual(index[a]["meta"]["title"], "A")
+        self.assertEqual(index[b]["meta"]["title"], "B changed")
+
+    def test_list_pages(self):
+        old = self.write("blog/old/index.md", "---\ndate: 2023-01-01\ntags: elves\n---\n# Old\n")
+        new = self.write("blog/new/index.md", "---\ndate: 2024-01-01\n---\n# New\n")
+        self.write("blog/wip/index.md", "---\ndate: 2025-01-01\ndraft: true\n---\n# WIP\n")
+        self.write("contact/index.md", "# Contact\n")
+        index, _ = refresh_metadata_index({}, self.content_dir)
+
+        blog = os.path.join(self.content_dir, "blog")
+        self.assertEqual([path for path, _ in list_pages(index, blog)], [new, old])
+        self.assertEqual([path for path, _ in list_pages(index, blog, tag="elves")], [old])
+        self.assertEqual(len(list_pages(index, blog, include_drafts=True)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from output import OutputWriter, load_json, save_json, scan_files, refresh_file_index
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.dest_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dest_dir)
+
+    def path(self, rel_path):
+        return os.path.join(self.dest_dir, rel_path)
+
+    def write(self, rel_path, text):
+        os.makedirs(os.path.dirname(self.path(rel_path)), exist_ok=True)
+        with open(self.path(rel_path), "w") as f:
+            f.write(text)
+
+    def test_identical_file_not_rewritten(self):
+        writer = OutputWriter(self.dest_dir)
+        writer.write_text(self.path("a/index.html"), "<p>hi</p>")
+        os.utime(self.path("a/index.html"), (1000, 1000))
+
+        writer = OutputWriter(self.dest_dir)
+        self.assertFalse(writer.write_text(self.path("a/index.html"), "<p>hi</p>"))
+        self.assertEqual(os.path.getmtime(self.path("a/index.html")), 1000)
+        self.assertEqual(writer.finish(), {"added": [], "changed": [], "deleted": [], "unchanged": 1})
+
+    def test_plan_lists_added_changed_deleted(self):
+        writer = OutputWriter(self.dest_dir)
+        writer.write_text(self.path("keep.html"), "same")
+        writer.write_text(self.path("edit.html"), "old")
+        writer.write_text(self.path("old/gone.html"), "bye")
+        writer.finish()
+
+        writer = OutputWriter(self.dest_dir)
+        writer.write_text(self.path("keep.html"), "same")
+        self.assertTrue(writer.write_text(self.path("edit.html"), "new"))
+        writer.write_text(self.path("new.html"), "hello")
+        plan = writer.finish()
+
+        self.assertEqual(plan["added"], ["new.html"])
+        self.assertEqual(plan["changed"], ["edit.html"])
+        self.assertEqual(plan["deleted"], [os.path.join("old", "gone.html")])
+        self.assertEqual(plan["unchanged"], 1)
+        self.assertFalse(os.path.exists(self.path("old")))
+        with open(self.path("edit.html")) as f:
+            self.assertEqual(f.read(), "new")
+
+    def test_copy_file(self):
+        src_dir = tempfile.mkdtemp()
+        try:
+            src = os.path.join(src_dir, "style.css")
+            with open(src, "w") as f:
+                f.write("body {}")
+            writer = OutputWriter(self.dest_dir)
+            self.assertTrue(writer.copy_file(src, self.path("style.css")))
+
+            writer = OutputWriter(self.dest_dir)
+            self.assertFalse(writer.copy_file(src, self.path("style.css")))
+            self.assertEqual(writer.finish()["unchanged"], 1)
+        finally:
+            shutil.rmtree(src_dir)
+
+    def test_kept_file_not_deleted(self):
+        writer = OutputWriter(self.dest_dir)
+        writer.write_text(self.path("done.html"), "done")
+        writer.write_text(self.path("gone.html"), "bye")
+        writer.finish()
+
+        writer = OutputWriter(self.dest_dir)
+        writer.keep(self.path("done.html"))
+        plan = writer.finish()
+        self.assertTrue(os.path.exists(self.path("done.html")))
+        self.assertEqual(plan["deleted"], ["gone.html"])
+        self.assertEqual(plan["unchanged"], 1)
+
+    def test_failed_write_leaves_old_file(self):
+        writer = OutputWriter(self.dest_dir)
+        writer.write_text(self.path("page.html"), "old")
+        with mock.patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                writer.write_text(self.path("page.html"), "new")
+        with open(self.path("page.html")) as f:
+            self.assertEqual(f.read(), "old")
+        # No temporary file is left behind
+        self.assertEqual(os.listdir(self.dest_dir), ["page.html"])
+
+    def test_load_json(self):
+        path = self.path("state.json")
+        self.assertEqual(load_json(path, {"pages": {}}), {"pages": {}})
+        save_json({"a": [1]}, path)
+        self.assertEqual(load_json(path, {}), {"a": [1]})
+
+    def test_refresh_file_index_reads_only_changed_files(self):
+        for name, text in (("a.md", "a"), ("sub/b.md", "b"), ("sub/c.txt", "c")):
+            self.write(name, text)
+        read = []
+        def read_size(path):
+            read.append(path)
+            return {"length": os.path.getsize(path)}
+
+        index, read_count = refresh_file_index({}, scan_files(self.dest_dir, ".md"), read_size)
+        self.assertEqual(sorted(index), [self.path("a.md"), self.path("sub/b.md")])
+        self.assertEqual(read_count, 2)
+
+        os.remove(self.path("a.md"))
+        self.write("sub/b.md", "b2")
+        index, read_count = refresh_file_index(index, scan_files(self.dest_dir, ".md"), read_size)
+        self.assertEqual(list(index), [self.path("sub/b.md")])
+        self.assertEqual((read_count, index[self.path("sub/b.md")]["length"]), (1, 2))
+
+if __name__ == "__main__":
+    unittest.main()
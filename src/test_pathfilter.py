@@ -0,0 +1,82 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from pathfilter import PathFilter
+from main import discover_pages, copy_directory
+
+
+class TestPathFilter(unittest.TestCase):
+    def test_only(self):
+        path_filter = PathFilter(only=["blog/*"])
+        self.assertTrue(path_filter.includes_file("blog/tom/index.md"))
+        self.assertFalse(path_filter.includes_file("index.md"))
+        self.assertTrue(path_filter.includes_dir("blog"))
+        self.assertFalse(path_filter.includes_dir("contact"))
+
+    def test_only_directory_selects_subtree(self):
+        path_filter = PathFilter(only=["blog/tom"])
+        self.assertTrue(path_filter.includes_dir("blog"))
+        self.assertTrue(path_filter.includes_file("blog/tom/index.md"))
+        self.assertFalse(path_filter.includes_file("blog/index.md"))
+        self.assertFalse(path_filter.includes_dir("contact"))
+
+    def test_exclude(self):
+        path_filter = PathFilter(exclude=["blog", "*.draft.md"])
+        self.assertFalse(path_filter.includes_dir("blog"))
+        self.assertFalse(path_filter.includes_file("blog/tom/index.md"))
+        self.assertFalse(path_filter.includes_file("notes.draft.md"))
+        self.assertTrue(path_filter.includes_file("index.md"))
+        self.assertTrue(path_filter.includes_dir("contact"))
+
+    def test_only_and_exclude(self):
+        path_filter = PathFilter(only=["blog/*"], exclude=["blog/tom"])
+        self.assertTrue(path_filter.includes_file("blog/majesty/index.md"))
+        self.assertFalse(path_filter.includes_file("blog/tom/index.md"))
+        self.assertFalse(path_filter.includes_dir("blog/tom"))
+
+
+class TestPartialWalks(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, rel_path, text="x"):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_discover_pages_prunes_subtrees(self):
+        for rel_path in ["content/index.md", "content/blog/a/index.md", "content/blog/b/index.md",
+                         "content/contact/index.md"]:
+            self.write(rel_path)
+        path_filter = PathFilter(only=["blog/a"])
+        with mock.patch("os.listdir", wraps=os.listdir) as listdir:
+            pages = discover_pages(os.path.join(self.root, "content"), "docs", path_filter=path_filter)
+        listed = sorted(os.path.relpath(call.args[0], self.root) for call in listdir.call_args_list)
+        # contact/ and blog/b/ are never listed
+        self.assertEqual(listed, ["content", "content/blog", "content/blog/a"])
+        self.assertEqual([page[2] for page in pages], ["blog/a/"])
+
+    def test_copy_directory_only_referenced(self):
+        for rel_path in ["static/index.css", "static/images/a.png", "static/images/b.png", "static/fonts/f.woff"]:
+            self.write(rel_path)
+        dest_dir = os.path.join(self.root, "docs")
+        with redirect_stdout(io.StringIO()):
+            copy_directory(os.path.join(self.root, "static"), dest_dir, only={"index.css", "images/a.png"})
+        copied = sorted(
+            os.path.relpath(os.path.join(root, name), dest_dir)
+            for root, _, files in os.walk(dest_dir) for name in files
+        )
+        self.assertEqual(copied, ["images/a.png", "index.css"])
+
+
+if __name__ == "__main__":
+    unittest.main()
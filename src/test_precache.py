@@ -0,0 +1,102 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from precache import (
+    PRECACHE_MANIFEST_NAME,
+    SERVICE_WORKER_NAME,
+    service_worker_script,
+    hash_static_files,
+    update_page_state,
+    precache_entries,
+    write_service_worker,
+)
+from pathfilter import PathFilter
+
+
+class TestPrecache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.static_dir = os.path.join(self.root, "static")
+        self.dest_dir = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.static_dir, "images"))
+        self.write("index.css", "body {}")
+        self.write("images/tom.png", "x" * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, rel_path, text):
+        with open(os.path.join(self.static_dir, rel_path), "w") as f:
+            f.write(text)
+
+    def page(self, rel_path, digest, size):
+        return {"dest": os.path.join(self.dest_dir, rel_path), "hash": digest, "size": size}
+
+    def test_static_files_hashed_once(self):
+        state, read_count = hash_static_files({}, self.static_dir)
+        self.assertEqual(read_count, 2)
+        state, read_count = hash_static_files(state, self.static_dir)
+        self.assertEqual(read_count, 0)
+
+        self.write("index.css", "body { color: red; }")
+        os.remove(os.path.join(self.static_dir, "images/tom.png"))
+        new_state, read_count = hash_static_files(state, self.static_dir)
+        self.assertEqual(read_count, 1)
+        self.assertEqual(list(new_state), [os.path.join(self.static_dir, "index.css")])
+
+    def test_page_state_keeps_unbuilt_pages(self):
+        state = update_page_state({}, [self.page("index.html", "a" * 64, 10), self.page("old.html", "b" * 64, 5)],
+                                  {"index.html", "old.html"}, self.dest_dir)
+        # A partial build of blog/tom/ only, after old.html was deleted
+        state = update_page_state(state, [self.page("blog/tom/index.html", "c" * 64, 20)],
+                                  {"index.html", "blog/tom/index.html"}, self.dest_dir)
+        self.assertEqual(sorted(state), ["blog/tom/index.html", "index.html"])
+
+    def test_entries(self):
+        static, _ = hash_static_files({}, self.static_dir)
+        pages = {"index.html": {"hash": "a" * 64, "size": 10}, "blog/tom/index.html": {"hash": "b" * 64, "size": 20}}
+        entries, skipped = precache_entries({"pages": pages, "static": static}, self.static_dir)
+        self.assertEqual([entry["url"] for entry in entries], ["blog/tom/", "./", "images/tom.png", "index.css"])
+        self.assertEqual(entries[0]["revision"], "b" * 16)
+        self.assertEqual(skipped, 0)
+
+    def test_entries_rules_and_caps(self):
+        static, _ = hash_static_files({}, self.static_dir)
+        pages = {"index.html": {"hash": "a" * 64, "size": 10}, "blog/tom/index.html": {"hash": "b" * 64, "size": 20}}
+        state = {"pages": pages, "static": static}
+
+        entries, skipped = precache_entries(state, self.static_dir, PathFilter(exclude=["images"]))
+        self.assertEqual([entry["url"] for entry in entries], ["blog/tom/", "./", "index.css"])
+        self.assertEqual(skipped, 0)
+
+        entries, skipped = precache_entries(state, self.static_dir, max_file_size=50)
+        self.assertNotIn("images/tom.png", [entry["url"] for entry in entries])
+        self.assertEqual(skipped, 1)
+
+        entries, skipped = precache_entries(state, self.static_dir, max_total_size=35)
+        self.assertEqual([entry["url"] for entry in entries], ["blog/tom/", "./"])
+        self.assertEqual(skipped, 2)
+
+    def test_write_service_worker(self):
+        entries = [{"url": "./", "revision": "a" * 16, "size": 10}]
+        version = write_service_worker(entries, self.dest_dir)
+        with open(os.path.join(self.dest_dir, PRECACHE_MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest, {"version": version, "entries": entries})
+        with open(os.path.join(self.dest_dir, SERVICE_WORKER_NAME)) as f:
+            self.assertIn(f'const VERSION = "{version}";', f.read())
+
+        # The version, and so the worker, only changes with the entries
+        self.assertEqual(write_service_worker(entries, self.dest_dir), version)
+        entries[0]["revision"] = "b" * 16
+        self.assertNotEqual(write_service_worker(entries, self.dest_dir), version)
+
+    def test_service_worker_script(self):
+        self.assertIn('register("/sw.js")', service_worker_script())
+
+
+if __name__ == "__main__":
+    unittest.main()
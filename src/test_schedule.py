@@ -0,0 +1,48 @@
+import unittest
+
+from schedule import MIN_ITEMS_PER_JOB, pool_size, estimate_costs, make_batches, lower_bound
+
+
+class TestSchedule(unittest.TestCase):
+    def test_estimate_costs_without_timings_uses_size(self):
+        self.assertEqual(estimate_costs({"a.md": 100, "b.md": 5}, {}), {"a.md": 100, "b.md": 5})
+
+    def test_estimate_costs_scales_timings(self):
+        times = {"a.md": {"seconds": 2.0, "size": 100}, "b.md": {"seconds": 1.0, "size": 100}}
+        costs = estimate_costs({"a.md": 200, "b.md": 100, "new.md": 50}, times)
+        self.assertEqual(costs["a.md"], 4.0)
+        self.assertEqual(costs["b.md"], 1.0)
+        # Priced at the average rate of the timed pages: 3s per 200 bytes
+        self.assertEqual(costs["new.md"], 0.75)
+
+    def test_make_batches_sends_large_items_alone_and_groups_small_ones(self):
+        costs = {"big": 40, "mid": 12}
+        costs.update((f"small{i}", 1) for i in range(8))
+        batches = make_batches(sorted(costs), costs, 2)
+        self.assertEqual(batches[0], ["big"])
+        self.assertEqual(batches[1], ["mid"])
+        self.assertEqual(sorted(item for batch in batches for item in batch), sorted(costs))
+        self.assertTrue(all(len(batch) > 1 for batch in batches[2:]))
+        batch_costs = [sum(costs[item] for item in batch) for batch in batches]
+        self.assertEqual(batch_costs, sorted(batch_costs, reverse=True))
+
+    def test_make_batches_max_items(self):
+        # A fair share of the cost would be 10 items
+        costs = {f"p{i}": 1 for i in range(40)}
+        batches = make_batches(sorted(costs), costs, 1, 3)
+        self.assertEqual([len(batch) for batch in batches], [3] * 13 + [1])
+
+    def test_lower_bound(self):
+        self.assertEqual(lower_bound([1, 1, 1, 1], 2), 2)
+        self.assertEqual(lower_bound([5, 1, 1], 4), 5)
+        self.assertEqual(lower_bound([], 4), 0)
+
+    def test_pool_size(self):
+        self.assertEqual(pool_size(1000, 1), 1)
+        self.assertEqual(pool_size(2 * MIN_ITEMS_PER_JOB - 1, 4), 1)
+        self.assertEqual(pool_size(2 * MIN_ITEMS_PER_JOB, 4), 2)
+        self.assertEqual(pool_size(1000, 4), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from server import PageCache, resolve_page
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.root, "content")
+        os.makedirs(os.path.join(self.content_dir, "blog", "tom"))
+        self.index = self.write("content/index.md", "# Home")
+        self.tom = self.write("content/blog/tom/index.md", "# Tom")
+        self.template = self.write("template.html", "<title>{{ Title }}</title>")
+        self.renders = []
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, rel_path, text, mtime=None):
+        path = os.path.join(self.root, rel_path)
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def render(self, source_path, template_path, basepath="/"):
+        self.renders.append(source_path)
+        with open(source_path) as f:
+            markdown = f.read()
+        with open(template_path) as f:
+            template = f.read()
+        return markdown, template.replace("{{ Title }}", markdown), template_path
+
+    def test_resolve_page(self):
+        self.assertEqual(resolve_page(self.content_dir, "/"), self.index)
+        self.assertEqual(resolve_page(self.content_dir, "/blog/tom/"), self.tom)
+        self.assertEqual(resolve_page(self.content_dir, "/blog/tom"), self.tom)
+        self.assertEqual(resolve_page(self.content_dir, "/blog/tom/index.html"), self.tom)
+        self.assertIsNone(resolve_page(self.content_dir, "/index.css"))
+        self.assertIsNone(resolve_page(self.content_dir, "/blog/missing/"))
+        self.assertIsNone(resolve_page(self.content_dir, "/../content/"))
+
+    def test_cache_renders_once(self):
+        cache = PageCache(self.render, self.template)
+        self.assertEqual(cache.get(self.tom), "<title># Tom</title>")
+        cache.get(self.tom)
+        self.assertEqual(self.renders, [self.tom])
+
+    def test_cache_invalidated_by_source_change(self):
+        cache = PageCache(self.render, self.template)
+        cache.get(self.tom)
+        self.write("content/blog/tom/index.md", "# Tom 2", mtime=1000)
+        self.assertEqual(cache.get(self.tom), "<title># Tom 2</title>")
+        self.assertEqual(len(self.renders), 2)
+
+    def test_cache_invalidated_by_template_change(self):
+        cache = PageCache(self.render, self.template)
+        cache.get(self.tom)
+        self.write("template.html", "<h1>{{ Title }}</h1>", mtime=1000)
+        self.assertEqual(cache.get(self.tom), "<h1># Tom</h1>")
+        self.assertEqual(len(self.renders), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
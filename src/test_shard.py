@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from output import OutputWriter
+from shard import parse_shard, assign_shards, write_manifest, hash_tree, merge_shards
+
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for spec in ("0/4", "5/4", "1", "a/b", "1/0"):
+            with self.assertRaises(ValueError):
+                parse_shard(spec)
+
+    def test_hash_assignment_is_stable_partition(self):
+        sources = [os.path.join("content", f"p{i}", "index.md") for i in range(50)]
+        shards = assign_shards(sources, 4, "content")
+        self.assertEqual(set(shards), set(sources))
+        self.assertTrue(set(shards.values()) <= {1, 2, 3, 4})
+        # Same paths under another checkout land on the same shards
+        moved = [os.path.join("/ci/site/content", f"p{i}", "index.md") for i in range(50)]
+        moved_shards = assign_shards(moved, 4, "/ci/site/content")
+        self.assertEqual(
+            [shards[source] for source in sources],
+            [moved_shards[source] for source in moved],
+        )
+
+    def test_cost_assignment_balances(self):
+        costs = {"content/a.md": 10, "content/b.md": 6, "content/c.md": 5, "content/d.md": 1}
+        shards = assign_shards(list(costs), 2, "content", costs)
+        self.assertEqual(shards, {"content/a.md": 1, "content/b.md": 2, "content/c.md": 2, "content/d.md": 1})
+
+    def make_shard(self, name, shard, count, files):
+        shard_dir = os.path.join(self.root, name)
+        pages = []
+        for rel_path, text in files.items():
+            path = os.path.join(shard_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(text)
+            pages.append({"source": rel_path, "dest": path, "title": rel_path, "hash": ""})
+        write_manifest(shard_dir, shard, count, pages, hash_tree(shard_dir))
+        return shard_dir
+
+    def test_merge(self):
+        one = self.make_shard("s1", 1, 2, {"index.html": "home", "a/index.html": "a"})
+        two = self.make_shard("s2", 2, 2, {"b/index.html": "b"})
+        dest_dir = os.path.join(self.root, "docs")
+        writer = OutputWriter(dest_dir)
+        pages = merge_shards([one, two], dest_dir, writer)
+        writer.finish()
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(
+            sorted(hash_tree(dest_dir)),
+            sorted(["index.html", os.path.join("a", "index.html"), os.path.join("b", "index.html")]),
+        )
+
+    def test_merge_rejects_overlap(self):
+        one = self.make_shard("s1", 1, 2, {"index.html": "home"})
+        two = self.make_shard("s2", 2, 2, {"index.html": "other"})
+        with self.assertRaises(ValueError):
+            merge_shards([one, two], os.path.join(self.root, "docs"), OutputWriter(os.path.join(self.root, "docs")))
+
+    def test_merge_rejects_missing_shard(self):
+        one = self.make_shard("s1", 1, 3, {"index.html": "home"})
+        two = self.make_shard("s2", 2, 3, {"b.html": "b"})
+        with self.assertRaises(ValueError):
+            merge_shards([one, two], os.path.join(self.root, "docs"), OutputWriter(os.path.join(self.root, "docs")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from siteindex import SiteIndex
+from pathfilter import PathFilter
+
+
+class TestSiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.root, "content")
+        self.metadata = {}
+        self.write("index.md", {"title": "Home Page"})
+        self.write("blog/tom/index.md", {"title": "Tom"})
+        self.write("blog/elves/index.md", {"title": "Elves", "order": "1"})
+        self.write("blog/secret/index.md", {"title": "Secret", "draft": True})
+        self.write("contact/index.md", {"title": "Contact & Co"})
+        self.write("notes.md", {"title": "Notes"})
+        os.makedirs(os.path.join(self.content_dir, "empty"))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, rel_path, meta):
+        path = os.path.join(self.content_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(f"# {meta['title']}\n")
+        self.metadata[path] = {"mtime": 0, "size": 0, "meta": meta}
+
+    def test_hierarchy(self):
+        index = SiteIndex(self.content_dir, "docs", self.metadata)
+        self.assertEqual(index.nodes[""]["children"], ["blog/", "contact/", "notes.html"])
+        # "order" comes first, then titles; drafts are left out
+        self.assertEqual(index.nodes["blog/"]["children"], ["blog/elves/", "blog/tom/"])
+        self.assertEqual(index.nodes["blog/tom/"]["parent"], "blog/")
+        self.assertEqual(index.nodes["blog/tom/"]["dest"], os.path.join("docs", "blog", "tom", "index.html"))
+        # A directory without an index.md is titled after its name
+        self.assertEqual(index.nodes["blog/"]["title"], "Blog")
+        self.assertIsNone(index.nodes["blog/"]["source"])
+        self.assertNotIn("empty/", index.nodes)
+
+    def test_drafts_included(self):
+        index = SiteIndex(self.content_dir, "docs", self.metadata, include_drafts=True)
+        self.assertIn("blog/secret/", index.nodes["blog/"]["children"])
+
+    def test_sources(self):
+        index = SiteIndex(self.content_dir, "docs", self.metadata)
+        urls = [url for _, _, url in index.sources()]
+        self.assertEqual(urls, ["blog/elves/", "blog/secret/", "blog/tom/", "contact/", "", "notes.html"])
+        urls = [url for _, _, url in index.sources(PathFilter(only=["blog/*"], exclude=["blog/secret"]))]
+        self.assertEqual(urls, ["blog/elves/", "blog/tom/"])
+
+    def test_nav(self):
+        index = SiteIndex(self.content_dir, "docs", self.metadata)
+        site_menu = (
+            '<nav class="menu"><ul><li><a href="/">Home Page</a></li><li><span>Blog</span></li>'
+            '<li><a href="/contact/">Contact &amp; Co</a></li><li><a href="/notes.html">Notes</a></li></ul></nav>'
+        )
+        self.assertEqual(index.nav(""), site_menu)
+        self.assertEqual(index.nav("contact/"), site_menu)
+        self.assertEqual(
+            index.nav("blog/tom/"),
+            site_menu + '\n    <nav class="menu section"><ul><li><a href="/blog/elves/">Elves</a></li>'
+            '<li><a href="/blog/tom/">Tom</a></li></ul></nav>',
+        )
+
+    def test_pruned_scan_takes_other_pages_from_metadata(self):
+        full = SiteIndex(self.content_dir, "docs", self.metadata)
+        with mock.patch("os.scandir", wraps=os.scandir) as scandir:
+            index = SiteIndex(self.content_dir, "docs", self.metadata, path_filter=PathFilter(only=["blog/tom"]))
+        listed = sorted(os.path.relpath(call.args[0], self.root) for call in scandir.call_args_list)
+        # contact/ and the other posts are never listed, yet still in the menus
+        self.assertEqual(listed, ["content", "content/blog", "content/blog/tom"])
+        self.assertEqual(index.nodes, full.nodes)
+        self.assertEqual(index.nav("blog/tom/"), full.nav("blog/tom/"))
+        self.assertEqual(index.sources(PathFilter(only=["blog/tom"])), full.sources(PathFilter(only=["blog/tom"])))
+
+    def test_menus_rendered_once_per_directory(self):
+        index = SiteIndex(self.content_dir, "docs", self.metadata)
+        self.assertIs(index._menu("blog/"), index._menu("blog/"))
+        index.nav("blog/tom/")
+        index.nav("blog/elves/")
+        self.assertEqual(sorted(index._menus), ["", "blog/"])
+
+    def test_breadcrumbs(self):
+        index = SiteIndex(self.content_dir, "docs", self.metadata)
+        self.assertEqual(index.breadcrumbs(""), "")
+        self.assertEqual(
+            index.breadcrumbs("blog/tom/"),
+            '<nav class="breadcrumbs"><a href="/">Home Page</a> / <span>Blog</span> / '
+            '<span aria-current="page">Tom</span></nav>',
+        )
+        self.assertEqual(index.breadcrumbs("blog/secret/"), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sitemap import page_url, update_index, write_sitemaps, write_feed
+import sitemap
+
+
+class TestSitemap(unittest.TestCase):
+    def setUp(self):
+        self.dest_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dest_dir)
+
+    def page(self, rel_path, title, digest):
+        return {
+            "source": "content/" + rel_path,
+            "dest": os.path.join(self.dest_dir, rel_path),
+            "title": title,
+            "hash": digest,
+            "content_hash": digest,
+        }
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html"), "")
+        self.assertEqual(page_url(os.path.join("blog", "tom", "index.html")), "blog/tom/")
+        self.assertEqual(page_url("about.html"), "about.html")
+
+    def test_lastmod_kept_when_content_unchanged(self):
+        pages = [self.page("index.html", "Home", "a"), self.page("blog/tom/index.html", "Tom", "b")]
+        index = update_index({}, pages, self.dest_dir, "2024-01-01T00:00:00Z")
+
+        # A new menu entry or prefetch hint changes the output of the home
+        # page, but not its own content
+        pages[0]["hash"] = "a2"
+        pages[1]["content_hash"] = "c"
+        index = update_index(index, pages, self.dest_dir, "2024-02-01T00:00:00Z")
+        self.assertEqual(index[""]["lastmod"], "2024-01-01T00:00:00Z")
+        self.assertEqual(index["blog/tom/"]["lastmod"], "2024-02-01T00:00:00Z")
+
+    def test_removed_pages_are_dropped(self):
+        index = update_index({}, [self.page("index.html", "Home", "a")], self.dest_dir)
+        index = update_index(index, [], self.dest_dir)
+        self.assertEqual(index, {})
+
+    def test_write_sitemap(self):
+        pages = [self.page("index.html", "Home", "a"), self.page("blog/tom/index.html", "Tom", "b")]
+        index = update_index({}, pages, self.dest_dir, "2024-01-01T00:00:00Z")
+        write_sitemaps(index, self.dest_dir, "https://example.com", "/site/")
+        with open(os.path.join(self.dest_dir, "sitemap.xml")) as f:
+            xml = f.read()
+        self.assertIn("<loc>https://example.com/site/</loc>", xml)
+        self.assertIn("<loc>https://example.com/site/blog/tom/</loc>", xml)
+        self.assertIn("<lastmod>2024-01-01T00:00:00Z</lastmod>", xml)
+
+    def test_write_sitemap_index_when_too_many_urls(self):
+        pages = [self.page(f"p{i}/index.html", f"Page {i}", str(i)) for i in range(5)]
+        index = update_index({}, pages, self.dest_dir, "2024-01-01T00:00:00Z")
+        old_max = sitemap.MAX_URLS_PER_SITEMAP
+        sitemap.MAX_URLS_PER_SITEMAP = 2
+        try:
+            write_sitemaps(index, self.dest_dir, "https://example.com")
+        finally:
+            sitemap.MAX_URLS_PER_SITEMAP = old_max
+        with open(os.path.join(self.dest_dir, "sitemap.xml")) as f:
+            xml = f.read()
+        self.assertIn("<sitemapindex", xml)
+        self.assertIn("https://example.com/sitemap-3.xml", xml)
+        self.assertTrue(os.path.exists(os.path.join(self.dest_dir, "sitemap-3.xml")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "sitemap-4.xml")))
+
+    def test_write_feed_only_blog_newest_first(self):
+        index = {
+            "": {"title": "Home", "content_hash": "a", "lastmod": "2024-01-01T00:00:00Z"},
+            "contact/": {"title": "Contact", "content_hash": "b", "lastmod": "2024-01-01T00:00:00Z"},
+            "blog/old/": {"title": "Old", "content_hash": "c", "lastmod": "2024-01-01T00:00:00Z"},
+            "blog/new/": {"title": "New & Shiny", "content_hash": "d", "lastmod": "2024-03-01T00:00:00Z"},
+        }
+        write_feed(index, self.dest_dir, "https://example.com")
+        with open(os.path.join(self.dest_dir, "feed.xml")) as f:
+            xml = f.read()
+        self.assertNotIn("contact", xml)
+        self.assertIn("New &amp; Shiny", xml)
+        self.assertLess(xml.index("blog/new/"), xml.index("blog/old/"))
+        self.assertIn("<updated>2024-03-01T00:00:00Z</updated>", xml)
+
+    def test_write_feed_ordered_by_date(self):
+        pages = [self.page("blog/old/index.html", "Old", "a"), self.page("blog/new/index.html", "New", "b"),
+                 self.page("blog/undated/index.html", "Undated", "c")]
+        pages[0]["date"] = "2023-05-01"
+        pages[1]["date"] = "2024-06-01"
+        index = update_index({}, pages[:2], self.dest_dir, "2024-01-01T00:00:00Z")
+        # Editing the old post moves its lastmod, not its place in the feed
+        pages[0]["content_hash"] = "a2"
+        index = update_index(index, pages, self.dest_dir, "2024-09-01T00:00:00Z")
+        self.assertEqual(index["blog/old/"]["date"], "2023-05-01")
+
+        write_feed(index, self.dest_dir, "https://example.com")
+        with open(os.path.join(self.dest_dir, "feed.xml")) as f:
+            xml = f.read()
+        self.assertLess(xml.index("blog/undated/"), xml.index("blog/new/"))
+        self.assertLess(xml.index("blog/new/"), xml.index("blog/old/"))
+        self.assertIn("<updated>2024-09-01T00:00:00Z</updated>\n  <author>", xml)
+
+    def test_write_feed_without_entries_is_stable(self):
+        index = {
+            "": {"title": "Home", "content_hash": "a", "lastmod": "2024-01-01T00:00:00Z"},
+            "contact/": {"title": "Contact", "content_hash": "b", "lastmod": "2024-02-01T00:00:00Z"},
+        }
+        write_feed(index, self.dest_dir, "https://example.com")
+        with open(os.path.join(self.dest_dir, "feed.xml")) as f:
+            xml = f.read()
+        self.assertIn("<updated>2024-02-01T00:00:00Z</updated>", xml)
+        self.assertNotIn("<entry>", xml)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import os
 import unittest
 
 from textnode import (
@@ -12,8 +13,16 @@ from textnode import (
     markdown_to_blocks,
     block_to_block_type,
     markdown_to_html_node,
+    markdown_to_html,
     extract_title,
+    register_block_type,
+    markdown_errors,
+    new_page_refs,
+    SpanTextNode,
+    text_to_span_nodes,
+    markdown_to_html_spans,
 )
+import textnode
 
 class TestTextNode(unittest.TestCase):
     def test_eq(self):
@@ -415,6 +424,33 @@ Block three"""
         self.assertEqual(block_to_block_type("Just a normal paragraph"), BlockType.PARAGRAPH)
         self.assertEqual(block_to_block_type("Multiple lines\nof text\nhere"), BlockType.PARAGRAPH)
 
+    def test_block_to_block_type_table(self):
+        self.assertEqual(block_to_block_type("| a | b |\n|---|:-:|\n| 1 | 2 |"), BlockType.TABLE)
+        self.assertEqual(block_to_block_type("| a | b |\n| 1 | 2 |"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("| a |"), BlockType.PARAGRAPH)
+
+    def test_block_to_block_type_admonition(self):
+        self.assertEqual(block_to_block_type("!!! note\n    Body"), BlockType.ADMONITION)
+        self.assertEqual(block_to_block_type('!!! warning "Careful"\n    Body'), BlockType.ADMONITION)
+        self.assertEqual(block_to_block_type("!!!note"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("![alt](/img.png)"), BlockType.PARAGRAPH)
+
+    def test_block_to_block_type_html(self):
+        self.assertEqual(block_to_block_type("<div>\nraw\n</div>"), BlockType.HTML)
+        self.assertEqual(block_to_block_type("<!-- comment -->"), BlockType.HTML)
+        self.assertEqual(block_to_block_type("<hr/>"), BlockType.HTML)
+        self.assertEqual(block_to_block_type("<DETAILS open>\nx\n</DETAILS>"), BlockType.HTML)
+        self.assertEqual(block_to_block_type("<b>Note</b> see **this**"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("<divider>"), BlockType.PARAGRAPH)
+
+    def test_paragraph_starting_with_inline_tag(self):
+        md = "<b>Note</b> see **this** and [that](/that)"
+        expected = '<div><p><b>Note</b> see <b>this</b> and <a href="/that">that</a></p></div>'
+        self.assertEqual(markdown_to_html(md), expected)
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        self.assertEqual(block_to_block_type("< not a tag"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("<3 markdown"), BlockType.PARAGRAPH)
+
     def test_paragraphs(self):
         md = """
 This is **bolded** paragraph
@@ -447,6 +483,28 @@ the **same** even with inline stuff
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff</code></pre></div>",
         )
 
+    def test_codeblock_language_class(self):
+        md = """
+```python
+x = None  # nothing
+```
+"""
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            '<div><pre><code class="language-python">x = <span class="kc">None</span>  <span class="c"># nothing</span></code></pre></div>',
+        )
+
+    def test_codeblock_unknown_language(self):
+        md = "```rust\nlet x = 1;\n```"
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(html, '<div><pre><code class="language-rust">let x = 1;</code></pre></div>')
+
+    def test_codeblock_first_line_is_not_language(self):
+        md = "```\nfoo\nbar\n```"
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(html, "<div><pre><code>foo\nbar</code></pre></div>")
+
     def test_headings(self):
         md = """
 # Heading 1
@@ -542,5 +600,166 @@ More content here
         with self.assertRaises(ValueError):
             extract_title(md)
 
+    def test_markdown_to_html_matches_tree(self):
+        md = """
+# Title with **bold** and `code`
+
+A paragraph with _italic_, a [link](https://example.com)
+and an ![image](/images/tom.png) ![second](/b.png)[after](/c)
+
+```python
+print("hi")
+```
+
+```
+plain _code_
+```
+
+> quoted **text**
+>second line
+
+- item [one](/1)
+- item _two_
+
+1. first
+2. second
+3. `third`
+"""
+        self.assertEqual(markdown_to_html(md), markdown_to_html_node(md).to_html())
+
+    def test_markdown_to_html_matches_content(self):
+        content_dir = os.path.join(os.path.dirname(__file__), "..", "content")
+        for root, _, files in os.walk(content_dir):
+            for name in files:
+                if not name.endswith(".md"):
+                    continue
+                with open(os.path.join(root, name)) as f:
+                    md = f.read()
+                self.assertEqual(markdown_to_html(md), markdown_to_html_node(md).to_html())
+
+    def test_table(self):
+        md = """
+| Name | Role |
+| --- | --- |
+| **Tom** | [wiki](/tom) |
+| Sam | _gardener_ |
+"""
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            "<div><table><thead><tr><th>Name</th><th>Role</th></tr></thead>"
+            "<tbody><tr><td><b>Tom</b></td><td><a href=\"/tom\">wiki</a></td></tr>"
+            "<tr><td>Sam</td><td><i>gardener</i></td></tr></tbody></table></div>",
+        )
+        self.assertEqual(markdown_to_html(md), html)
+
+    def test_admonition(self):
+        md = """
+!!! warning "Mind the **gap**"
+    Stand behind
+    the line.
+
+!!! note
+"""
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            '<div><div class="admonition warning"><p class="admonition-title">Mind the <b>gap</b></p>'
+            "<p>Stand behind the line.</p></div>"
+            '<div class="admonition note"><p class="admonition-title">Note</p></div></div>',
+        )
+        self.assertEqual(markdown_to_html(md), html)
+
+    def test_html_block(self):
+        md = """
+<!-- keep -->
+
+<figure class="wide">
+  <img src="/a.png">
+</figure>
+"""
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            '<div><!-- keep --><figure class="wide">\n  <img src="/a.png">\n</figure></div>',
+        )
+        self.assertEqual(markdown_to_html(md), html)
+
+    def test_register_block_type(self):
+        def is_rule(block):
+            return block == "***"
+
+        def rule_node(block):
+            return textnode.LeafNode("hr", "")
+
+        def emit_rule(block, out, refs):
+            out.append("<hr></hr>")
+
+        dispatch = {char: list(rules) for char, rules in textnode._BLOCK_DISPATCH.items()}
+        handlers = dict(textnode._BLOCK_HANDLERS)
+        try:
+            register_block_type("rule", "*", is_rule, rule_node, emit_rule)
+            self.assertEqual(block_to_block_type("***"), "rule")
+            self.assertEqual(block_to_block_type("**bold**"), BlockType.PARAGRAPH)
+            md = "Before\n\n***\n\nAfter"
+            self.assertEqual(markdown_to_html(md), markdown_to_html_node(md).to_html())
+            self.assertIn("<hr></hr>", markdown_to_html(md))
+        finally:
+            textnode._BLOCK_DISPATCH.clear()
+            textnode._BLOCK_DISPATCH.update(dispatch)
+            textnode._BLOCK_HANDLERS.clear()
+            textnode._BLOCK_HANDLERS.update(handlers)
+
+    def test_markdown_to_html_unmatched_delimiter(self):
+        with self.assertRaises(ValueError):
+            markdown_to_html("This is **broken")
+
+    def test_span_nodes_match_text_nodes(self):
+        text = "A **bold\nline** with _it_, `code`, ![img](/a.png) and [link](/b\nc) **x**"
+        nodes = text_to_span_nodes(text)
+        self.assertTrue(all(isinstance(node, SpanTextNode) for node in nodes))
+        self.assertEqual(nodes, text_to_textnodes(text.replace("\n", " ")))
+        self.assertEqual(nodes[-3].url, "/b c")
+        self.assertEqual(nodes[-3].source, text)
+
+    def test_span_nodes_of_a_slice(self):
+        text = "skip **this** _part_ [of](/it)"
+        start = text.index("_")
+        self.assertEqual(text_to_span_nodes(text, start), text_to_textnodes(text[start:]))
+
+    def test_span_nodes_unmatched_delimiter(self):
+        with self.assertRaises(ValueError):
+            text_to_span_nodes("This is _broken")
+
+    def test_markdown_to_html_spans_matches_fused(self):
+        md = (
+            "# Title\n\n\n  Para **one\ntwo** ![i](/i.png)  \n\n- a [l](/l)\n- b\n\n"
+            "-not a list _x_ [wrapped](/a\nb)\n\n```python\nx = 1\n```\n\n> quote\n\n| a |\n| - |\n| [c](/c) |\n\n"
+        )
+        refs = new_page_refs()
+        span_refs = new_page_refs()
+        self.assertEqual(markdown_to_html_spans(md, span_refs), markdown_to_html(md, refs))
+        self.assertEqual(span_refs, refs)
+
+    def test_markdown_errors(self):
+        md = (
+            "# Title\n\nThis is **broken\n\n\n- fine\n- _also broken\n\n"
+            "```\ncode\n\n| a | b |\n| - | - |\n| 1 |\n\n!!! note no quotes"
+        )
+        self.assertEqual(
+            markdown_errors(md),
+            [
+                (3, "Invalid markdown: unmatched delimiter"),
+                (6, "Invalid markdown: unmatched delimiter"),
+                (9, "Unclosed code block (code blocks cannot contain blank lines)"),
+                (14, "Table row has 1 cells, the header has 2"),
+                (16, 'Malformed admonition header (expected !!! kind "Optional title")'),
+            ],
+        )
+
+    def test_markdown_errors_none_for_valid_markdown(self):
+        md = "# Title\n\n```\n**not parsed\n```\n\n<div>_raw</div>\n\nSome **bold** text"
+        self.assertEqual(markdown_errors(md), [])
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,7 @@
 import re
 from enum import Enum
 from htmlnode import LeafNode, ParentNode
+from highlight import highlight
 
 class TextType(Enum):
     TEXT = "text"
@@ -17,8 +18,13 @@ class BlockType(Enum):
     QUOTE = "quote"
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
+    TABLE = "table"
+    ADMONITION = "admonition"
+    HTML = "html"
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -84,25 +90,28 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
     return new_nodes
 
+_IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+_LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
 def extract_markdown_images(text):
     """
     Extract markdown images from text.
     Returns a list of tuples (alt_text, url).
     """
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    return re.findall(pattern, text)
+    return _IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text):
     """
     Extract markdown links from text (not images).
     Returns a list of tuples (anchor_text, url).
     """
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    return re.findall(pattern, text)
+    return _LINK_PATTERN.findall(text)
 
-def split_nodes_image(old_nodes):
+def _split_nodes_pattern(old_nodes, pattern, text_type):
     """
-    Split TextNodes containing markdown images into separate TextNodes.
+    Split the TEXT nodes in old_nodes around every match of pattern.
+    Each match becomes a node of text_type with group 1 as text and group 2
+    as url. Walks each text once, so it is linear in its length.
     """
     new_nodes = []
     for node in old_nodes:
@@ -110,51 +119,31 @@ def split_nodes_image(old_nodes):
             new_nodes.append(node)
             continue
 
-        images = extract_markdown_images(node.text)
-        if not images:
-            new_nodes.append(node)
-            continue
-
-        remaining_text = node.text
-        for alt_text, url in images:
-            sections = remaining_text.split(f"![{alt_text}]({url})", 1)
-            if sections[0]:
-                new_nodes.append(TextNode(sections[0], TextType.TEXT))
-            new_nodes.append(TextNode(alt_text, TextType.IMAGE, url))
-            remaining_text = sections[1] if len(sections) > 1 else ""
+        pos = 0
+        for match in pattern.finditer(node.text):
+            if match.start() > pos:
+                new_nodes.append(TextNode(node.text[pos:match.start()], TextType.TEXT))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            pos = match.end()
 
-        if remaining_text:
-            new_nodes.append(TextNode(remaining_text, TextType.TEXT))
+        if pos == 0:
+            new_nodes.append(node)
+        elif pos < len(node.text):
+            new_nodes.append(TextNode(node.text[pos:], TextType.TEXT))
 
     return new_nodes
 
+def split_nodes_image(old_nodes):
+    """
+    Split TextNodes containing markdown images into separate TextNodes.
+    """
+    return _split_nodes_pattern(old_nodes, _IMAGE_PATTERN, TextType.IMAGE)
+
 def split_nodes_link(old_nodes):
     """
     Split TextNodes containing markdown links into separate TextNodes.
     """
-    new_nodes = []
-    for node in old_nodes:
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
-
-        links = extract_markdown_links(node.text)
-        if not links:
-            new_nodes.append(node)
-            continue
-
-        remaining_text = node.text
-        for anchor_text, url in links:
-            sections = remaining_text.split(f"[{anchor_text}]({url})", 1)
-            if sections[0]:
-                new_nodes.append(TextNode(sections[0], TextType.TEXT))
-            new_nodes.append(TextNode(anchor_text, TextType.LINK, url))
-            remaining_text = sections[1] if len(sections) > 1 else ""
-
-        if remaining_text:
-            new_nodes.append(TextNode(remaining_text, TextType.TEXT))
-
-    return new_nodes
+    return _split_nodes_pattern(old_nodes, _LINK_PATTERN, TextType.LINK)
 
 def text_to_textnodes(text):
     """
@@ -182,38 +171,68 @@ def markdown_to_blocks(markdown):
             result.append(stripped)
     return result
 
-def block_to_block_type(block):
-    """
-    Determine the block type of a given block string.
-    """
+def _is_heading(block):
     # Headings: 1-6 # characters followed by a space
-    if re.match(r"^#{1,6} ", block):
-        return BlockType.HEADING
+    return re.match(r"^#{1,6} ", block) is not None
 
+def _is_code(block):
     # Code blocks: start with ``` and newline, end with ```
-    if block.startswith("```") and block.endswith("```"):
-        return BlockType.CODE
-
-    lines = block.split("\n")
+    return block.startswith("```") and block.endswith("```")
 
+def _is_quote(block):
     # Quote blocks: every line must start with >
-    if all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE
+    return all(line.startswith(">") for line in block.split("\n"))
 
+def _is_unordered_list(block):
     # Unordered list: every line starts with "- "
-    if all(line.startswith("- ") for line in lines):
-        return BlockType.UNORDERED_LIST
+    return all(line.startswith("- ") for line in block.split("\n"))
 
+def _is_ordered_list(block):
     # Ordered list: every line starts with number. and increments from 1
-    is_ordered_list = True
-    for i, line in enumerate(lines):
-        expected_prefix = f"{i + 1}. "
-        if not line.startswith(expected_prefix):
-            is_ordered_list = False
-            break
-    if is_ordered_list:
-        return BlockType.ORDERED_LIST
+    for i, line in enumerate(block.split("\n")):
+        if not line.startswith(f"{i + 1}. "):
+            return False
+    return True
+
+_TABLE_SEPARATOR_PATTERN = re.compile(r"^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$")
 
+def _is_table(block):
+    # Tables: every line starts with |, the second line separates the header
+    lines = block.split("\n")
+    return (
+        len(lines) >= 2
+        and all(line.startswith("|") for line in lines)
+        and _TABLE_SEPARATOR_PATTERN.match(lines[1]) is not None
+    )
+
+_ADMONITION_PATTERN = re.compile(r'^!!! (\w+)(?: "([^"]*)")?$')
+
+def _is_admonition(block):
+    # Admonitions: a first line like !!! note or !!! warning "Custom title"
+    return _ADMONITION_PATTERN.match(block.split("\n", 1)[0]) is not None
+
+# Tags that start an HTML block. A paragraph that merely starts with an
+# inline tag such as <b> or <a> is still a paragraph.
+_HTML_BLOCK_TAGS = (
+    "address|article|aside|blockquote|details|dialog|div|dl|dd|dt|fieldset|figcaption|figure|"
+    "footer|form|h[1-6]|header|hr|iframe|li|main|nav|ol|p|pre|script|section|style|summary|"
+    "table|tbody|td|tfoot|th|thead|tr|ul|video|audio|picture|canvas|svg"
+)
+_HTML_BLOCK_PATTERN = re.compile(rf"^(?:<!--|</?(?:{_HTML_BLOCK_TAGS})(?:[\s/>]|$))", re.IGNORECASE)
+
+def _is_html(block):
+    # HTML blocks: start with a block-level tag or a comment and are passed through as-is
+    return _HTML_BLOCK_PATTERN.match(block) is not None
+
+def block_to_block_type(block):
+    """
+    Determine the block type of a given block string.
+    Only the rules registered for the first character of the block are
+    tried, so plain paragraphs are classified without running any of them.
+    """
+    for block_type, matches in _BLOCK_DISPATCH.get(block[:1], ()):
+        if matches(block):
+            return block_type
     return BlockType.PARAGRAPH
 
 def text_to_children(text):
@@ -250,22 +269,44 @@ def heading_to_html_node(block):
     children = text_to_children(text)
     return ParentNode(f"h{level}", children)
 
-def code_to_html_node(block):
+def split_code_block(block):
     """
-    Convert a code block to an HTMLNode.
-    No inline markdown parsing for code blocks.
+    Split a code block into its language specifier and its body.
+    The language is the word right after the opening fence, or None.
     """
     # Remove the ``` from start and end
-    text = block[3:-3].strip("\n")
-    # For code blocks, check if there's a language specifier on the first line
+    text = block[3:-3]
+    language = None
+    # A language specifier sits on the same line as the opening fence
     if "\n" in text:
         first_newline = text.index("\n")
-        first_line = text[:first_newline]
-        # If first line has no spaces, it might be a language specifier
-        if " " not in first_line and first_line.isalnum():
+        first_line = text[:first_newline].strip()
+        if first_line and first_line.isalnum():
+            language = first_line.lower()
             text = text[first_newline + 1:]
-    text_node = TextNode(text, TextType.CODE)
-    code_node = text_node_to_html_node(text_node)
+    return language, text.strip("\n")
+
+def code_block_html(block):
+    """
+    Return the props and inner HTML of the <code> element for a code block.
+    Blocks with a language get a class attribute and, for the languages the
+    highlighter knows, highlighted markup.
+    """
+    language, text = split_code_block(block)
+    if language is None:
+        return None, text
+    highlighted = highlight(text, language)
+    if highlighted is not None:
+        text = highlighted
+    return {"class": f"language-{language}"}, text
+
+def code_to_html_node(block):
+    """
+    Convert a code block to an HTMLNode.
+    No inline markdown parsing for code blocks.
+    """
+    props, text = code_block_html(block)
+    code_node = LeafNode("code", text, props)
     return ParentNode("pre", [code_node])
 
 def quote_to_html_node(block):
@@ -309,24 +350,69 @@ def ordered_list_to_html_node(block):
         list_items.append(ParentNode("li", children))
     return ParentNode("ol", list_items)
 
+def _table_cells(line):
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+def split_table(block):
+    """
+    Split a table block into its header cells and its body rows.
+    """
+    lines = block.split("\n")
+    return _table_cells(lines[0]), [_table_cells(line) for line in lines[2:]]
+
+def table_to_html_node(block):
+    """
+    Convert a table block to an HTMLNode.
+    """
+    header, rows = split_table(block)
+    head_row = ParentNode("tr", [ParentNode("th", text_to_children(cell)) for cell in header])
+    body_rows = []
+    for row in rows:
+        body_rows.append(ParentNode("tr", [ParentNode("td", text_to_children(cell)) for cell in row]))
+    return ParentNode("table", [ParentNode("thead", [head_row]), ParentNode("tbody", body_rows)])
+
+def split_admonition(block):
+    """
+    Split an admonition block into its kind, title and body text.
+    The title defaults to the capitalized kind.
+    """
+    lines = block.split("\n")
+    match = _ADMONITION_PATTERN.match(lines[0])
+    kind = match.group(1).lower()
+    title = match.group(2) if match.group(2) is not None else kind.capitalize()
+    body = " ".join(line.strip() for line in lines[1:])
+    return kind, title, body
+
+def admonition_to_html_node(block):
+    """
+    Convert an admonition block to an HTMLNode.
+    """
+    kind, title, body = split_admonition(block)
+    children = [ParentNode("p", text_to_children(title), {"class": "admonition-title"})]
+    if body:
+        children.append(ParentNode("p", text_to_children(body)))
+    return ParentNode("div", children, {"class": f"admonition {kind}"})
+
+def html_to_html_node(block):
+    """
+    Convert an HTML block to an HTMLNode that outputs it unchanged.
+    """
+    return LeafNode(None, block)
+
 def block_to_html_node(block):
     """
     Convert a single block to an HTMLNode based on its type.
     """
     block_type = block_to_block_type(block)
-    if block_type == BlockType.PARAGRAPH:
-        return paragraph_to_html_node(block)
-    if block_type == BlockType.HEADING:
-        return heading_to_html_node(block)
-    if block_type == BlockType.CODE:
-        return code_to_html_node(block)
-    if block_type == BlockType.QUOTE:
-        return quote_to_html_node(block)
-    if block_type == BlockType.UNORDERED_LIST:
-        return unordered_list_to_html_node(block)
-    if block_type == BlockType.ORDERED_LIST:
-        return ordered_list_to_html_node(block)
-    raise ValueError(f"Unknown block type: {block_type}")
+    handlers = _BLOCK_HANDLERS.get(block_type)
+    if handlers is None:
+        raise ValueError(f"Unknown block type: {block_type}")
+    return handlers[0](block)
 
 def markdown_to_html_node(markdown):
     """
@@ -339,13 +425,405 @@ def markdown_to_html_node(markdown):
         children.append(html_node)
     return ParentNode("div", children)
 
+_TITLE_PATTERN = re.compile(r"^# (.*)$", re.MULTILINE)
+
 def extract_title(markdown):
     """
     Extract the h1 header from a markdown document.
     Raises an exception if no h1 header is found.
     """
-    lines = markdown.split("\n")
-    for line in lines:
-        if line.startswith("# "):
-            return line[2:].strip()
-    raise ValueError("No h1 header found in markdown")
\ No newline at end of file
+    match = _TITLE_PATTERN.search(markdown)
+    if match:
+        return match.group(1).strip()
+    raise ValueError("No h1 header found in markdown")
+
+def _block_error(block):
+    # Returns (line within the block, message) for a block that would fail
+    # to render or renders as something other than what it looks like
+    block_type = block_to_block_type(block)
+    if block_type == BlockType.PARAGRAPH:
+        if block.startswith("```"):
+            return 0, "Unclosed code block (code blocks cannot contain blank lines)"
+        if block.startswith("!!!"):
+            return 0, 'Malformed admonition header (expected !!! kind "Optional title")'
+    elif block_type in (BlockType.CODE, BlockType.HTML):
+        # Passed through without inline parsing
+        return None
+    elif block_type == BlockType.TABLE:
+        header, rows = split_table(block)
+        for i, row in enumerate(rows):
+            if len(row) != len(header):
+                return i + 2, f"Table row has {len(row)} cells, the header has {len(header)}"
+    try:
+        _BLOCK_HANDLERS[block_type][1](block, [], None)
+    except ValueError as e:
+        return 0, str(e)
+    return None
+
+def markdown_errors(markdown):
+    """
+    Check a markdown document without rendering it.
+    Returns a (line, message) pair for every block that cannot be parsed
+    or looks malformed, with 1-based line numbers.
+    """
+    errors = []
+    line = 1
+    # Walks the same blocks as markdown_to_blocks, counting lines on the way
+    for chunk in markdown.split("\n\n"):
+        block = chunk.strip()
+        if block:
+            error = _block_error(block)
+            if error is not None:
+                leading = chunk[:len(chunk) - len(chunk.lstrip())].count("\n")
+                errors.append((line + leading + error[0], error[1]))
+        line += chunk.count("\n") + 2
+    return errors
+
+
+# Fused render path
+#
+# The functions below produce exactly the same HTML as
+# markdown_to_html_node(markdown).to_html(), but write fragments straight
+# into a list of strings instead of building TextNode/LeafNode/ParentNode
+# objects first. Use markdown_to_html when only the HTML string is needed.
+
+_INLINE_DELIMITERS = (("**", "b"), ("_", "i"), ("`", "code"))
+
+def _emit_links(text, out, refs):
+    pos = 0
+    for match in _LINK_PATTERN.finditer(text):
+        out.append(text[pos:match.start()])
+        out.append(f'<a href="{match.group(2)}">{match.group(1)}</a>')
+        if refs is not None:
+            refs["links"].append(match.group(2))
+        pos = match.end()
+    out.append(text[pos:])
+
+def _emit_images(text, out, refs):
+    pos = 0
+    for match in _IMAGE_PATTERN.finditer(text):
+        if match.start() > pos:
+            _emit_links(text[pos:match.start()], out, refs)
+        out.append(f'<img src="{match.group(2)}" alt="{match.group(1)}"></img>')
+        if refs is not None:
+            refs["images"].append(match.group(2))
+        pos = match.end()
+    if pos < len(text):
+        _emit_links(text[pos:], out, refs)
+
+def _emit_inline(text, out, refs, level=0):
+    """
+    Write the HTML for inline markdown text to out, recording image and
+    link URLs in refs when it is not None.
+    Mirrors text_to_textnodes: delimiters are applied in order, then images,
+    then links, each only on the plain text left by the previous step.
+    """
+    if level == len(_INLINE_DELIMITERS):
+        _emit_images(text, out, refs)
+        return
+    delimiter, tag = _INLINE_DELIMITERS[level]
+    parts = text.split(delimiter)
+    if len(parts) % 2 == 0:
+        raise ValueError("Invalid markdown: unmatched delimiter")
+    for i, part in enumerate(parts):
+        if not part:
+            continue
+        if i % 2 == 0:
+            _emit_inline(part, out, refs, level + 1)
+        else:
+            out.append(f"<{tag}>{part}</{tag}>")
+
+def _emit_paragraph(block, out, refs):
+    out.append("<p>")
+    _emit_inline(" ".join(block.split("\n")), out, refs)
+    out.append("</p>")
+
+def _emit_heading(block, out, refs):
+    level = len(block) - len(block.lstrip("#"))
+    out.append(f"<h{level}>")
+    _emit_inline(block[level + 1:], out, refs)
+    out.append(f"</h{level}>")
+
+def _emit_code(block, out, refs):
+    props, text = code_block_html(block)
+    if props is None:
+        out.append("<pre><code>")
+    else:
+        out.append(f'<pre><code class="{props["class"]}">')
+    out.append(text)
+    out.append("</code></pre>")
+
+def _emit_quote(block, out, refs):
+    new_lines = []
+    for line in block.split("\n"):
+        if line.startswith("> "):
+            new_lines.append(line[2:])
+        elif line.startswith(">"):
+            new_lines.append(line[1:])
+    out.append("<blockquote>")
+    _emit_inline(" ".join(new_lines), out, refs)
+    out.append("</blockquote>")
+
+def _emit_unordered_list(block, out, refs):
+    out.append("<ul>")
+    for line in block.split("\n"):
+        out.append("<li>")
+        _emit_inline(line[2:], out, refs)
+        out.append("</li>")
+    out.append("</ul>")
+
+def _emit_ordered_list(block, out, refs):
+    out.append("<ol>")
+    for i, line in enumerate(block.split("\n")):
+        out.append("<li>")
+        _emit_inline(line[len(str(i + 1)) + 2:], out, refs)
+        out.append("</li>")
+    out.append("</ol>")
+
+def _emit_table(block, out, refs):
+    header, rows = split_table(block)
+    out.append("<table><thead><tr>")
+    for cell in header:
+        out.append("<th>")
+        _emit_inline(cell, out, refs)
+        out.append("</th>")
+    out.append("</tr></thead><tbody>")
+    for row in rows:
+        out.append("<tr>")
+        for cell in row:
+            out.append("<td>")
+            _emit_inline(cell, out, refs)
+            out.append("</td>")
+        out.append("</tr>")
+    out.append("</tbody></table>")
+
+def _emit_admonition(block, out, refs):
+    kind, title, body = split_admonition(block)
+    out.append(f'<div class="admonition {kind}"><p class="admonition-title">')
+    _emit_inline(title, out, refs)
+    out.append("</p>")
+    if body:
+        out.append("<p>")
+        _emit_inline(body, out, refs)
+        out.append("</p>")
+    out.append("</div>")
+
+def _emit_html(block, out, refs):
+    out.append(block)
+
+def new_page_refs():
+    """
+    Return an empty collector for the image and link URLs of a page.
+    """
+    return {"images": [], "links": []}
+
+def markdown_to_html(markdown, refs=None):
+    """
+    Convert a full markdown document straight to an HTML string.
+    Produces the same output as markdown_to_html_node(markdown).to_html()
+    without building the intermediate node tree.
+    If refs (from new_page_refs) is given, the URL of every image and link
+    is appended to it in document order.
+    """
+    out = ["<div>"]
+    for block in markdown_to_blocks(markdown):
+        _BLOCK_HANDLERS[block_to_block_type(block)][1](block, out, refs)
+    out.append("</div>")
+    return "".join(out)
+
+
+# Span render path
+#
+# SpanTextNodes point into the markdown document instead of holding copies
+# of their text: inline parsing only moves offsets around, and text is
+# sliced out of the document when the HTML is written. Produces the same
+# HTML as markdown_to_html; blocks other than paragraphs, which are short
+# or need their lines rewritten, go through the fused renderers.
+
+class SpanTextNode(TextNode):
+    """
+    A TextNode whose text is source[start:end] and whose url, if any, is
+    source[url_start:url_end]. Both are only sliced out when read. Line
+    breaks read as spaces, as in paragraph_to_html_node.
+    """
+
+    __slots__ = ("source", "start", "end", "url_start", "url_end")
+
+    def __init__(self, source, start, end, text_type, url_start=None, url_end=None):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.text_type = text_type
+        self.url_start = url_start
+        self.url_end = url_end
+
+    @property
+    def text(self):
+        text = self.source[self.start:self.end]
+        if "\n" in text:
+            text = text.replace("\n", " ")
+        return text
+
+    @property
+    def url(self):
+        if self.url_start is None:
+            return None
+        url = self.source[self.url_start:self.url_end]
+        if "\n" in url:
+            url = url.replace("\n", " ")
+        return url
+
+def _split_spans_delimiter(old_nodes, delimiter, text_type):
+    new_nodes = []
+    for node in old_nodes:
+        if node.text_type != TextType.TEXT:
+            new_nodes.append(node)
+            continue
+        source, pos, end = node.source, node.start, node.end
+        found = source.find(delimiter, pos, end)
+        if found == -1:
+            new_nodes.append(node)
+            continue
+        inside = False
+        while True:
+            stop = end if found == -1 else found
+            if stop > pos:
+                new_nodes.append(SpanTextNode(source, pos, stop, text_type if inside else TextType.TEXT))
+            if found == -1:
+                break
+            pos = found + len(delimiter)
+            inside = not inside
+            found = source.find(delimiter, pos, end)
+        if inside:
+            raise ValueError("Invalid markdown: unmatched delimiter")
+    return new_nodes
+
+def _split_spans_pattern(old_nodes, pattern, text_type):
+    new_nodes = []
+    for node in old_nodes:
+        if node.text_type != TextType.TEXT:
+            new_nodes.append(node)
+            continue
+        source, pos, end = node.source, node.start, node.end
+        for match in pattern.finditer(source, pos, end):
+            if match.start() > pos:
+                new_nodes.append(SpanTextNode(source, pos, match.start(), TextType.TEXT))
+            new_nodes.append(SpanTextNode(source, match.start(1), match.end(1), text_type,
+                                          match.start(2), match.end(2)))
+            pos = match.end()
+        if pos == node.start:
+            new_nodes.append(node)
+        elif pos < end:
+            new_nodes.append(SpanTextNode(source, pos, end, TextType.TEXT))
+    return new_nodes
+
+def text_to_span_nodes(source, start=0, end=None):
+    """
+    Parse the inline markdown in source[start:end] into SpanTextNodes.
+    Gives the same nodes as text_to_textnodes on that text (with its line
+    breaks joined by spaces), without copying any of it.
+    """
+    if end is None:
+        end = len(source)
+    nodes = [SpanTextNode(source, start, end, TextType.TEXT)]
+    for delimiter, text_type in (("**", TextType.BOLD), ("_", TextType.ITALIC), ("`", TextType.CODE)):
+        nodes = _split_spans_delimiter(nodes, delimiter, text_type)
+    nodes = _split_spans_pattern(nodes, _IMAGE_PATTERN, TextType.IMAGE)
+    return _split_spans_pattern(nodes, _LINK_PATTERN, TextType.LINK)
+
+_SPAN_TAGS = {TextType.BOLD: "b", TextType.ITALIC: "i", TextType.CODE: "code"}
+
+def write_span_nodes(nodes, out, refs=None):
+    """
+    Append the HTML for a list of SpanTextNodes to out, slicing each text
+    out of the document only now. Image and link URLs are recorded in refs
+    when it is not None.
+    """
+    for node in nodes:
+        if node.text_type == TextType.TEXT:
+            out.append(node.text)
+        elif node.text_type == TextType.LINK:
+            out.append(f'<a href="{node.url}">{node.text}</a>')
+            if refs is not None:
+                refs["links"].append(node.url)
+        elif node.text_type == TextType.IMAGE:
+            out.append(f'<img src="{node.url}" alt="{node.text}"></img>')
+            if refs is not None:
+                refs["images"].append(node.url)
+        else:
+            tag = _SPAN_TAGS[node.text_type]
+            out.append(f"<{tag}>")
+            out.append(node.text)
+            out.append(f"</{tag}>")
+
+def _block_spans(markdown):
+    # The (start, end) offsets of the blocks markdown_to_blocks returns
+    pos = 0
+    while True:
+        found = markdown.find("\n\n", pos)
+        start = pos
+        end = len(markdown) if found == -1 else found
+        while start < end and markdown[start].isspace():
+            start += 1
+        while end > start and markdown[end - 1].isspace():
+            end -= 1
+        if start < end:
+            yield start, end
+        if found == -1:
+            return
+        pos = found + 2
+
+def markdown_to_html_spans(markdown, refs=None):
+    """
+    Convert a full markdown document to an HTML string through
+    SpanTextNodes. Produces the same output as markdown_to_html.
+    """
+    out = ["<div>"]
+    for start, end in _block_spans(markdown):
+        if markdown[start] in _BLOCK_DISPATCH:
+            block = markdown[start:end]
+            block_type = block_to_block_type(block)
+            if block_type != BlockType.PARAGRAPH:
+                _BLOCK_HANDLERS[block_type][1](block, out, refs)
+                continue
+        out.append("<p>")
+        write_span_nodes(text_to_span_nodes(markdown, start, end), out, refs)
+        out.append("</p>")
+    out.append("</div>")
+    return "".join(out)
+
+
+# Block type registry
+#
+# Each block type registers the characters a block of that type can start
+# with, a function telling whether a block is of that type, and its two
+# renderers (to an HTMLNode, and into the fused output buffer).
+# block_to_block_type only runs the rules registered for a block's first
+# character, so adding block types costs nothing for other blocks.
+
+_BLOCK_DISPATCH = {}
+_BLOCK_HANDLERS = {}
+
+def register_block_type(block_type, leading_chars, matches, to_html_node, emit):
+    """
+    Register a block type.
+    leading_chars: the characters a block of this type may start with.
+    matches(block): whether a block starting with one of them is of this type.
+    to_html_node(block): convert the block to an HTMLNode.
+    emit(block, out, refs): append the block's HTML to the list out,
+    recording image and link URLs in refs when it is not None.
+    Rules for the same character are tried in registration order.
+    """
+    for char in leading_chars:
+        _BLOCK_DISPATCH.setdefault(char, []).append((block_type, matches))
+    _BLOCK_HANDLERS[block_type] = (to_html_node, emit)
+
+register_block_type(BlockType.PARAGRAPH, "", None, paragraph_to_html_node, _emit_paragraph)
+register_block_type(BlockType.HEADING, "#", _is_heading, heading_to_html_node, _emit_heading)
+register_block_type(BlockType.CODE, "`", _is_code, code_to_html_node, _emit_code)
+register_block_type(BlockType.QUOTE, ">", _is_quote, quote_to_html_node, _emit_quote)
+register_block_type(BlockType.UNORDERED_LIST, "-", _is_unordered_list, unordered_list_to_html_node, _emit_unordered_list)
+register_block_type(BlockType.ORDERED_LIST, "1", _is_ordered_list, ordered_list_to_html_node, _emit_ordered_list)
+register_block_type(BlockType.TABLE, "|", _is_table, table_to_html_node, _emit_table)
+register_block_type(BlockType.ADMONITION, "!", _is_admonition, admonition_to_html_node, _emit_admonition)
+register_block_type(BlockType.HTML, "<", _is_html, html_to_html_node, _emit_html)